@@ -0,0 +1,121 @@
+# app/application/admission.py
+"""Control de admisión adaptativo para la ruta de predicción.
+
+El límite de peticiones simultáneas se ajusta con la latencia observada
+(espera en cola + inferencia):
+- "aimd": +1 si la petición fue bien y el límite se estaba usando,
+  ×backoff si superó la latencia objetivo o falló.
+- "gradient": compara la latencia reciente con la de referencia (EWMA larga);
+  si la reciente sube, el límite baja proporcionalmente (estilo Gradient2).
+Lo que no cabe se rechaza al instante (503) en lugar de acumularse.
+
+La muestra de latencia la aporta el servicio (`record_service_time` alrededor
+del turno del scheduler + inferencia), no el middleware: la subida del cliente
+no dice nada de la capacidad del servidor.
+"""
+import math
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+
+_service_times: ContextVar[Optional[List[float]]] = ContextVar("admission_service_times", default=None)
+
+
+@contextmanager
+def collect_service_time():
+    """Recoge las muestras de `record_service_time` de la petición en curso."""
+    samples: List[float] = []
+    token = _service_times.set(samples)
+    try:
+        yield samples
+    finally:
+        _service_times.reset(token)
+
+
+def record_service_time(seconds: float) -> None:
+    """Espera de turno + inferencia de la petición en curso (no-op fuera del middleware)."""
+    samples = _service_times.get()
+    if samples is not None:
+        samples.append(seconds)
+
+
+class AdaptiveLimiter:
+    def __init__(
+        self,
+        algorithm: str = "gradient",
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        target_latency: float = 2.0,      # s, solo AIMD
+        backoff: float = 0.9,             # AIMD
+        smoothing: float = 0.2,           # gradient
+        tolerance: float = 1.5,           # gradient: latencia reciente tolerada vs referencia
+        long_window: int = 100,           # gradient: muestras de la EWMA de referencia
+    ):
+        if algorithm not in ("aimd", "gradient"):
+            raise ValueError(f"Algoritmo de admisión desconocido: {algorithm}")
+        self.algorithm = algorithm
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.smoothing = smoothing
+        self.tolerance = tolerance
+        self._long_alpha = 2.0 / (long_window + 1)
+        self._lock = threading.Lock()
+        self._limit = float(initial_limit)
+        self._inflight = 0
+        self._long_rtt: Optional[float] = None
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(self._limit))
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self._inflight >= self.limit:
+                return False
+            self._inflight += 1
+            return True
+
+    def release(self, latency: Optional[float], failed: bool = False) -> None:
+        """Libera el hueco; `latency=None` = sin muestra útil (p. ej. un 4xx inmediato)."""
+        with self._lock:
+            inflight = self._inflight
+            self._inflight -= 1
+            if latency is None and not failed:
+                return
+            latency = latency or 0.0
+            if self.algorithm == "aimd":
+                self._update_aimd(latency, failed, inflight)
+            else:
+                self._update_gradient(latency, failed, inflight)
+            self._limit = min(float(self.max_limit), max(float(self.min_limit), self._limit))
+
+    def _update_aimd(self, latency: float, failed: bool, inflight: int) -> None:
+        if failed or latency > self.target_latency:
+            self._limit *= self.backoff
+        elif inflight * 2 >= self._limit:  # solo crece si el límite se está usando
+            self._limit += 1.0
+
+    def _update_gradient(self, latency: float, failed: bool, inflight: int) -> None:
+        if failed:
+            self._limit *= 0.9
+            return
+        if self._long_rtt is None:
+            self._long_rtt = latency
+        else:
+            self._long_rtt += self._long_alpha * (latency - self._long_rtt)
+            # tras una sobrecarga larga la referencia se quedaría inflada: se acerca rápido a la muestra
+            if self._long_rtt / max(latency, 1e-9) > 2.0:
+                self._long_rtt *= 0.95
+        gradient = max(0.5, min(1.0, self.tolerance * self._long_rtt / max(latency, 1e-9)))
+        new_limit = self._limit * gradient + math.sqrt(self._limit)  # margen de cola
+        if inflight * 2 < self._limit:
+            new_limit = min(new_limit, self._limit)  # poco uso: no hay señal para subir
+        self._limit = self._limit * (1 - self.smoothing) + new_limit * self.smoothing
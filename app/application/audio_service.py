@@ -1,22 +1,157 @@
+import asyncio
+import contextlib
+import contextvars
+import functools
+import logging
 import os
+import threading
+import time
 import torch
 import librosa
 import numpy as np
-import tempfile
 import soundfile as sf
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from typing import Tuple, List, Optional
 from fastapi import UploadFile, HTTPException
 from datetime import datetime, timezone
 
 from app.domain.models.audio import Audio
+from app.domain.models.audio_embedding import AudioEmbedding
 from app.domain.repositories.audio_repository import IAudioRepository
+from app.domain.repositories.embedding_repository import IEmbeddingRepository
+from app.application.feature_preparation import FeaturePreparer
+from app.application.history_service import HistoryService
+from app.application.silence import SILENCE_RMS, is_silent  # noqa: F401  (reexportados)
+from app.application.audio_upload import receive_upload, INVALID_AUDIO_DETAIL
+from app.application import admission
+from app.application.single_flight import SingleFlight
+from app.application.pcm import PcmFormat, pcm_digest, pcm_to_signal
+from app.application.fair_scheduler import FairScheduler
+from app.application.cascade import CascadeClassifier, logit_margin
+from app.application.reduced_depth import encoder_depth, truncated_view
+from app.application.length_buckets import LengthBuckets, supports_padding
+from app.application.remote_inference import RemoteInferenceClient, RemoteInferenceError
+from app.config import Settings, get_settings
+from app.infrastructure.metrics import metrics
+from app.infrastructure import profiling, tracing
+from app.infrastructure import memory
+from app.infrastructure.memory import MemoryBudget, estimate_request_bytes
 
+log = logging.getLogger(__name__)
 
-class AudioService:
-    def __init__(self, repository: IAudioRepository, model, processor):
-        self.repository = repository
+
+@dataclass
+class AudioAnalysis:
+    """Resultado compartible de decodificar + inferir un archivo."""
+    prediction: int
+    start_time: datetime
+    end_time: datetime
+    inference_duration: float
+    embedding: Optional[np.ndarray]
+    stage: str = "full"   # etapa que resolvió el veredicto: prefilter | prefix | fast | full
+
+
+def authenticity_score(prediction: int) -> float:
+    """Puntaje de autenticidad "amigable" para UI."""
+    if prediction == 1:  # FALSO
+        return round(torch.rand(1).item() * 17, 2)   # [0, 17)
+    return round(70 + torch.rand(1).item() * 27, 2)  # [70, 97)
+
+
+# Rechazos que dependen de quién pidió o de la carga, no del audio: no se comparten
+_NOT_SHARED_STATUS = (429, 503)
+
+
+def _call_profiled(fn, *args):
+    # cProfile solo ve el hilo donde se activa: se abre dentro del hilo de inferencia
+    with profiling.python_section():
+        return fn(*args)
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        if os.path.exists(path):
+            os.remove(path)
+    except Exception:
+        pass
+
+
+class AudioService(HistoryService):
+    def __init__(
+        self,
+        repository: IAudioRepository,
+        model,
+        processor,
+        features: Optional[FeaturePreparer] = None,
+        settings: Optional[Settings] = None,
+        embeddings: Optional[IEmbeddingRepository] = None,
+        embedding_index=None,
+        cascade: Optional[CascadeClassifier] = None,
+        scheduler: Optional[FairScheduler] = None,
+        remote: Optional[RemoteInferenceClient] = None,
+    ):
+        super().__init__(repository, embeddings=embeddings, embedding_index=embedding_index)
         self.model = model
         self.processor = processor
+        self.settings = settings or get_settings()
+        # Normalización vectorizada con la misma configuración que el processor
+        self.features = features or FeaturePreparer.from_processor(processor)
+        # Longitudes fijas de entrada (relleno + attention mask) para reutilizar formas
+        self.buckets = (
+            LengthBuckets(self.settings.LENGTH_BUCKETS_SECONDS, self.features.sampling_rate)
+            if self.settings.LENGTH_BUCKETS_SECONDS else None
+        )
+        if self.buckets is not None and model is not None and not supports_padding(model):
+            log.warning("LENGTH_BUCKETS_SECONDS ignorado: el modelo no usa feat_extract_norm='layer' "
+                        "y el relleno cambiaría sus logits")
+            self.buckets = None
+        # Pre-clasificador espectral (opcional): resuelve los clips claros sin Wav2Vec2
+        self.cascade = cascade
+        # Turnos de inferencia justos por usuario + rate limit (opcional)
+        self.scheduler = scheduler
+        # Workers de inferencia dedicados (opcional); sin modelo local no hay fallback.
+        # Con workers el pool solo decodifica y espera respuestas (REMOTE_MAX_INFLIGHT hilos);
+        # el fallback local sigue limitado a INFERENCE_THREADS inferencias a la vez.
+        self.remote = remote
+        self._local_slots = threading.BoundedSemaphore(max(1, self.settings.INFERENCE_THREADS))
+        self._pooled = threading.local()
+        # Predicciones en curso por sha256 del contenido (coalescencia de peticiones idénticas)
+        self._inflight = SingleFlight("predict")
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._queued = 0  # trabajos enviados al pool y aún sin terminar
+        # Presupuesto de memoria de inferencia por worker (bytes estimados por clip)
+        self.memory_budget = (
+            MemoryBudget(self.settings.MEMORY_BUDGET_MB * memory.MB, timeout=self.settings.MEMORY_WAIT_SECONDS)
+            if self.settings.MEMORY_BUDGET_MB else None
+        )
+        # Modo rápido (encoder truncado) para deployments sobrecargados
+        self.fast_model = None
+        if self.settings.FAST_MODE != "off" and model is not None:
+            depth = encoder_depth(model)
+            if depth is None:
+                log.warning("FAST_MODE ignorado: el modelo no expone wav2vec2.encoder.layers")
+            else:
+                self.fast_model = truncated_view(model, min(self.settings.FAST_MODE_LAYERS, depth))
+        head = getattr(model, "classifier", None)
+        if isinstance(head, torch.nn.Module):
+            head.register_forward_pre_hook(self._capture_pooled)
+
+    def _capture_pooled(self, module, args):
+        # Entrada del clasificador = salida agrupada (mean pooling) del proyector
+        self._pooled.value = args[0].detach()
+
+    def _take_embedding(self) -> Optional[np.ndarray]:
+        pooled = getattr(self._pooled, "value", None)
+        self._pooled.value = None
+        if pooled is None:
+            return None
+        return pooled[0].float().numpy().copy()
+
+    def check_rate(self, user_id: int) -> None:
+        """429 si el usuario superó su ritmo (sin scheduler no hay límite)."""
+        if self.scheduler is not None:
+            self.scheduler.check_rate(user_id)
 
     async def predict_audio(
         self,
@@ -27,102 +162,326 @@ class AudioService:
         filepath = None
         try:
             filename = file.filename or "audio.wav"
-            temp_dir = tempfile.gettempdir()
-            filepath = os.path.join(temp_dir, filename)
+            self.check_rate(user_id)  # 429 antes de leer la subida
 
-            # Guardar archivo temporal
-            with open(filepath, "wb") as buffer:
-                buffer.write(await file.read())
+            # Guardar archivo temporal por bloques (formato validado con la cabecera)
+            upload = await receive_upload(
+                file,
+                max_bytes=self.settings.MAX_UPLOAD_BYTES,
+                max_seconds=self.settings.MAX_AUDIO_SECONDS,
+                chunk_size=self.settings.UPLOAD_CHUNK_BYTES,
+            )
+            filepath = upload.path
 
-            # Detectar sample rate original
-            try:
-                with sf.SoundFile(filepath) as f:
-                    sr_original = f.samplerate
-            except RuntimeError:
-                raise HTTPException(status_code=400, detail="El archivo de audio está dañado o no es válido.")
+            def hand_over(task):
+                # el archivo pasa a ser de la tarea compartida (sobrevive a una cancelación)
+                nonlocal filepath
+                task.add_done_callback(lambda _: _remove_quietly(upload.path))
+                filepath = None
 
-            # Cargar audio (hasta 5s, normalizar a 16kHz si es necesario)
-            if sr_original == 16000:
-                signal, sr = librosa.load(filepath, sr=None, mono=True, duration=5.0)
-            else:
-                signal, sr = librosa.load(filepath, sr=16000, mono=True, duration=5.0)
-
-            # Validación de silencio
-            rms = float(np.sqrt(np.mean(signal ** 2)))
-            if rms < 0.001:
-                raise HTTPException(status_code=400, detail="El audio está vacío o contiene solo silencio.")
-
-            # ⏱ Tiempo de inicio
-            start_time = datetime.now(timezone.utc)
-
-            # Preprocesamiento e inferencia
-            inputs = self.processor(signal, sampling_rate=sr, return_tensors="pt", padding=True)
-            with torch.no_grad():
-                logits = self.model(**inputs).logits
-
-            # ⏱ Tiempo de fin
-            end_time = datetime.now(timezone.utc)
-            inference_duration = (end_time - start_time).total_seconds()
-
-            # Resultado
-            prediction = torch.argmax(logits, dim=1).item()
-            # probs = torch.softmax(logits, dim=1)  # disponible si lo necesitas
-
-            # Puntaje de autenticidad "amigable" para UI
-            if prediction == 1:  # FALSO
-                authenticity_score = round(torch.rand(1).item() * 17, 2)   # [0, 17)
-            else:  # REAL
-                authenticity_score = round(70 + torch.rand(1).item() * 27, 2)  # [70, 97)
-
-            result = "falso" if prediction == 1 else "real"
-
-            # Crear y guardar el objeto Audio ligado al usuario
-            audio = Audio(
-                user_id=user_id,                         # << ahora ligado a la persona
-                filename=filename,
-                result=result,
-                authenticity_score=authenticity_score,
-                created=datetime.now(timezone.utc),
-                device_id=device_id,                    # opcional
-                inference_start=start_time,
-                inference_end=end_time,
-                inference_duration=inference_duration,
+            # Subidas idénticas en curso comparten una sola decodificación + inferencia
+            analysis = await self._shared_analysis(
+                upload.digest, user_id, self._analyze_file, upload.path, on_leader=hand_over
             )
-            saved_audio = self.repository.save(audio)
-            return saved_audio, inference_duration
+            return await self._save_result(analysis, user_id, filename, device_id)
 
         except Exception as e:
-            print(f"[ERROR] predict_audio: {e}")
+            log.error("predict_audio: %s", e)
             raise
         finally:
             # Limpieza del archivo temporal
-            if filepath and os.path.exists(filepath):
-                try:
-                    os.remove(filepath)
-                except Exception:
-                    pass
+            if filepath:
+                _remove_quietly(filepath)
+
+    async def predict_pcm(
+        self,
+        body: bytearray,
+        fmt: PcmFormat,
+        user_id: int,
+        filename: Optional[str] = None,
+        device_id: Optional[str] = None,
+    ) -> Tuple[Audio, float]:
+        """Igual que predict_audio pero con PCM crudo ya en memoria (sin archivo ni decodificación).
 
-    def get_all_audios(self) -> List[Audio]:
+        El cuerpo ya está leído: quien llama debe pasar antes por `check_rate`.
+        """
         try:
-            return self.repository.get_all()
+            analysis = await self._shared_analysis(pcm_digest(body, fmt), user_id, self._analyze_pcm, body, fmt)
+            return await self._save_result(analysis, user_id, filename or "audio.pcm", device_id)
         except Exception as e:
-            print(f"[ERROR] get_all_audios: {e}")
+            log.error("predict_pcm: %s", e)
             raise
 
-    def get_audios_by_user(self, user_id: int) -> List[Audio]:
+    async def _save_result(
+        self, analysis: "AudioAnalysis", user_id: int, filename: str, device_id: Optional[str]
+    ) -> Tuple[Audio, float]:
+        prediction = analysis.prediction
+        result = "falso" if prediction == 1 else "real"
+
+        # Crear y guardar el objeto Audio ligado al usuario (uno por petición, aunque se compartiera la inferencia)
+        audio = Audio(
+            user_id=user_id,                         # << ahora ligado a la persona
+            filename=filename,
+            result=result,
+            authenticity_score=authenticity_score(prediction),
+            created=datetime.now(timezone.utc),
+            device_id=device_id,                    # opcional
+            inference_start=analysis.start_time,
+            inference_end=analysis.end_time,
+            inference_duration=analysis.inference_duration,
+        )
+        with tracing.span("db"):
+            saved_audio = await asyncio.to_thread(self.repository.save, audio)
+            await asyncio.to_thread(self._store_embedding, saved_audio, analysis.embedding)
+        return saved_audio, analysis.inference_duration
+
+    async def _shared_analysis(self, key: str, user_id: int, fn, *args, on_leader=None) -> "AudioAnalysis":
+        """Análisis compartido entre peticiones con el mismo contenido.
+
+        Solo se comparte el resultado del análisis (o un error del propio
+        audio). Si la tarea del líder se rechazó por su turno o por carga
+        (429 del scheduler del líder, 503 de memoria / inferencia), el resto
+        no hereda ese rechazo: vuelve a intentarlo, y el primero que llegue
+        pasa a ser líder bajo su propio usuario.
+        """
+        while True:
+            task, leader = self._inflight.join(key, lambda: self._schedule(user_id, fn, *args))
+            if leader and on_leader is not None:
+                on_leader(task)
+            try:
+                return await asyncio.shield(task)
+            except HTTPException as e:
+                if leader or e.status_code not in _NOT_SHARED_STATUS:
+                    raise
+                metrics.inc("predict_coalesced_retries")
+
+    async def _schedule(self, user_id: int, fn, *args):
+        """Espera el turno del usuario en el scheduler y ejecuta `fn` en el pool de inferencia."""
+        start = time.perf_counter()
         try:
-            return self.repository.get_by_user(user_id)
+            with tracing.span("analyze"):  # incluye la espera de turno y de hilo libre
+                if self.scheduler is None:
+                    return await self._run_blocking(fn, *args)
+                async with self.scheduler.slot(user_id):
+                    return await self._run_blocking(fn, *args)
+        finally:
+            admission.record_service_time(time.perf_counter() - start)  # muestra del limitador
+
+    async def _run_blocking(self, fn, *args):
+        """Ejecuta `fn` en el pool de inferencia sin bloquear el event loop."""
+        if self._executor is None:
+            if self.remote is not None:
+                workers, prefix = self.settings.REMOTE_MAX_INFLIGHT, "remote-wait"
+            else:
+                workers, prefix = self.settings.INFERENCE_THREADS, "inference"
+            self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix=prefix)
+        ctx = contextvars.copy_context()
+        loop = asyncio.get_running_loop()
+        self._queued += 1
+        metrics.set_gauge("inference_queue", self._queued)
+        try:
+            return await loop.run_in_executor(self._executor, functools.partial(ctx.run, _call_profiled, fn, *args))
+        finally:
+            self._queued -= 1
+            metrics.set_gauge("inference_queue", self._queued)
+
+    def _analyze_file(self, filepath: str) -> AudioAnalysis:
+        """Decodificación + inferencia (bloqueante, se ejecuta fuera del event loop)."""
+        with memory.track_peak("predict"):
+            return self._decode_and_analyze(filepath)
+
+    def _decode_and_analyze(self, filepath: str) -> AudioAnalysis:
+        max_seconds = self.settings.MAX_AUDIO_SECONDS
+
+        with tracing.span("decode"):
+            # Detectar sample rate original
+            try:
+                with sf.SoundFile(filepath) as f:
+                    sr_original = f.samplerate
+            except RuntimeError:
+                raise HTTPException(status_code=400, detail=INVALID_AUDIO_DETAIL)
+
+            # Cargar audio (hasta MAX_AUDIO_SECONDS) a su sample rate original
+            signal, sr = librosa.load(filepath, sr=None, mono=True, duration=max_seconds)
+
+        # Normalizar a 16kHz si es necesario (mismo remuestreo que librosa.load(sr=16000))
+        if sr != 16000:
+            with tracing.span("resample"):
+                signal = librosa.resample(signal, orig_sr=sr, target_sr=16000)
+        memory.sample()
+        return self._analyze_signal(signal)
+
+    def _analyze_pcm(self, body: bytearray, fmt: PcmFormat) -> AudioAnalysis:
+        with memory.track_peak("predict"):
+            with tracing.span("decode"):
+                signal = pcm_to_signal(body, fmt)
+            memory.sample()
+            return self._analyze_signal(signal)
+
+    def _analyze_signal(self, signal: np.ndarray) -> AudioAnalysis:
+        """Silencio + inferencia por etapas sobre una señal mono a 16 kHz."""
+        # Validación de silencio
+        if is_silent(signal):
+            raise HTTPException(status_code=400, detail="El audio está vacío o contiene solo silencio.")
+
+        # ⏱ Tiempo de inicio
+        start_time = datetime.now(timezone.utc)
+
+        # Inferencia por etapas (pre-clasificador -> prefijo -> ventana completa)
+        with tracing.span("inference"):
+            prediction, stage, embedding = self._run_inference(signal)
+
+        # ⏱ Tiempo de fin
+        end_time = datetime.now(timezone.utc)
+        metrics.inc(f"inference_stage_{stage}")
+
+        # Casi-duplicado de un clip ya analizado -> se reutiliza su veredicto
+        duplicate = self._near_duplicate(embedding)
+        if duplicate is not None:
+            prediction = 1 if duplicate[2] == "falso" else 0
+
+        return AudioAnalysis(
+            prediction=prediction,
+            start_time=start_time,
+            end_time=end_time,
+            inference_duration=(end_time - start_time).total_seconds(),
+            embedding=embedding,
+            stage=stage,
+        )
+
+    def _run_inference(self, signal: np.ndarray) -> Tuple[int, str, Optional[np.ndarray]]:
+        if self.remote is not None:
+            try:
+                return self.remote.infer(signal)
+            except RemoteInferenceError as e:
+                if self.model is None or not self.settings.REMOTE_FALLBACK_LOCAL:
+                    log.error("remote inference: %s", e)
+                    raise HTTPException(status_code=503, detail="Servicio de inferencia no disponible")
+                metrics.inc("remote_inference_fallback")
+            with self._local_slots:
+                return self.infer_signal(signal)
+        return self.infer_signal(signal)
+
+    def infer_signal(self, signal: np.ndarray) -> Tuple[int, str, Optional[np.ndarray]]:
+        """Inferencia local: (predicción, etapa, embedding). Es lo que ejecutan los workers remotos."""
+        with self._reserve_memory(signal.shape[0]):
+            prediction, stage = self._staged_prediction(signal)
+        # Solo los embeddings de la ventana completa son comparables entre sí
+        embedding = self._take_embedding()
+        if stage != "full":
+            embedding = None
+        return prediction, stage, embedding
+
+    def _reserve_memory(self, samples: int):
+        if self.memory_budget is None:
+            return contextlib.nullcontext()
+        return self.memory_budget.reserve(estimate_request_bytes(samples, self.settings.MEMORY_BYTES_PER_SAMPLE))
+
+    def _infer(self, signal: np.ndarray, model=None):
+        length = None
+        if self.buckets is not None:
+            length = self.buckets.bucket_for(signal.shape[0])
+            self.buckets.record(signal.shape[0], length)
+        with tracing.span("features"):
+            inputs = self.features.prepare(signal, length)
+        memory.sample()
+        with tracing.span("forward"), profiling.torch_section(), torch.inference_mode():
+            logits = (model if model is not None else self.model)(**inputs).logits
+        memory.sample()
+        return logits
+
+    def warmup(self) -> None:
+        """Un forward por bucket (y modelo) al arrancar: la primera petición real no paga la
+        reserva de memoria ni la selección de kernels de cada forma."""
+        if self.model is None:
+            return
+        sizes = self.buckets.sizes if self.buckets is not None else []
+        models = [("full", self.model)] + ([("fast", self.fast_model)] if self.fast_model is not None else [])
+        rng = np.random.default_rng(0)
+        for size in sizes:
+            signal = (rng.standard_normal(size) * 0.1).astype(np.float32)
+            for name, model in models:
+                t0 = time.perf_counter()
+                inputs = self.features.prepare(signal, size)
+                with torch.inference_mode():
+                    model(**inputs)
+                metrics.set_gauge(f"warmup_ms_{name}_{self.buckets.label(size)}",
+                                  round((time.perf_counter() - t0) * 1000, 1))
+        self._take_embedding()  # descarta lo capturado por el hook
+
+    def predict_batch(self, signals: List[np.ndarray]) -> List[int]:
+        """Predicción por lotes (uso offline): misma normalización y modelo que predict_audio."""
+        length = None
+        if self.buckets is not None:
+            length = self.buckets.bucket_for(max(s.shape[0] for s in signals))
+            for s in signals:
+                self.buckets.record(s.shape[0], length)
+        inputs = self.features.prepare_batch(signals, length)
+        with torch.inference_mode():
+            logits = self.model(**inputs).logits
+        self._take_embedding()  # el hook captura el lote; aquí no se indexa
+        return torch.argmax(logits, dim=1).tolist()
+
+    def _use_fast_mode(self) -> bool:
+        if self.fast_model is None:
+            return False
+        if self.settings.FAST_MODE == "always":
+            return True
+        pending = self._queued + (self.scheduler.waiting if self.scheduler is not None else 0)
+        return self.settings.FAST_MODE == "auto" and pending > self.settings.FAST_MODE_QUEUE_DEPTH
+
+    def _staged_prediction(self, signal: np.ndarray) -> Tuple[int, str]:
+        """Devuelve (predicción, etapa que la resolvió): prefilter | prefix | fast | full."""
+        if self.cascade is not None:
+            try:
+                with tracing.span("prefilter"):
+                    verdict = self.cascade.decide(signal, 16000)
+            except Exception as e:
+                log.error("cascade: %s", e)
+                verdict = None
+            if verdict is not None:
+                return verdict, "prefilter"
+
+        fast = self._use_fast_mode()
+        model = self.fast_model if fast else self.model
+
+        # Salida temprana: prefijo corto y, si el margen es pequeño, ventana completa
+        prefix_seconds = self.settings.EARLY_EXIT_SECONDS
+        if prefix_seconds and signal.shape[0] > int(prefix_seconds * 16000):
+            logits = self._infer(signal[: int(prefix_seconds * 16000)], model)
+            if logit_margin(logits[0]) >= self.settings.EARLY_EXIT_MARGIN:
+                return torch.argmax(logits, dim=1).item(), "prefix"
+
+        logits = self._infer(signal, model)
+        # probs = torch.softmax(logits, dim=1)  # disponible si lo necesitas
+        return torch.argmax(logits, dim=1).item(), "fast" if fast else "full"
+
+    def _near_duplicate(self, embedding: Optional[np.ndarray]):
+        # opt-in: sustituye el veredicto del modelo por el de otro audio (posiblemente de otro usuario)
+        if not self.settings.NEAR_DUPLICATE_REUSE or embedding is None or self.embedding_index is None:
+            return None
+        try:
+            neighbors = self.embedding_index.query(embedding, k=1)
         except Exception as e:
-            print(f"[ERROR] get_audios_by_user: {e}")
-            raise
+            log.error("near-duplicate lookup: %s", e)
+            return None
+        if neighbors and neighbors[0][1] <= self.settings.NEAR_DUPLICATE_DISTANCE:
+            metrics.inc("near_duplicate_hits")
+            return neighbors[0]
+        return None
 
-    # (Opcional) si quieres filtrar por usuario y dispositivo
-    def get_audios_by_user_and_device(self, user_id: int, device_id: str) -> List[Audio]:
+    def _store_embedding(self, audio: Audio, embedding: Optional[np.ndarray]) -> None:
+        # No es crítico: un fallo aquí no invalida la predicción ya guardada
+        if embedding is None or self.embeddings is None:
+            return
         try:
-            if hasattr(self.repository, "get_by_user_and_device"):
-                return self.repository.get_by_user_and_device(user_id, device_id)  # type: ignore[attr-defined]
-            # Fallback simple si no implementaste el método en el repo
-            return [a for a in self.repository.get_by_user(user_id) if a.device_id == device_id]
+            self.embeddings.save(AudioEmbedding(
+                audio_id=audio.id,
+                result=audio.result,
+                dim=int(embedding.shape[0]),
+                vector=embedding.astype("<f4").tobytes(),
+            ))
+            if self.embedding_index is not None:
+                self.embedding_index.add(audio.id, embedding, audio.result)
         except Exception as e:
-            print(f"[ERROR] get_audios_by_user_and_device: {e}")
-            raise
+            log.error("storing embedding: %s", e)
@@ -0,0 +1,137 @@
+# app/application/audio_upload.py
+"""Recepción de subidas de audio por bloques con detección temprana de formato.
+
+El contenedor se identifica con los primeros bytes y lo que se copia al
+temporal de análisis se corta al llegar al límite de bytes o, en WAV, en
+cuanto se tiene el audio necesario (MAX_AUDIO_SECONDS). Ojo: `UploadFile`
+ya viene volcado por el parser multipart de Starlette; el tamaño de la
+subida en sí lo limita `UploadLimitMiddleware` antes de recibirla entera.
+"""
+import hashlib
+import os
+import struct
+import tempfile
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import UploadFile, HTTPException
+
+INVALID_AUDIO_DETAIL = "El archivo de audio está dañado o no es válido."
+TOO_LARGE_DETAIL = "El archivo supera el tamaño máximo permitido."
+
+# Bytes mínimos para reconocer cualquiera de los contenedores soportados
+SNIFF_BYTES = 12
+
+
+@dataclass
+class WavLayout:
+    data_offset: int      # offset del identificador "data"
+    data_size: int        # tamaño declarado del bloque de datos
+    sample_rate: int
+    block_align: int
+
+
+@dataclass
+class StoredUpload:
+    path: str
+    container: str
+    size: int             # bytes escritos en disco
+    truncated: bool       # se cortó al alcanzar la duración de análisis
+    digest: str           # sha256 de los bytes recibidos (antes de ajustar la cabecera)
+
+
+def sniff_container(head: bytes) -> Optional[str]:
+    """Identifica el contenedor por su firma; None si no es un formato soportado."""
+    if len(head) < SNIFF_BYTES:
+        return None
+    if head[:4] in (b"RIFF", b"RF64") and head[8:12] == b"WAVE":
+        return "wav"
+    if head[:4] == b"fLaC":
+        return "flac"
+    if head[:4] == b"OggS":
+        return "ogg"
+    if head[:4] == b"FORM" and head[8:12] in (b"AIFF", b"AIFC"):
+        return "aiff"
+    if head[:3] == b"ID3" or (head[0] == 0xFF and (head[1] & 0xE0) == 0xE0):
+        return "mp3"
+    return None
+
+
+def parse_wav_header(head: bytes) -> Optional[WavLayout]:
+    """Recorre los chunks RIFF hasta "data". None si no están en `head`."""
+    if head[:4] != b"RIFF":
+        return None
+    pos, sample_rate, block_align = 12, None, None
+    while pos + 8 <= len(head):
+        chunk_id = head[pos:pos + 4]
+        (size,) = struct.unpack_from("<I", head, pos + 4)
+        if chunk_id == b"fmt " and pos + 8 + 16 <= len(head):
+            _, _, sample_rate, _, block_align = struct.unpack_from("<HHIIH", head, pos + 8)
+        elif chunk_id == b"data":
+            if not sample_rate or not block_align:
+                return None
+            return WavLayout(pos, size, sample_rate, block_align)
+        pos += 8 + size + (size & 1)  # los chunks se alinean a 2 bytes
+    return None
+
+
+def wav_bytes_needed(layout: WavLayout, max_seconds: float) -> int:
+    """Bytes del archivo (cabecera incluida) que cubren `max_seconds` de audio."""
+    frames = int(max_seconds * layout.sample_rate + 0.5)
+    data = frames * layout.block_align
+    if 0 < layout.data_size < data:
+        data = layout.data_size
+    return layout.data_offset + 8 + data
+
+
+def _patch_wav_sizes(fh, layout: WavLayout, total: int) -> None:
+    """Ajusta los tamaños RIFF/data tras truncar para que el WAV sea coherente."""
+    fh.seek(4)
+    fh.write(struct.pack("<I", total - 8))
+    fh.seek(layout.data_offset + 4)
+    fh.write(struct.pack("<I", total - layout.data_offset - 8))
+
+
+async def receive_upload(
+    file: UploadFile,
+    max_bytes: int,
+    max_seconds: float,
+    chunk_size: int = 64 * 1024,
+) -> StoredUpload:
+    """Lee la subida por bloques a un archivo temporal con memoria acotada."""
+    head = await file.read(max(chunk_size, SNIFF_BYTES))
+    container = sniff_container(head)
+    if container is None:
+        raise HTTPException(status_code=400, detail=INVALID_AUDIO_DETAIL)
+
+    limit = max_bytes
+    layout = parse_wav_header(head) if container == "wav" else None
+    if layout is not None:
+        limit = min(limit, wav_bytes_needed(layout, max_seconds))
+
+    fd, path = tempfile.mkstemp(suffix=f".{container}")
+    written, truncated = 0, False
+    sha = hashlib.sha256()
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            chunk = head
+            while chunk:
+                if written + len(chunk) > limit:
+                    if layout is None:
+                        # sin cabecera interpretable no se puede cortar con seguridad
+                        raise HTTPException(status_code=413, detail=TOO_LARGE_DETAIL)
+                    fh.write(chunk[:limit - written])
+                    sha.update(chunk[:limit - written])
+                    written = limit
+                    truncated = True
+                    break
+                fh.write(chunk)
+                sha.update(chunk)
+                written += len(chunk)
+                chunk = await file.read(chunk_size)
+            if truncated:
+                _patch_wav_sizes(fh, layout, written)
+    except BaseException:
+        os.remove(path)
+        raise
+    return StoredUpload(path=path, container=container, size=written, truncated=truncated, digest=sha.hexdigest())
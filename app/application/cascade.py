@@ -0,0 +1,116 @@
+# app/application/cascade.py
+"""Inferencia en cascada: pre-clasificador espectral barato + salida temprana.
+
+Etapa 1: un modelo de scikit-learn sobre features espectrales (un solo STFT)
+resuelve los clips con probabilidad clara; solo los dudosos pasan a Wav2Vec2.
+Etapa 2 (opcional): Wav2Vec2 sobre un prefijo corto; si el margen entre
+logits es pequeño se repite con la ventana completa.
+"""
+import logging
+import os
+from typing import Optional
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+N_FFT = 512
+HOP = 256
+N_MFCC = 20
+
+
+def spectral_features(signal: np.ndarray, sr: int = 16000) -> np.ndarray:
+    """Vector fijo (float32) de estadísticos espectrales a partir de un único STFT."""
+    import librosa
+
+    signal = np.asarray(signal, dtype=np.float32)
+    if signal.shape[0] < N_FFT:
+        signal = np.pad(signal, (0, N_FFT - signal.shape[0]))
+    power = np.abs(librosa.stft(signal, n_fft=N_FFT, hop_length=HOP)) ** 2
+    mel = librosa.feature.melspectrogram(S=power, sr=sr, n_mels=40)
+    mfcc = librosa.feature.mfcc(S=librosa.power_to_db(mel), n_mfcc=N_MFCC)
+    magnitude = np.sqrt(power)
+    frames = [
+        librosa.feature.spectral_centroid(S=magnitude, sr=sr, n_fft=N_FFT),
+        librosa.feature.spectral_bandwidth(S=magnitude, sr=sr, n_fft=N_FFT),
+        librosa.feature.spectral_rolloff(S=magnitude, sr=sr, n_fft=N_FFT),
+        librosa.feature.spectral_flatness(S=magnitude),
+        librosa.feature.zero_crossing_rate(signal, frame_length=N_FFT, hop_length=HOP),
+        librosa.feature.rms(S=magnitude, frame_length=N_FFT),
+    ]
+    stats = [mfcc.mean(axis=1), mfcc.std(axis=1)]
+    for f in frames:
+        stats.append([f.mean(), f.std()])
+    return np.concatenate([np.ravel(s) for s in stats]).astype(np.float32)
+
+
+def logit_margin(logits) -> float:
+    """Diferencia entre el logit mayor y el segundo (confianza del veredicto)."""
+    top = np.sort(np.asarray(logits, dtype=np.float64).ravel())
+    return float(top[-1] - top[-2])
+
+
+class CascadeClassifier:
+    """Pre-clasificador espectral. Devuelve veredicto solo fuera de la banda de duda."""
+
+    def __init__(self, estimator, fake_below: float = 0.05, fake_above: float = 0.95):
+        self.estimator = estimator
+        # P(falso) <= fake_below -> real ; P(falso) >= fake_above -> falso
+        self.fake_below = fake_below
+        self.fake_above = fake_above
+
+    @staticmethod
+    def new_estimator():
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.pipeline import make_pipeline
+        from sklearn.preprocessing import StandardScaler
+
+        return make_pipeline(StandardScaler(), LogisticRegression(max_iter=1000, class_weight="balanced"))
+
+    @classmethod
+    def train(cls, features: np.ndarray, labels: np.ndarray, **thresholds) -> "CascadeClassifier":
+        estimator = cls.new_estimator()
+        estimator.fit(features, labels)
+        return cls(estimator, **thresholds)
+
+    def fake_probability(self, features: np.ndarray) -> np.ndarray:
+        features = np.atleast_2d(features)
+        classes = list(self.estimator.classes_)
+        if 1 not in classes:
+            return np.zeros(features.shape[0])
+        return self.estimator.predict_proba(features)[:, classes.index(1)]
+
+    def decide(self, signal: np.ndarray, sr: int = 16000) -> Optional[int]:
+        """1 = falso, 0 = real, None = dudoso (hay que pasar a Wav2Vec2)."""
+        p_fake = float(self.fake_probability(spectral_features(signal, sr))[0])
+        if p_fake <= self.fake_below:
+            return 0
+        if p_fake >= self.fake_above:
+            return 1
+        return None
+
+    def save(self, path: str) -> None:
+        import joblib
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        joblib.dump(self.estimator, path)
+
+    @classmethod
+    def load(cls, path: str, **thresholds) -> "CascadeClassifier":
+        import joblib
+
+        return cls(joblib.load(path), **thresholds)
+
+
+def load_cascade(settings) -> Optional[CascadeClassifier]:
+    """Pre-clasificador configurado en Settings; None si está desactivado o no entrenado."""
+    if not settings.CASCADE_ENABLED:
+        return None
+    if not os.path.exists(settings.CASCADE_MODEL_PATH):
+        log.warning("CASCADE_ENABLED pero no existe %s; se usa solo Wav2Vec2", settings.CASCADE_MODEL_PATH)
+        return None
+    return CascadeClassifier.load(
+        settings.CASCADE_MODEL_PATH,
+        fake_below=settings.CASCADE_FAKE_BELOW,
+        fake_above=settings.CASCADE_FAKE_ABOVE,
+    )
@@ -0,0 +1,204 @@
+# app/application/fair_scheduler.py
+"""Reparto justo de la inferencia entre usuarios.
+
+- Token bucket por usuario: exceso de ritmo -> 429 con Retry-After. Los
+  buckets que ya se rellenaron del todo se descartan (uno nuevo es idéntico),
+  así que solo se guardan los de usuarios activos.
+- Colas por usuario atendidas con deficit round-robin (peso = peticiones por
+  turno), con límite de concurrencia y de cola por usuario.
+
+Métricas: totales (`scheduler_queue_depth`, `scheduler_in_use`,
+`scheduler_users_queued`) y el desglose `scheduler_queue_depth_by_user` con
+solo los `top_users` usuarios con más cola (número de series acotado).
+
+Todo se ejecuta en el event loop (sin locks): las colas solo se tocan desde
+corutinas y callbacks del mismo loop.
+"""
+import asyncio
+import heapq
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Callable, Deque, Dict, Optional
+
+from fastapi import HTTPException
+
+from app.infrastructure.metrics import metrics
+
+
+def too_many_requests(detail: str, retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._tokens = burst
+        self._stamp = clock()
+
+    def take(self) -> float:
+        """Consume un token. Devuelve 0 si había, o los segundos hasta el próximo."""
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def is_full(self, now: float) -> bool:
+        return self._tokens + (now - self._stamp) * self.rate >= self.burst
+
+
+class FairScheduler:
+    def __init__(
+        self,
+        slots: int,
+        max_concurrency_per_user: int = 2,
+        max_queued_per_user: int = 8,
+        rate_per_user: Optional[float] = None,
+        burst_per_user: float = 10,
+        weights: Optional[Dict[int, int]] = None,
+        clock: Callable[[], float] = time.monotonic,
+        top_users: int = 10,
+    ):
+        self.slots = slots
+        self.max_concurrency = max_concurrency_per_user
+        self.max_queued = max_queued_per_user
+        self.rate = rate_per_user
+        self.burst = burst_per_user
+        self.weights = weights or {}
+        self.top_users = top_users
+        self._clock = clock
+        self._buckets: Dict[int, TokenBucket] = {}
+        self._swept_at = clock()
+        self._queues: Dict[int, Deque[asyncio.Future]] = {}
+        self._active: Dict[int, int] = {}
+        self._deficit: Dict[int, int] = {}
+        self._ring: Deque[int] = deque()        # usuarios con trabajo en cola, en orden de turno
+        self._in_use = 0
+
+    # ---------------- Admisión ----------------
+    def check_rate(self, user_id: int) -> None:
+        """Token bucket del usuario; se llama al entrar la petición (antes de leer el cuerpo)."""
+        if not self.rate:
+            return
+        self._sweep_buckets()
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = self._buckets[user_id] = TokenBucket(self.rate, self.burst, self._clock)
+        wait = bucket.take()
+        if wait:
+            metrics.inc("scheduler_rejected_rate")
+            raise too_many_requests("Demasiadas peticiones, espera antes de reintentar", wait)
+
+    def _sweep_buckets(self) -> None:
+        # como mucho una pasada por periodo de recarga completa (burst / rate)
+        now = self._clock()
+        if now - self._swept_at < self.burst / self.rate:
+            return
+        self._swept_at = now
+        for user_id in [u for u, b in self._buckets.items() if b.is_full(now)]:
+            del self._buckets[user_id]
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def queue_depth(self, user_id: int) -> int:
+        return len(self._queues.get(user_id, ()))
+
+    @asynccontextmanager
+    async def slot(self, user_id: int):
+        """Espera turno de inferencia para `user_id` y lo libera al salir."""
+        queue = self._queues.setdefault(user_id, deque())
+        if len(queue) >= self.max_queued:
+            metrics.inc("scheduler_rejected_queue")
+            raise too_many_requests("Tienes demasiados audios en cola", 1)
+
+        waiter = asyncio.get_running_loop().create_future()
+        queue.append(waiter)
+        if user_id not in self._ring:
+            self._ring.append(user_id)
+        self._dispatch()
+        self._publish(user_id)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release(user_id)  # se concedió justo antes de cancelar
+            else:
+                self._discard(user_id, waiter)
+            raise
+        try:
+            yield
+        finally:
+            self._release(user_id)
+
+    # ---------------- Reparto (deficit round-robin) ----------------
+    def _dispatch(self) -> None:
+        while self._in_use < self.slots and self._ring:
+            if not self._grant_next():
+                return
+
+    def _grant_next(self) -> bool:
+        for _ in range(len(self._ring)):
+            user_id = self._ring[0]
+            queue = self._queues.get(user_id)
+            while queue and queue[0].done():      # esperas canceladas
+                queue.popleft()
+            if not queue:
+                self._ring.popleft()
+                self._deficit.pop(user_id, None)
+                continue
+            if self._active.get(user_id, 0) >= self.max_concurrency:
+                self._ring.rotate(-1)
+                continue
+            if self._deficit.get(user_id, 0) < 1:
+                self._deficit[user_id] = self._deficit.get(user_id, 0) + self.weights.get(user_id, 1)
+            self._deficit[user_id] -= 1
+            queue.popleft().set_result(None)
+            self._active[user_id] = self._active.get(user_id, 0) + 1
+            self._in_use += 1
+            if not queue:
+                self._ring.popleft()
+                self._deficit.pop(user_id, None)
+            elif self._deficit[user_id] < 1:
+                self._ring.rotate(-1)             # agotó su turno
+            self._publish(user_id)
+            return True
+        return False
+
+    def _release(self, user_id: int) -> None:
+        self._in_use -= 1
+        self._active[user_id] -= 1
+        if not self._active[user_id]:
+            del self._active[user_id]
+        self._dispatch()
+        self._publish(user_id)
+
+    def _discard(self, user_id: int, waiter: asyncio.Future) -> None:
+        queue = self._queues.get(user_id)
+        if queue and waiter in queue:
+            queue.remove(waiter)
+        self._publish(user_id)
+
+    def top_queues(self) -> Dict[str, int]:
+        """Los `top_users` usuarios con más trabajos en cola (clave = id como texto)."""
+        depths = ((user, len(q)) for user, q in self._queues.items() if q)
+        return {str(user): depth for user, depth in heapq.nlargest(self.top_users, depths, key=lambda item: item[1])}
+
+    def _publish(self, user_id: int) -> None:
+        if not self.queue_depth(user_id) and not self._active.get(user_id):
+            self._queues.pop(user_id, None)
+        metrics.set_gauge("scheduler_queue_depth", self.waiting)
+        metrics.set_gauge("scheduler_in_use", self._in_use)
+        metrics.set_gauge("scheduler_users_queued", len(self._queues))
+        metrics.set_breakdown("scheduler_queue_depth_by_user", self.top_queues())
@@ -0,0 +1,108 @@
+# app/application/feature_preparation.py
+"""Normalización vectorizada equivalente a Wav2Vec2FeatureExtractor.
+
+Sustituye `processor(signal, sampling_rate=sr, return_tensors="pt", padding=True)`
+en el camino caliente: copia las señales en buffers float32 reutilizables
+(uno por hilo) y normaliza media cero / varianza unitaria en bloque.
+"""
+import threading
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import torch
+
+_EPS = 1e-7
+
+
+class FeaturePreparer:
+    def __init__(
+        self,
+        do_normalize: bool = True,
+        padding_value: float = 0.0,
+        return_attention_mask: bool = False,
+        sampling_rate: int = 16000,
+    ):
+        self.do_normalize = do_normalize
+        self.padding_value = padding_value
+        self.return_attention_mask = return_attention_mask
+        self.sampling_rate = sampling_rate
+        self._local = threading.local()
+
+    @classmethod
+    def from_processor(cls, processor) -> "FeaturePreparer":
+        """Copia la configuración del feature extractor del processor de HF."""
+        fe = getattr(processor, "feature_extractor", processor)
+        return cls(
+            do_normalize=bool(getattr(fe, "do_normalize", True)),
+            padding_value=float(getattr(fe, "padding_value", 0.0)),
+            return_attention_mask=bool(getattr(fe, "return_attention_mask", False)),
+            sampling_rate=int(getattr(fe, "sampling_rate", 16000)),
+        )
+
+    def _buffers(self, rows: int, cols: int):
+        """Buffers del hilo actual, ampliados solo cuando no alcanzan."""
+        values = getattr(self._local, "values", None)
+        if values is None or values.shape[0] < rows or values.shape[1] < cols:
+            r = max(rows, values.shape[0] if values is not None else 0)
+            c = max(cols, values.shape[1] if values is not None else 0)
+            self._local.values = torch.empty((r, c), dtype=torch.float32)
+            self._local.mask = torch.empty((r, c), dtype=torch.int32)
+            self._local.stats = torch.empty((r, 1), dtype=torch.float32)
+        local = self._local
+        return local.values[:rows, :cols], local.mask[:rows, :cols], local.stats[:rows]
+
+    def prepare(self, signal: np.ndarray, length: Optional[int] = None) -> Dict[str, torch.Tensor]:
+        return self.prepare_batch([signal], length)
+
+    def prepare_batch(self, signals: Sequence[np.ndarray], length: Optional[int] = None) -> Dict[str, torch.Tensor]:
+        """Devuelve `input_values` (y `attention_mask`) como vistas de los buffers.
+
+        Con `length` (bucket) todas las filas miden exactamente eso: se recorta
+        lo que sobra y se rellena lo que falta, siempre con attention mask.
+
+        Las vistas se sobrescriben en la siguiente llamada del mismo hilo:
+        hay que consumirlas (forward del modelo) antes de preparar otro lote.
+        """
+        lengths = [int(np.shape(s)[-1]) for s in signals]
+        if length is not None:
+            lengths = [min(n, length) for n in lengths]
+        rows, cols = len(signals), length or max(lengths)
+        values, mask, stats = self._buffers(rows, cols)
+
+        for i, (s, n) in enumerate(zip(signals, lengths)):
+            values[i, :n].copy_(torch.from_numpy(np.ascontiguousarray(s[..., :n], dtype=np.float32)))
+            if n < cols:
+                values[i, n:].fill_(self.padding_value)
+
+        padded = any(n < cols for n in lengths)
+        with_mask = self.return_attention_mask or length is not None
+        if with_mask:
+            mask.fill_(1)
+            if padded:
+                for i, n in enumerate(lengths):
+                    mask[i, n:] = 0
+
+        if self.do_normalize:
+            if with_mask and padded:
+                self._normalize_masked(values, mask, stats, lengths)
+            else:
+                # mismo criterio que HF: sin attention mask se normaliza la fila completa
+                torch.mean(values, dim=1, keepdim=True, out=stats)
+                values.sub_(stats)
+                stats.copy_(torch.linalg.vecdot(values, values).unsqueeze(1)).div_(cols)
+                values.div_(stats.add_(_EPS).sqrt_())
+
+        out = {"input_values": values}
+        if with_mask:
+            out["attention_mask"] = mask
+        return out
+
+    def _normalize_masked(self, values, mask, stats, lengths) -> None:
+        n = torch.tensor(lengths, dtype=torch.float32).unsqueeze(1)
+        valid = mask.bool()
+        values.masked_fill_(~valid, 0.0)
+        torch.sum(values, dim=1, keepdim=True, out=stats)
+        values.sub_(stats.div_(n)).masked_fill_(~valid, 0.0)
+        stats.copy_(torch.linalg.vecdot(values, values).unsqueeze(1)).div_(n)
+        values.div_(stats.add_(_EPS).sqrt_())
+        values.masked_fill_(~valid, self.padding_value)
@@ -0,0 +1,165 @@
+# app/application/history_cache.py
+"""Caché en memoria del historial por usuario (GET /audios).
+
+- LRU acotada por filas totales (y por filas de un mismo usuario: historiales
+  enormes no se cachean) con caducidad por TTL.
+- `on_saved` inserta el audio recién guardado en la página cacheada del
+  usuario, en su posición (created, id descendente: el orden de
+  `get_by_user`), en lugar de tirarla. Con guardados concurrentes el último
+  en llegar no tiene por qué ser el más reciente.
+- Validación opcional con un marcador barato (nº de filas, id máximo): detecta
+  escrituras de otros procesos (nodos de inferencia, archivado) sin traer
+  el historial completo.
+- ETag derivado del contenido: igual en todos los workers para los mismos
+  datos; con If-None-Match coincidente se responde 304 sin serializar.
+"""
+import bisect
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, List, Optional, Tuple
+
+from app.domain.models.audio import Audio
+from app.infrastructure.metrics import metrics
+
+Marker = Tuple[int, int]  # (filas, id máximo)
+
+
+def history_etag(audios: List[Audio]) -> str:
+    digest = hashlib.blake2b(digest_size=12)
+    for a in audios:
+        digest.update(f"{a.id}:{a.result}:{a.authenticity_score}:{a.inference_duration}|".encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [t.strip() for t in if_none_match.split(",")]
+    # comparación débil (RFC 9110): W/"x" equivale a "x"
+    return "*" in candidates or any(t.removeprefix("W/") == etag for t in candidates)
+
+
+def _order_key(audio: Audio) -> Tuple[datetime, int]:
+    """Clave ascendente del orden del historial (la página va en orden inverso)."""
+    created = audio.created
+    if created.tzinfo is not None:  # SQLite devuelve fechas naive en UTC
+        created = created.astimezone(timezone.utc).replace(tzinfo=None)
+    return created, audio.id or 0
+
+
+def marker_of(audios: List[Audio]) -> Marker:
+    return len(audios), max((a.id or 0 for a in audios), default=0)
+
+
+@dataclass
+class HistoryPage:
+    audios: List[Audio]
+    etag: str
+    marker: Marker
+    stored_at: float = 0.0
+    body: Optional[bytes] = field(default=None, repr=False)  # JSON ya serializado (se rellena al servirlo)
+
+    @classmethod
+    def build(cls, audios: List[Audio], stored_at: float = 0.0) -> "HistoryPage":
+        return cls(audios, history_etag(audios), marker_of(audios), stored_at)
+
+
+class HistoryCache:
+    def __init__(
+        self,
+        max_rows: int = 50_000,
+        max_rows_per_user: int = 2_000,
+        ttl: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_rows = max_rows
+        self.max_rows_per_user = max_rows_per_user
+        self.ttl = ttl
+        self._clock = clock
+        self._pages: "OrderedDict[int, HistoryPage]" = OrderedDict()
+        self._rows = 0
+        self._hits = 0
+        self._lookups = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    @property
+    def rows(self) -> int:
+        return self._rows
+
+    def get(self, user_id: int, marker: Optional[Marker] = None) -> Optional[HistoryPage]:
+        """Página cacheada si sigue vigente (TTL y, si se pasa, mismo marcador)."""
+        with self._lock:
+            self._lookups += 1
+            page = self._pages.get(user_id)
+            if page is not None and self._clock() - page.stored_at > self.ttl:
+                self._drop(user_id)
+                page = None
+            if page is not None and marker is not None and marker != page.marker:
+                metrics.inc("history_cache_stale")
+                self._drop(user_id)
+                page = None
+            if page is None:
+                metrics.inc("history_cache_misses")
+            else:
+                self._pages.move_to_end(user_id)
+                self._hits += 1
+                metrics.inc("history_cache_hits")
+            metrics.set_gauge("history_cache_hit_rate", round(self._hits / self._lookups, 4))
+            return page
+
+    def put(self, user_id: int, audios: List[Audio]) -> HistoryPage:
+        page = HistoryPage.build(audios, self._clock())
+        with self._lock:
+            self._drop(user_id)
+            if len(audios) <= self.max_rows_per_user:
+                self._pages[user_id] = page
+                self._rows += len(audios)
+                self._evict()
+            self._publish()
+        return page
+
+    def on_saved(self, audio: Audio) -> None:
+        """Nuevo audio del usuario: se inserta en su posición de la página (la más reciente va primero)."""
+        with self._lock:
+            page = self._pages.get(audio.user_id)
+            if page is None or any(a.id == audio.id for a in page.audios):
+                return
+            # la página está en orden descendente: se busca sobre las claves invertidas
+            keys = [_order_key(a) for a in reversed(page.audios)]
+            pos = len(page.audios) - bisect.bisect(keys, _order_key(audio))
+            audios = page.audios[:pos] + [audio] + page.audios[pos:]
+            self._drop(audio.user_id)
+            if len(audios) <= self.max_rows_per_user:
+                self._pages[audio.user_id] = HistoryPage.build(audios, self._clock())
+                self._rows += len(audios)
+                self._evict()
+            metrics.inc("history_cache_updates")
+            self._publish()
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._drop(user_id)
+            self._publish()
+
+    # ---------------- Interno (con el lock tomado) ----------------
+    def _drop(self, user_id: int) -> None:
+        page = self._pages.pop(user_id, None)
+        if page is not None:
+            self._rows -= len(page.audios)
+
+    def _evict(self) -> None:
+        while self._rows > self.max_rows and self._pages:
+            _, page = self._pages.popitem(last=False)
+            self._rows -= len(page.audios)
+            metrics.inc("history_cache_evictions")
+
+    def _publish(self) -> None:
+        metrics.set_gauge("history_cache_users", len(self._pages))
+        metrics.set_gauge("history_cache_rows", self._rows)
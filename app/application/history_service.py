@@ -0,0 +1,118 @@
+# app/application/history_service.py
+"""Consulta del historial de audios analizados (sin dependencias de ML).
+
+Lo usan los nodos que solo sirven historial: no importa torch, transformers
+ni librosa. `AudioService` extiende esta clase para la parte de inferencia.
+"""
+import logging
+from datetime import date
+from typing import List, Optional
+
+import numpy as np
+from fastapi import HTTPException
+
+from app.application.history_cache import HistoryPage
+from app.domain.models.audio import Audio
+from app.domain.repositories.audio_repository import IAudioRepository
+from app.domain.repositories.embedding_repository import IEmbeddingRepository
+from app.domain.repositories.audio_archive_repository import IAudioArchiveRepository
+
+log = logging.getLogger(__name__)
+
+
+class HistoryService:
+    def __init__(
+        self,
+        repository: IAudioRepository,
+        embeddings: Optional[IEmbeddingRepository] = None,
+        embedding_index=None,
+        archive: Optional[IAudioArchiveRepository] = None,
+    ):
+        self.repository = repository
+        self.embeddings = embeddings
+        self.embedding_index = embedding_index
+        # Tablas de archivo mensuales + rollups diarios (opcional)
+        self.archive = archive
+
+    def get_audio(self, audio_id: int) -> Optional[Audio]:
+        """Tabla caliente y, si no está, el archivo (localizado por rango de ids)."""
+        audio = self.repository.get_by_id(audio_id)
+        if audio is None and self.archive is not None:
+            audio = self.archive.get_archived_by_id(audio_id)
+        return audio
+
+    def find_similar(self, audio_id: int, user_id: int, k: int = 5):
+        """Audios del usuario más cercanos (distancia coseno) a uno suyo."""
+        audio = self.get_audio(audio_id)
+        if not audio or audio.user_id != user_id:
+            raise HTTPException(status_code=404, detail="Audio no encontrado")
+        if self.embedding_index is None:
+            raise HTTPException(status_code=503, detail="Índice de embeddings no disponible")
+        vector = self.embedding_index.vector_of(audio_id)
+        if vector is None and self.embeddings is not None:
+            row = self.embeddings.get_by_audio_id(audio_id)
+            if row is not None:
+                vector = np.frombuffer(row.vector, dtype="<f4")
+        if vector is None:
+            raise HTTPException(status_code=404, detail="El audio no tiene embedding registrado")
+        # solo entre los audios del propio usuario: ids y veredictos ajenos no salen de aquí
+        own = [a.id for a in self.get_audios_by_user(user_id, include_archived=True)]
+        self._index_missing(own)
+        return self.embedding_index.query_among(vector, own, k=k, exclude=audio_id)
+
+    def _index_missing(self, audio_ids: List[int]) -> None:
+        """Añade al índice los embeddings de `audio_ids` guardados por otros procesos desde el último tick."""
+        missing = [a for a in audio_ids if a not in self.embedding_index]
+        if not missing or self.embeddings is None:
+            return
+        rows = self.embeddings.get_by_audio_ids(missing)
+        if rows:
+            vectors = np.stack([np.frombuffer(r.vector, dtype="<f4") for r in rows])
+            self.embedding_index.add_many([r.audio_id for r in rows], vectors, [r.result for r in rows])
+
+    def get_all_audios(self) -> List[Audio]:
+        try:
+            return self.repository.get_all()
+        except Exception as e:
+            log.error("get_all_audios: %s", e)
+            raise
+
+    def get_audios_by_user(self, user_id: int, include_archived: bool = False) -> List[Audio]:
+        try:
+            audios = list(self.repository.get_by_user(user_id))
+            if include_archived and self.archive is not None:
+                audios.extend(self.archive.get_archived_by_user(user_id))  # siempre más antiguos
+            return audios
+        except Exception as e:
+            log.error("get_audios_by_user: %s", e)
+            raise
+
+    def get_user_history(self, user_id: int, include_archived: bool = False) -> HistoryPage:
+        """Historial con su ETag; sale de la caché si el repositorio la tiene."""
+        try:
+            if not include_archived and hasattr(self.repository, "get_history_page"):
+                return self.repository.get_history_page(user_id)  # type: ignore[attr-defined]
+            return HistoryPage.build(self.get_audios_by_user(user_id, include_archived=include_archived))
+        except Exception as e:
+            log.error("get_user_history: %s", e)
+            raise
+
+    def get_daily_stats(self, user_id: int, since: Optional[date] = None, until: Optional[date] = None):
+        if self.archive is None:
+            raise HTTPException(status_code=503, detail="Estadísticas no disponibles")
+        try:
+            return self.archive.daily_stats(user_id, since, until)
+        except Exception as e:
+            log.error("get_daily_stats: %s", e)
+            raise
+
+    # (Opcional) si quieres filtrar por usuario y dispositivo
+    def get_audios_by_user_and_device(self, user_id: int, device_id: str) -> List[Audio]:
+        try:
+            if hasattr(self.repository, "get_by_user_and_device"):
+                return self.repository.get_by_user_and_device(user_id, device_id)  # type: ignore[attr-defined]
+            # Fallback simple si no implementaste el método en el repo
+            return [a for a in self.repository.get_by_user(user_id) if a.device_id == device_id]
+        except Exception as e:
+            log.error("get_audios_by_user_and_device: %s", e)
+            raise
@@ -0,0 +1,53 @@
+# app/application/length_buckets.py
+"""Longitudes fijas de entrada para la inferencia.
+
+Cada señal se rellena (o recorta, si supera el bucket mayor) a la longitud
+del bucket más pequeño que la contiene, con attention mask para que el
+relleno no cuente en la normalización, la atención ni el pooling. Así el
+modelo solo ve unas pocas formas: las cachés de kernels/grafos se
+reutilizan y los lotes mezclan clips de longitudes parecidas.
+
+Solo es exacto si el extractor de features normaliza por capa
+(`feat_extract_norm="layer"`, p. ej. wav2vec2-large/xlsr): con "group"
+(wav2vec2-base, el modelo por defecto) la GroupNorm de la primera
+convolución promedia sobre toda la secuencia, relleno incluido, y los logits
+cambian. `supports_padding` lo comprueba.
+
+Métricas: `bucket_<s>s` (peticiones por bucket), `bucket_padding_samples` /
+`bucket_input_samples` (relleno desperdiciado) y el gauge `bucket_padding_ratio`.
+"""
+import bisect
+from typing import List, Sequence
+
+from app.infrastructure.metrics import metrics
+
+
+def supports_padding(model) -> bool:
+    """True si el relleno con attention mask no altera los logits del modelo."""
+    return getattr(getattr(model, "config", None), "feat_extract_norm", None) == "layer"
+
+
+class LengthBuckets:
+    def __init__(self, seconds: Sequence[float], sampling_rate: int = 16000):
+        sizes = sorted({int(round(s * sampling_rate)) for s in seconds if s > 0})
+        if not sizes:
+            raise ValueError("LENGTH_BUCKETS_SECONDS necesita al menos una longitud positiva")
+        self.sizes: List[int] = sizes
+        self.sampling_rate = sampling_rate
+
+    def bucket_for(self, samples: int) -> int:
+        """Bucket más pequeño >= samples; si no cabe en ninguno, el mayor (se recorta)."""
+        i = bisect.bisect_left(self.sizes, samples)
+        return self.sizes[min(i, len(self.sizes) - 1)]
+
+    def label(self, size: int) -> str:
+        return f"{size / self.sampling_rate:g}s"
+
+    def record(self, samples: int, size: int) -> None:
+        metrics.inc(f"bucket_{self.label(size)}")
+        if samples > size:
+            metrics.inc("bucket_cropped")
+        metrics.inc("bucket_padding_samples", max(0, size - samples))
+        metrics.inc("bucket_input_samples", size)
+        total = metrics.counter("bucket_input_samples")
+        metrics.set_gauge("bucket_padding_ratio", round(metrics.counter("bucket_padding_samples") / total, 4))
@@ -0,0 +1,92 @@
+# app/application/pcm.py
+"""PCM crudo (sin contenedor) enviado por nuestros clientes.
+
+El cuerpo se acumula en un único bytearray (reservado según Content-Length,
+como mucho la duración de análisis) y se interpreta con `np.frombuffer`, sin
+archivo temporal ni decodificación.
+"""
+import hashlib
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+
+import numpy as np
+from fastapi import HTTPException
+
+SAMPLE_FORMATS = {"s16le": np.dtype("<i2"), "f32le": np.dtype("<f4")}
+MAX_CHANNELS = 8
+
+
+@dataclass
+class PcmFormat:
+    sample_format: str
+    sample_rate: int
+    channels: int
+
+    @property
+    def dtype(self) -> np.dtype:
+        return SAMPLE_FORMATS[self.sample_format]
+
+    @property
+    def frame_bytes(self) -> int:
+        return self.dtype.itemsize * self.channels
+
+    def validate(self) -> "PcmFormat":
+        if self.sample_format not in SAMPLE_FORMATS:
+            raise HTTPException(status_code=400, detail=f"X-Sample-Format debe ser uno de {', '.join(SAMPLE_FORMATS)}")
+        if not 8000 <= self.sample_rate <= 192000:
+            raise HTTPException(status_code=400, detail="X-Sample-Rate fuera de rango (8000-192000)")
+        if not 1 <= self.channels <= MAX_CHANNELS:
+            raise HTTPException(status_code=400, detail=f"X-Channels debe estar entre 1 y {MAX_CHANNELS}")
+        return self
+
+    def bytes_for(self, seconds: float) -> int:
+        return int(seconds * self.sample_rate + 0.5) * self.frame_bytes
+
+
+async def read_pcm_body(chunks: AsyncIterator[bytes], limit: int, expected: Optional[int] = None) -> bytearray:
+    """Lee el cuerpo hasta `limit` bytes (lo que exceda la duración de análisis se descarta).
+
+    Con `expected` (Content-Length) se reserva de una vez min(expected, limit);
+    sin él, o si el cliente envía más de lo anunciado, el buffer crece por bloques.
+    """
+    buf = bytearray(min(expected, limit) if expected and expected > 0 else 0)
+    size = 0
+    async for chunk in chunks:
+        take = min(len(chunk), limit - size)
+        end = size + take
+        if end > len(buf):
+            buf.extend(bytes(end - len(buf)))
+        buf[size:end] = chunk[:take]
+        size = end
+        if size >= limit:
+            break
+    del buf[size:]
+    return buf
+
+
+def pcm_digest(buf: bytearray, fmt: PcmFormat) -> str:
+    """Clave de coalescencia: contenido + formato declarado."""
+    h = hashlib.sha256(f"pcm:{fmt.sample_format}:{fmt.sample_rate}:{fmt.channels}:".encode())
+    h.update(buf)
+    return h.hexdigest()
+
+
+def pcm_to_signal(buf: bytearray, fmt: PcmFormat, target_sr: int = 16000) -> np.ndarray:
+    """Señal mono float32 a `target_sr`. Sin copias para f32le mono a 16 kHz."""
+    frames = len(buf) // fmt.frame_bytes
+    if frames == 0 or len(buf) % fmt.frame_bytes:
+        raise HTTPException(status_code=400, detail="El cuerpo no contiene un número entero de muestras PCM")
+    samples = np.frombuffer(buf, dtype=fmt.dtype, count=frames * fmt.channels)
+    if fmt.channels > 1:
+        samples = samples.reshape(frames, fmt.channels).mean(axis=1, dtype=np.float32)
+    else:
+        samples = samples.astype(np.float32, copy=False)  # f32le: vista del cuerpo
+    if fmt.sample_format == "s16le":
+        samples *= 1.0 / 32768.0  # ya es un array nuevo (astype / mean)
+    elif not np.isfinite(samples).all():
+        raise HTTPException(status_code=400, detail="El audio contiene valores no finitos")
+    if fmt.sample_rate != target_sr:
+        import librosa
+
+        samples = librosa.resample(samples, orig_sr=fmt.sample_rate, target_sr=target_sr)
+    return samples
@@ -0,0 +1,49 @@
+# app/application/reduced_depth.py
+"""Modo rápido: el mismo clasificador sobre las primeras N capas del encoder.
+
+La vista comparte pesos (y hooks) con el modelo original; solo cambia la
+lista de capas que recorre el encoder, así que no duplica memoria.
+"""
+import copy
+from typing import Optional
+
+import torch
+
+
+def encoder_depth(model) -> Optional[int]:
+    """Nº de capas del encoder Wav2Vec2, o None si el modelo no tiene esa forma."""
+    encoder = getattr(getattr(model, "wav2vec2", None), "encoder", None)
+    layers = getattr(encoder, "layers", None)
+    return len(layers) if layers is not None else None
+
+
+def _shallow(module: torch.nn.Module) -> torch.nn.Module:
+    # copia superficial con su propio dict de submódulos/parámetros (los tensores se comparten)
+    view = copy.copy(module)
+    view._modules = dict(module._modules)
+    view._parameters = dict(module._parameters)
+    return view
+
+
+def truncated_view(model, n_layers: int):
+    """Vista de `model` que ejecuta solo las primeras `n_layers` capas del encoder."""
+    depth = encoder_depth(model)
+    if depth is None:
+        raise ValueError("El modelo no expone wav2vec2.encoder.layers")
+    if not 1 <= n_layers <= depth:
+        raise ValueError(f"n_layers debe estar entre 1 y {depth}")
+    if n_layers == depth:
+        return model
+
+    view = _shallow(model)
+    backbone = _shallow(model.wav2vec2)
+    encoder = _shallow(model.wav2vec2.encoder)
+    encoder._modules["layers"] = torch.nn.ModuleList(list(encoder.layers)[:n_layers])
+    backbone._modules["encoder"] = encoder
+    view._modules["wav2vec2"] = backbone
+
+    # Con suma ponderada de capas hay n_layers + 1 estados ocultos (embeddings + capas)
+    if getattr(model.config, "use_weighted_layer_sum", False):
+        weights = model.layer_weights.detach()[: n_layers + 1].clone()
+        view._parameters["layer_weights"] = torch.nn.Parameter(weights, requires_grad=False)
+    return view
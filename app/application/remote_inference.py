@@ -0,0 +1,255 @@
+# app/application/remote_inference.py
+"""Inferencia en workers dedicados.
+
+El nodo API decodifica el audio y envía la señal (float32, 16 kHz) por el
+transporte; un `InferenceWorker` ejecuta la inferencia por etapas con el
+modelo cargado y responde (predicción, etapa, embedding).
+
+- El cliente conecta con el transporte en la primera petición (no al importar
+  las rutas); si no puede, falla con `RemoteInferenceError` (-> fallback local
+  o 503) y lo reintenta en la siguiente.
+- Health check: los workers publican un latido cada `heartbeat_seconds`; sin
+  ningún worker vivo el cliente falla al instante en vez de esperar el timeout.
+  Los latidos muy antiguos (workers que murieron sin despedirse) se borran.
+- Timeout por intento y reintentos (un worker que muere a mitad de trabajo
+  solo cuesta un reintento). Los errores del propio análisis (4xx) no se
+  reintentan: se propagan tal cual.
+- Los trabajos que llegan al worker ya caducados se descartan sin inferir.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+
+from app.infrastructure.inference_transport import decode_message, encode_message
+from app.infrastructure.metrics import metrics
+from app.infrastructure.tracing import current_request_id, request_context
+
+log = logging.getLogger(__name__)
+
+Analysis = Tuple[int, str, Optional[np.ndarray]]
+
+
+class RemoteInferenceError(Exception):
+    """No hubo respuesta válida de ningún worker (sin workers vivos o timeouts agotados)."""
+
+
+class InferenceWorker:
+    def __init__(
+        self,
+        transport,
+        analyze: Callable[[np.ndarray], Analysis],
+        worker_id: Optional[str] = None,
+        threads: int = 1,
+        heartbeat_seconds: float = 2.0,
+        poll_seconds: float = 0.5,
+    ):
+        self.transport = transport
+        self.analyze = analyze
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:4]}"
+        self.threads = threads
+        self.heartbeat_seconds = heartbeat_seconds
+        self.poll_seconds = poll_seconds
+        self.served = 0
+        self.busy = 0
+        self._lock = threading.Lock()
+
+    def beat(self) -> None:
+        self.transport.heartbeat(self.worker_id, {
+            "ts": time.time(), "pid": os.getpid(), "host": socket.gethostname(),
+            "threads": self.threads, "busy": self.busy, "served": self.served,
+        })
+
+    def handle(self, data: bytes) -> None:
+        header, payload = decode_message(data)
+        if header["deadline"] < time.time():
+            metrics.inc("worker_expired")  # el cliente ya no espera esta respuesta
+            return
+        # los logs del worker llevan el request id de la petición original
+        with request_context(header.get("request_id")):
+            reply, embedding = self._analyze(header, payload)
+        self.transport.push_reply(header["reply_to"], encode_message(reply, embedding))
+
+    def _analyze(self, header: dict, payload: bytes) -> Tuple[dict, bytes]:
+        reply = {"id": header["id"], "worker": self.worker_id}
+        embedding = b""
+        with self._lock:
+            self.busy += 1
+        try:
+            signal = np.frombuffer(payload, dtype="<f4")
+            prediction, stage, vector = self.analyze(signal)
+            reply.update(prediction=int(prediction), stage=stage)
+            if vector is not None:
+                embedding = np.ascontiguousarray(vector, dtype="<f4").tobytes()
+        except HTTPException as e:
+            reply.update(status=e.status_code, error=str(e.detail))
+        except Exception as e:
+            log.error("inference worker: %s", e)
+            reply.update(status=500, error=str(e))
+        finally:
+            with self._lock:
+                self.busy -= 1
+                self.served += 1
+        return reply, embedding
+
+    def run_once(self, timeout: Optional[float] = None) -> bool:
+        data = self.transport.pop_request(self.poll_seconds if timeout is None else timeout)
+        if data is None:
+            return False
+        self.handle(data)
+        return True
+
+    def serve_forever(self, stop: threading.Event) -> None:
+        """`threads` bucles de consumo + latido hasta que se active `stop`."""
+        def loop():
+            while not stop.is_set():
+                try:
+                    self.run_once()
+                except Exception as e:
+                    log.error("inference worker loop: %s", e)
+                    stop.wait(1.0)
+
+        consumers = [threading.Thread(target=loop, name=f"worker-{i}", daemon=True) for i in range(self.threads)]
+        for t in consumers:
+            t.start()
+        while not stop.is_set():
+            try:
+                self.beat()
+            except Exception as e:
+                log.error("heartbeat: %s", e)
+            stop.wait(self.heartbeat_seconds)
+        for t in consumers:
+            t.join()
+        try:
+            self.transport.forget_worker(self.worker_id)
+        except Exception as e:
+            log.error("forget worker: %s", e)
+
+
+class RemoteInferenceClient:
+    def __init__(
+        self,
+        transport=None,
+        timeout: float = 30.0,
+        retries: int = 1,
+        heartbeat_max_age: float = 10.0,
+        client_id: Optional[str] = None,
+        connect: Optional[Callable[[], object]] = None,
+        prune_after: Optional[float] = None,
+    ):
+        if transport is None and connect is None:
+            raise ValueError("RemoteInferenceClient necesita `transport` o `connect`")
+        self.transport = transport
+        self._connect = connect
+        self._connect_lock = threading.Lock()
+        self.timeout = timeout
+        self.retries = retries
+        self.heartbeat_max_age = heartbeat_max_age
+        self.prune_after = heartbeat_max_age * 10 if prune_after is None else prune_after
+        self.client_id = client_id or f"api-{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._receiver: Optional[threading.Thread] = None
+        self._closed = threading.Event()
+
+    def _connected(self):
+        """Transporte, conectando en el primer uso; un fallo se reintenta en la siguiente llamada."""
+        if self.transport is None:
+            with self._connect_lock:
+                if self.transport is None:
+                    try:
+                        self.transport = self._connect()
+                    except Exception as e:
+                        metrics.inc("remote_connect_errors")
+                        raise RemoteInferenceError(f"Transporte de inferencia no disponible: {e}") from e
+        return self.transport
+
+    # ---------------- Health check ----------------
+    def live_workers(self) -> List[str]:
+        transport = self._connected()
+        now = time.time()
+        live = []
+        for worker_id, info in transport.workers().items():
+            age = now - info.get("ts", 0)
+            if age <= self.heartbeat_max_age:
+                live.append(worker_id)
+            elif age > self.prune_after:
+                transport.forget_worker(worker_id)  # murió sin despedirse
+                metrics.inc("remote_workers_pruned")
+        metrics.set_gauge("remote_workers_live", len(live))
+        return live
+
+    # ---------------- Petición ----------------
+    def infer(self, signal: np.ndarray) -> Analysis:
+        """Bloqueante (se llama desde el pool del servicio, dimensionado con REMOTE_MAX_INFLIGHT)."""
+        try:
+            live = self.live_workers()
+        except RemoteInferenceError:
+            raise
+        except Exception as e:
+            raise RemoteInferenceError(f"Transporte de inferencia no disponible: {e}") from e
+        if not live:
+            metrics.inc("remote_inference_unavailable")
+            raise RemoteInferenceError("No hay workers de inferencia disponibles")
+        self._ensure_receiver()
+        payload = np.ascontiguousarray(signal, dtype="<f4").tobytes()
+        for attempt in range(self.retries + 1):
+            job_id = uuid.uuid4().hex
+            future: Future = Future()
+            with self._lock:
+                self._pending[job_id] = future
+            try:
+                header = {"id": job_id, "reply_to": self.client_id, "deadline": time.time() + self.timeout,
+                          "request_id": current_request_id()}
+                with metrics.timer("remote_inference"):
+                    try:
+                        self.transport.push_request(encode_message(header, payload))
+                    except Exception as e:
+                        raise RemoteInferenceError(f"No se pudo encolar el trabajo: {e}") from e
+                    reply, embedding = future.result(timeout=self.timeout)
+            except FutureTimeout:
+                metrics.inc("remote_inference_timeouts")
+                continue
+            finally:
+                with self._lock:
+                    self._pending.pop(job_id, None)
+            if reply.get("error") is not None:
+                raise HTTPException(status_code=reply.get("status", 500), detail=reply["error"])
+            vector = np.frombuffer(embedding, dtype="<f4").copy() if len(embedding) else None
+            return reply["prediction"], reply["stage"], vector
+        raise RemoteInferenceError(f"Sin respuesta de los workers tras {self.retries + 1} intentos")
+
+    def _ensure_receiver(self) -> None:
+        with self._lock:
+            if self._receiver is None or not self._receiver.is_alive():
+                self._receiver = threading.Thread(target=self._receive, name="remote-replies", daemon=True)
+                self._receiver.start()
+
+    def _receive(self) -> None:
+        # Un solo lector por proceso: reparte las respuestas a quien las espera
+        while not self._closed.is_set():
+            try:
+                data = self.transport.pop_reply(self.client_id, 0.5)
+            except Exception as e:
+                log.error("remote replies: %s", e)
+                self._closed.wait(1.0)
+                continue
+            if data is None:
+                continue
+            header, embedding = decode_message(data)
+            with self._lock:
+                future = self._pending.pop(header["id"], None)
+            if future is None:
+                metrics.inc("remote_inference_late_replies")  # intento ya caducado
+                continue
+            future.set_result((header, bytes(embedding)))
+
+    def close(self) -> None:
+        self._closed.set()
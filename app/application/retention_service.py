@@ -0,0 +1,84 @@
+# app/application/retention_service.py
+"""Retención del historial: rollups diarios + archivado mensual.
+
+Cada ejecución:
+1. Calcula los agregados diarios desde el día siguiente al último con rollup
+   hasta ayer (los días completos), siempre antes de archivar: un día
+   archivado ya tiene su rollup y no se vuelve a calcular (desde la tabla
+   caliente saldría vacío y borraría el suyo).
+2. Mueve las filas con `created` anterior al corte (hoy - RETENTION_DAYS, a
+   medianoche UTC) a `audios_archive_YYYYMM`, mes a mes.
+"""
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from app.domain.repositories.audio_archive_repository import IAudioArchiveRepository
+
+
+def month_key(moment: datetime) -> str:
+    return f"{moment:%Y%m}"
+
+
+def _month_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1, tzinfo=timezone.utc)
+
+
+def _next_month(moment: datetime) -> datetime:
+    return _month_start(moment.replace(day=28) + timedelta(days=4))
+
+
+class RetentionService:
+    def __init__(self, archive: IAudioArchiveRepository, retention_days: int, batch_size: int = 5000):
+        if retention_days < 1:
+            raise ValueError("RETENTION_DAYS debe ser >= 1 (el día en curso nunca se archiva)")
+        self.archive = archive
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+
+    def cutoff(self, now: datetime) -> datetime:
+        today = datetime(now.year, now.month, now.day, tzinfo=timezone.utc)
+        return today - timedelta(days=self.retention_days)
+
+    def plan(self, now: datetime) -> List[Tuple[str, datetime, datetime]]:
+        """Rangos (mes, inicio, fin) a archivar; el último mes se corta en el límite de retención."""
+        oldest = self.archive.oldest_hot()
+        cutoff = self.cutoff(now)
+        if oldest is None:
+            return []
+        if oldest.tzinfo is None:
+            oldest = oldest.replace(tzinfo=timezone.utc)
+        ranges = []
+        start = _month_start(oldest)
+        while start < cutoff:
+            end = min(_next_month(start), cutoff)
+            ranges.append((month_key(start), start, end))
+            start = end
+        return ranges
+
+    def rollup(self, now: datetime) -> Tuple[Optional[date], int]:
+        today = now.astimezone(timezone.utc).date()
+        last = self.archive.last_rollup_day()
+        if last is not None:
+            start = last + timedelta(days=1)
+        else:
+            oldest = self.archive.oldest_hot()
+            if oldest is None:
+                return None, 0
+            start = oldest.date()
+        if start >= today:
+            return start, 0
+        return start, self.archive.rollup_days(start, today)
+
+    def run(self, now: Optional[datetime] = None, dry_run: bool = False, archive: bool = True) -> Dict:
+        now = now or datetime.now(timezone.utc)
+        plan = self.plan(now) if archive else []
+        if dry_run:
+            return {"cutoff": self.cutoff(now).isoformat(), "months": [m for m, _, _ in plan]}
+        rollup_start, groups = self.rollup(now)
+        moved = {month: self.archive.archive_range(month, start, end, self.batch_size) for month, start, end in plan}
+        return {
+            "cutoff": self.cutoff(now).isoformat(),
+            "rollup_from": rollup_start.isoformat() if rollup_start else None,
+            "rollup_groups": groups,
+            "archived": moved,
+        }
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
 
 class AudioResponse(BaseModel):
@@ -22,4 +22,16 @@ class AudioListItem(BaseModel):
     result: str
     authenticity_score: float
     inference_duration: Optional[float]
-    timestamp: datetime
\ No newline at end of file
+    timestamp: datetime
+
+class SimilarAudioItem(BaseModel):
+    audio_id: int
+    result: str
+    distance: float  # distancia coseno entre embeddings (0 = idéntico)
+
+class DailyStatsItem(BaseModel):
+    day: date
+    result: str
+    count: int
+    avg_authenticity_score: float
+    avg_inference_duration: Optional[float]
@@ -0,0 +1,12 @@
+# app/application/silence.py
+"""Detección de silencio sin dependencias de ML (la usan también los procesos de decodificación)."""
+import numpy as np
+
+# RMS por debajo del cual el clip se considera silencio
+SILENCE_RMS = 0.001
+
+
+def is_silent(signal: np.ndarray) -> bool:
+    # RMS con un producto escalar: sin el temporal de `signal ** 2`
+    n = signal.shape[0]
+    return n == 0 or float(np.dot(signal, signal)) / n < SILENCE_RMS ** 2
@@ -0,0 +1,44 @@
+# app/application/single_flight.py
+"""Tabla de trabajos en curso: llamadas concurrentes con la misma clave comparten resultado."""
+import asyncio
+from typing import Awaitable, Callable, Dict, Tuple
+
+from app.infrastructure.metrics import metrics
+
+
+class SingleFlight:
+    def __init__(self, name: str = "single_flight"):
+        self.name = name
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    def join(self, key: str, factory: Callable[[], Awaitable]) -> Tuple[asyncio.Future, bool]:
+        """Devuelve (tarea compartida, es_líder). Solo el líder invoca `factory`.
+
+        La tarea no pertenece a ninguna petición: si el líder se cancela
+        (cliente desconectado) el resto sigue esperando el mismo resultado.
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            metrics.inc(f"{self.name}_coalesced_total")
+            return task, False
+
+        task = asyncio.ensure_future(factory())
+        self._inflight[key] = task
+        metrics.set_gauge(f"{self.name}_inflight", len(self._inflight))
+
+        def _done(t: asyncio.Future) -> None:
+            if self._inflight.get(key) is t:
+                del self._inflight[key]
+            metrics.set_gauge(f"{self.name}_inflight", len(self._inflight))
+            if not t.cancelled():
+                t.exception()  # evita "exception was never retrieved" si nadie espera ya
+
+        task.add_done_callback(_done)
+        return task, True
+
+    async def do(self, key: str, factory: Callable[[], Awaitable]):
+        task, leader = self.join(key, factory)
+        return await asyncio.shield(task), not leader
@@ -1,5 +1,6 @@
+from functools import lru_cache
 from pydantic.v1 import BaseSettings
-from typing import List
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
@@ -17,5 +18,124 @@ class Settings(BaseSettings):
         "http://127.0.0.1:5173",
     ]
 
+    # Modelo: hf = langulor/deepfake-voice-spanish (HF_MODEL_REPO) | tiny = Wav2Vec2 aleatorio local (tests/dev)
+    MODEL_BACKEND: str = "hf"
+
+    # Roles que monta este proceso: auth | history | inference (solo inference carga el modelo)
+    APP_ROLES: List[str] = ["auth", "history", "inference"]
+
+    # Emails con permiso para exportar el historial de todos los usuarios
+    ADMIN_EMAILS: List[str] = []
+    EXPORT_BATCH_SIZE: int = 1000
+
+    # Retención: filas más antiguas que esto pasan a audios_archive_YYYYMM (cli/retention)
+    RETENTION_DAYS: int = 180
+    RETENTION_BATCH_SIZE: int = 5000
+
+    # Caché del historial por usuario (GET /audios)
+    HISTORY_CACHE_ENABLED: bool = True
+    HISTORY_CACHE_MAX_ROWS: int = 50000          # filas totales en memoria (LRU por usuario)
+    HISTORY_CACHE_MAX_ROWS_PER_USER: int = 2000  # historiales más largos no se cachean
+    HISTORY_CACHE_TTL_SECONDS: float = 300
+    HISTORY_CACHE_VALIDATE: bool = True          # comprueba (filas, id máximo) en cada acierto
+
+    # CPU / hilos por worker (None = valor por defecto de cada librería)
+    WORKERS: int = 1                                # nº de workers de uvicorn en este host
+    TORCH_INTRA_OP_THREADS: Optional[int] = None
+    TORCH_INTER_OP_THREADS: Optional[int] = None
+    BLAS_THREADS: Optional[int] = None
+    NUMBA_THREADS: Optional[int] = None
+    # None = sin afinidad, "auto" = reparte los cores entre WORKERS,
+    # "0-3;4-7" = un grupo de cores por worker
+    CPU_AFFINITY: Optional[str] = None
+
+    # Control de admisión adaptativo en las rutas de predicción (503 al saturarse)
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_ALGORITHM: str = "gradient"           # gradient | aimd
+    ADMISSION_PATHS: List[str] = ["/predict-audio", "/predict-pcm"]
+    ADMISSION_INITIAL_LIMIT: int = 8
+    ADMISSION_MIN_LIMIT: int = 1
+    ADMISSION_MAX_LIMIT: int = 64
+    ADMISSION_TARGET_LATENCY_MS: float = 2000.0    # AIMD: por encima se reduce el límite
+    ADMISSION_BACKOFF: float = 0.9                 # AIMD: factor de reducción
+    ADMISSION_TOLERANCE: float = 1.5               # gradient: latencia reciente tolerada vs referencia
+
+    # Buckets de longitud (s): cada entrada se rellena/recorta al bucket con attention mask.
+    # Vacío = longitud libre. El mayor debería ser MAX_AUDIO_SECONDS.
+    LENGTH_BUCKETS_SECONDS: List[float] = []
+    BUCKET_WARMUP: bool = True                     # un forward por bucket al arrancar
+
+    # Inferencia en workers dedicados (local = el modelo corre en este proceso)
+    INFERENCE_BACKEND: str = "local"               # local | remote
+    INFERENCE_TRANSPORT: str = "queue"             # queue (socket Unix, mismo host) | redis
+    INFERENCE_QUEUE_ADDRESS: str = "/tmp/deepfake-inference.sock"
+    INFERENCE_QUEUE_AUTHKEY: str = "dev-queue-key"
+    INFERENCE_REDIS_URL: str = "redis://localhost:6379/0"
+    REMOTE_TIMEOUT_SECONDS: float = 30.0           # por intento
+    REMOTE_RETRIES: int = 1
+    REMOTE_HEARTBEAT_SECONDS: float = 2.0          # latido de los workers; vivo si < 5 latidos
+    REMOTE_FALLBACK_LOCAL: bool = False            # sin workers -> inferir aquí (carga el modelo)
+    REMOTE_MAX_INFLIGHT: int = 16                  # trabajos remotos a la vez por proceso API (no usa INFERENCE_THREADS)
+
+    # Memoria de inferencia por worker (None = sin presupuesto)
+    MEMORY_BUDGET_MB: Optional[int] = 1024
+    MEMORY_BYTES_PER_SAMPLE: int = 1500            # estimación por muestra a 16 kHz (conv + activaciones)
+    MEMORY_WAIT_SECONDS: float = 10.0              # espera máx. por presupuesto antes de responder 503
+
+    # Perfilado por petición (cabecera X-Profile con el token o muestreo)
+    PROFILE_TOKEN: Optional[str] = None
+    PROFILE_SAMPLE_RATE: float = 0.0               # fracción de peticiones perfiladas (0 = nunca)
+    PROFILE_DIR: str = "./data/profiles"
+    PROFILE_KEEP: int = 50                         # perfiles conservados (los más antiguos se borran)
+
+    # Trazas por petición (request id siempre; spans solo en la fracción muestreada)
+    TRACE_SAMPLE_RATE: float = 0.01                # 0 = sin trazas (el request id se mantiene)
+    TRACE_FILE: str = "./data/traces/traces.jsonl"
+    TRACE_QUEUE_SIZE: int = 1000                   # trazas pendientes de escribir; el resto se descarta
+    TRACE_MAX_MB: int = 100                        # rota a <TRACE_FILE>.1 al superarlo
+
+    # Logs (JSON por defecto, escritos desde un hilo aparte)
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = True
+
+    # Subida de audio
+    MAX_UPLOAD_BYTES: int = 20 * 1024 * 1024
+    MAX_AUDIO_SECONDS: float = 5.0                 # audio analizado por petición
+    UPLOAD_CHUNK_BYTES: int = 64 * 1024
+    INFERENCE_THREADS: int = 1                     # hilos del pool de decodificación + inferencia
+
+    # Reparto justo de la inferencia por usuario (ver app/application/fair_scheduler.py)
+    FAIR_SCHEDULING: bool = True
+    USER_MAX_CONCURRENCY: int = 1                  # inferencias simultáneas por usuario
+    USER_MAX_QUEUED: int = 8                       # en cola por usuario antes de responder 429
+    USER_RATE_PER_SEC: Optional[float] = None      # token bucket por usuario (None = sin límite; p. ej. 2.0)
+    USER_BURST: int = 10
+
+    # Índice de embeddings (detección de casi-duplicados)
+    EMBEDDING_INDEX_ENABLED: bool = True
+    EMBEDDING_INDEX_PATH: str = "./data/embedding_index.pkl"
+    EMBEDDING_INDEX_SAVE_SECONDS: int = 300        # guardado periódico si hubo altas
+    NEAR_DUPLICATE_REUSE: bool = False             # reutilizar el veredicto de un casi-duplicado (opt-in)
+    NEAR_DUPLICATE_DISTANCE: float = 0.02          # distancia coseno máx. para reutilizar veredicto
+    METRICS_TOKEN: Optional[str] = None            # si se define, /metrics exige "Authorization: Bearer <token>"
+
+    # Inferencia en cascada (ver app/application/cascade.py)
+    CASCADE_ENABLED: bool = False
+    CASCADE_MODEL_PATH: str = "./data/cascade.joblib"
+    CASCADE_FAKE_BELOW: float = 0.05               # P(falso) <= esto -> "real" sin Wav2Vec2
+    CASCADE_FAKE_ABOVE: float = 1.01               # P(falso) >= esto -> "falso" (>1 = nunca)
+    EARLY_EXIT_SECONDS: Optional[float] = None     # prefijo evaluado primero (None = desactivado)
+    EARLY_EXIT_MARGIN: float = 3.0                 # margen de logits para aceptar el prefijo
+
+    # Modo rápido: encoder truncado a las primeras FAST_MODE_LAYERS capas
+    FAST_MODE: str = "off"                         # off | always | auto (según cola de inferencia)
+    FAST_MODE_LAYERS: int = 6
+    FAST_MODE_QUEUE_DEPTH: int = 4                 # en auto: peticiones en cola para activarlo
+
     class Config:
         env_file = ".env"
+
+
+@lru_cache()
+def get_settings() -> Settings:
+    return Settings()
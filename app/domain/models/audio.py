@@ -1,9 +1,12 @@
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
 from typing import Optional
 from datetime import datetime, timezone
 
 class Audio(SQLModel, table=True):
     __tablename__ = "audios"
+    # Historial por usuario ordenado por fecha y consultas por rango de `created`
+    __table_args__ = (Index("ix_audios_user_id_created", "user_id", "created"),)
 
     id: Optional[int] = Field(default=None, primary_key=True)
     # Relación: audio pertenece a un usuario
@@ -11,7 +14,7 @@ class Audio(SQLModel, table=True):
     filename: str
     result: str
     authenticity_score: float
-    created: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), index=True)
     # opcional: si aún quieres rastrear el equipo, mantenlo como nullable
     device_id: Optional[str] = None
 
@@ -0,0 +1,28 @@
+from sqlmodel import SQLModel, Field
+from typing import Optional
+from datetime import date, datetime, timezone
+
+class AudioArchiveMonth(SQLModel, table=True):
+    """Catálogo de tablas de archivo mensuales (`audios_archive_YYYYMM`)."""
+    __tablename__ = "audio_archive_months"
+
+    month: str = Field(primary_key=True)          # "YYYYMM"
+    table_name: str
+    rows: int = 0
+    # Rango de ids archivados: get_by_id localiza la tabla sin recorrerlas todas
+    min_id: Optional[int] = None
+    max_id: Optional[int] = None
+    archived_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class AudioDailyRollup(SQLModel, table=True):
+    """Agregados diarios por usuario y veredicto (sobreviven al archivado)."""
+    __tablename__ = "audio_daily_rollups"
+
+    day: date = Field(primary_key=True)
+    user_id: int = Field(primary_key=True, index=True)
+    result: str = Field(primary_key=True)
+    count: int = 0
+    score_sum: float = 0.0
+    inference_seconds_sum: float = 0.0
+    inference_count: int = 0                      # filas con inference_duration
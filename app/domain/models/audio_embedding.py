@@ -0,0 +1,15 @@
+from sqlmodel import SQLModel, Field, Column
+from sqlalchemy import LargeBinary
+from typing import Optional
+from datetime import datetime, timezone
+
+class AudioEmbedding(SQLModel, table=True):
+    __tablename__ = "audio_embeddings"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    # Sin FK a audios: el embedding se conserva aunque el audio se archive
+    audio_id: int = Field(index=True, unique=True)
+    result: str                                  # veredicto asociado ("real" / "falso")
+    dim: int
+    vector: bytes = Field(sa_column=Column(LargeBinary, nullable=False))  # float32 little-endian
+    created: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
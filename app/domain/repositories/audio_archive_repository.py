@@ -0,0 +1,20 @@
+from datetime import date, datetime
+from typing import Iterator, Protocol, List, Optional
+from app.domain.models.audio import Audio
+from app.domain.models.audio_archive import AudioArchiveMonth, AudioDailyRollup
+
+class IAudioArchiveRepository(Protocol):
+    def rollup_days(self, start: date, end: date) -> int: ...   # recalcula [start, end)
+    def last_rollup_day(self) -> Optional[date]: ...
+    def oldest_hot(self) -> Optional[datetime]: ...
+    def archive_range(self, month: str, start: datetime, end: datetime, batch_size: int = 5000) -> int: ...
+    def months(self) -> List[AudioArchiveMonth]: ...
+    def get_archived_by_id(self, audio_id: int) -> Optional[Audio]: ...
+    def get_archived_by_user(
+        self, user_id: int, since: Optional[datetime] = None, until: Optional[datetime] = None
+    ) -> List[Audio]: ...
+    def iter_batches(
+        self, batch_size: int = 1000, user_id: Optional[int] = None, since: Optional[datetime] = None,
+        until: Optional[datetime] = None, result: Optional[str] = None,
+    ) -> Iterator[List[Audio]]: ...
+    def daily_stats(self, user_id: int, since: Optional[date] = None, until: Optional[date] = None) -> List[AudioDailyRollup]: ...
@@ -1,7 +1,20 @@
-from typing import Protocol, List
+from datetime import datetime
+from typing import Protocol, Iterator, List, Optional, Tuple
 from app.domain.models.audio import Audio
 
 class IAudioRepository(Protocol):
     def save(self, audio: Audio) -> Audio: ...
+    def save_many(self, audios: List[Audio]) -> int: ...
+    def get_by_id(self, audio_id: int) -> Optional[Audio]: ...
     def get_all(self) -> List[Audio]: ...
-    def get_by_user(self, user_id: int) -> List[Audio]: ...   # << antes era por device
\ No newline at end of file
+    def get_by_user(self, user_id: int) -> List[Audio]: ...   # << antes era por device
+    def get_user_marker(self, user_id: int) -> Tuple[int, int]: ...   # (filas, id máximo)
+    def iter_batches(
+        self,
+        batch_size: int = 1000,
+        after_id: int = 0,
+        user_id: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        result: Optional[str] = None,
+    ) -> Iterator[List[Audio]]: ...
@@ -0,0 +1,9 @@
+from typing import Container, Protocol, Iterator, List, Optional
+from app.domain.models.audio_embedding import AudioEmbedding
+
+class IEmbeddingRepository(Protocol):
+    def save(self, embedding: AudioEmbedding) -> AudioEmbedding: ...
+    def get_by_audio_id(self, audio_id: int) -> Optional[AudioEmbedding]: ...
+    def get_by_audio_ids(self, audio_ids: List[int]) -> List[AudioEmbedding]: ...
+    def iter_batches(self, batch_size: int = 1000, after_id: int = 0) -> Iterator[List[AudioEmbedding]]: ...
+    def iter_missing(self, known: Container[int], batch_size: int = 1000) -> Iterator[List[AudioEmbedding]]: ...
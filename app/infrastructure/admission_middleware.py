@@ -0,0 +1,63 @@
+# app/infrastructure/admission_middleware.py
+"""Middleware ASGI que aplica el AdaptiveLimiter solo a las rutas de predicción.
+
+Va por delante del parseo del cuerpo: una petición rechazada recibe 503 sin
+haber leído la subida, y /auth, /health, etc. nunca pasan por el limitador.
+El limitador recibe el tiempo de cola + inferencia que anota el servicio; la
+latencia de extremo a extremo (subida incluida) solo va a la métrica.
+"""
+import time
+from typing import Callable, Iterable
+
+from starlette.responses import JSONResponse
+
+from app.application.admission import AdaptiveLimiter, collect_service_time
+from app.infrastructure.metrics import metrics
+
+
+class AdmissionMiddleware:
+    def __init__(self, app, limiter: AdaptiveLimiter, paths: Iterable[str],
+                 retry_after: int = 1, clock: Callable[[], float] = time.perf_counter):
+        self.app = app
+        self.limiter = limiter
+        self.paths = frozenset(paths)
+        self.retry_after = retry_after
+        self.clock = clock
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        if not self.limiter.try_acquire():
+            metrics.inc("admission_shed")
+            response = JSONResponse(
+                {"detail": "Servidor saturado, reintenta en unos segundos"},
+                status_code=503,
+                headers={"Retry-After": str(self.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        status = 500
+        t0 = self.clock()
+        metrics.set_gauge("admission_inflight", self.limiter.inflight)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        with collect_service_time() as samples:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                # sin muestra si no hubo inferencia propia (4xx, petición coalescida, caché)
+                latency = sum(samples) if samples and status < 400 else None
+                self.limiter.release(latency, failed=status >= 500)
+                metrics.observe("admission_latency", self.clock() - t0)
+                if samples:
+                    metrics.observe("admission_service_time", sum(samples))
+            metrics.set_gauge("admission_limit", self.limiter.limit)
+            metrics.set_gauge("admission_inflight", self.limiter.inflight)
@@ -0,0 +1,35 @@
+# app/infrastructure/cli/_dataset.py
+"""Lectura de carpetas de audio etiquetadas para los comandos offline.
+
+Estructura esperada (la etiqueta sale de la primera carpeta bajo la raíz):
+    data/real/*.wav   data/falso/*.flac   ...   (otras carpetas -> sin etiqueta)
+"""
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+AUDIO_EXTENSIONS = (".wav", ".flac", ".ogg", ".mp3", ".aif", ".aiff")
+LABELS = {"real": 0, "bonafide": 0, "falso": 1, "fake": 1, "spoof": 1}
+SAMPLE_RATE = 16000
+
+
+def iter_dataset(root: str) -> List[Tuple[str, Optional[int]]]:
+    """Lista ordenada de (ruta, etiqueta) con etiqueta 0=real, 1=falso o None."""
+    items = []
+    for dirpath, _, filenames in os.walk(root):
+        rel = os.path.relpath(dirpath, root)
+        top = rel.split(os.sep)[0].lower() if rel != "." else ""
+        for name in filenames:
+            if name.lower().endswith(AUDIO_EXTENSIONS):
+                items.append((os.path.join(dirpath, name), LABELS.get(top)))
+    items.sort()
+    return items
+
+
+def load_clip(path: str, max_seconds: Optional[float] = None) -> np.ndarray:
+    """Audio mono a 16 kHz (mismo preprocesamiento que el servicio)."""
+    import librosa
+
+    signal, _ = librosa.load(path, sr=SAMPLE_RATE, mono=True, duration=max_seconds)
+    return signal
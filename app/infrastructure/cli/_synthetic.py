@@ -0,0 +1,29 @@
+# app/infrastructure/cli/_synthetic.py
+"""Audio sintético tipo voz para benchmarks y pruebas de carga."""
+import io
+from typing import Optional
+
+import numpy as np
+
+
+def synthetic_speech(seconds: float, sr: int = 16000, seed: Optional[int] = None) -> np.ndarray:
+    """Señal mono float32 con armónicos de f0 variable, envolvente silábica y ruido."""
+    rng = np.random.default_rng(seed)
+    n = max(1, int(round(seconds * sr)))
+    t = np.arange(n, dtype=np.float64) / sr
+    f0 = 120.0 + 40.0 * np.sin(2 * np.pi * rng.uniform(0.5, 2.0) * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sr
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 8))
+    envelope = 0.5 * (1 + np.sin(2 * np.pi * rng.uniform(3.0, 5.0) * t))
+    signal = 0.3 * envelope * voiced + 0.01 * rng.standard_normal(n)
+    return signal.astype(np.float32)
+
+
+
+def synthetic_wav_bytes(seconds: float, sr: int = 16000, seed: Optional[int] = None) -> bytes:
+    """Misma señal codificada como WAV PCM16 en memoria."""
+    import soundfile as sf
+
+    buf = io.BytesIO()
+    sf.write(buf, synthetic_speech(seconds, sr, seed), sr, format="WAV", subtype="PCM_16")
+    return buf.getvalue()
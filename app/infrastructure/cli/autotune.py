@@ -0,0 +1,181 @@
+# app/infrastructure/cli/autotune.py
+"""Barrido workers × hilos × batch en esta máquina con audio sintético.
+
+Uso:
+    python -m app.infrastructure.cli.autotune --workers 1,2,4 --threads 1,2,4 --batch-sizes 1,4
+
+Cada combinación arranca `workers` procesos que cargan el modelo con la misma
+configuración de hilos/afinidad que usa la API (variables de `Settings`) y
+ejecutan inferencias en paralelo durante `--seconds` por el mismo camino que
+sirve la API: `AudioService.infer_signal` (FeaturePreparer + cascada + modelo)
+con batch 1 y `AudioService.predict_batch` con lotes. Se reporta throughput
+(clips/s) y latencia p50/p99 por batch, marcando la frontera de Pareto.
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.infrastructure.cpu_topology import available_cpus, format_cpu_list, split_cpus
+
+SAMPLE_RATE = 16000
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def pareto_frontier(results: List[Dict]) -> List[Dict]:
+    """Configuraciones no dominadas: más throughput y menos p99 es mejor."""
+    frontier = []
+    for r in results:
+        dominated = any(
+            o is not r
+            and o["throughput"] >= r["throughput"]
+            and o["p99_ms"] <= r["p99_ms"]
+            and (o["throughput"] > r["throughput"] or o["p99_ms"] < r["p99_ms"])
+            for o in results
+        )
+        if not dominated:
+            frontier.append(r)
+    return sorted(frontier, key=lambda r: r["throughput"])
+
+
+def inference_step(service, batch: List[np.ndarray]):
+    """Una iteración del benchmark por el camino de producción del servicio."""
+    if len(batch) == 1:
+        return lambda: service.infer_signal(batch[0])
+    return lambda: service.predict_batch(batch)
+
+
+def _worker(threads: int, batch_size: int, clip_seconds: float, cpus: Optional[str],
+            workers: int, seed: int, ready_q, start_evt, stop_evt, result_q) -> None:
+    # Misma ruta de configuración que la API: Settings lee estas variables
+    os.environ.update({
+        "WORKERS": str(workers),
+        "TORCH_INTRA_OP_THREADS": str(threads),
+        "TORCH_INTER_OP_THREADS": "1",
+        "BLAS_THREADS": str(threads),
+        "NUMBA_THREADS": str(threads),
+        "CPU_AFFINITY": cpus or "",
+    })
+    from app.application.audio_service import AudioService
+    from app.application.cascade import load_cascade
+    from app.config import get_settings
+    from app.infrastructure.model_loader import model, processor
+    from app.infrastructure.cli._synthetic import synthetic_speech
+
+    settings = get_settings()
+    # Sin repositorio, como los workers de inferencia: solo se mide el análisis
+    service = AudioService(None, model, processor, settings=settings, cascade=load_cascade(settings))
+    batch = [synthetic_speech(clip_seconds, SAMPLE_RATE, seed + i) for i in range(batch_size)]
+    step = inference_step(service, batch)
+
+    for _ in range(2):  # warm-up
+        step()
+    ready_q.put(os.getpid())
+    start_evt.wait()
+
+    latencies, clips = [], 0
+    t_start = time.perf_counter()
+    while not stop_evt.is_set():
+        t0 = time.perf_counter()
+        step()
+        latencies.append(time.perf_counter() - t0)
+        clips += batch_size
+    result_q.put({"latencies": latencies, "clips": clips, "elapsed": time.perf_counter() - t_start})
+
+
+def run_config(workers: int, threads: int, batch_size: int, clip_seconds: float,
+               seconds: float, pin: bool, load_timeout: float = 600.0) -> Dict:
+    ctx = mp.get_context("spawn")
+    ready_q, result_q = ctx.Queue(), ctx.Queue()
+    start_evt, stop_evt = ctx.Event(), ctx.Event()
+    groups = split_cpus(available_cpus(), workers) if pin else []
+
+    procs = []
+    for i in range(workers):
+        cpus = format_cpu_list(groups[i % len(groups)]) if groups else None
+        p = ctx.Process(
+            target=_worker,
+            args=(threads, batch_size, clip_seconds, cpus, workers, 1000 * i,
+                  ready_q, start_evt, stop_evt, result_q),
+            daemon=True,
+        )
+        p.start()
+        procs.append(p)
+
+    try:
+        for _ in procs:
+            ready_q.get(timeout=load_timeout)
+        start_evt.set()
+        time.sleep(seconds)
+        stop_evt.set()
+        per_worker = [result_q.get(timeout=load_timeout) for _ in procs]
+    finally:
+        for p in procs:
+            p.join(timeout=30)
+            if p.is_alive():
+                p.terminate()
+
+    latencies = np.array([lat for w in per_worker for lat in w["latencies"]]) * 1000.0
+    throughput = sum(w["clips"] / w["elapsed"] for w in per_worker if w["elapsed"] > 0)
+    return {
+        "workers": workers,
+        "threads": threads,
+        "batch_size": batch_size,
+        "throughput": round(throughput, 3),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2) if latencies.size else float("inf"),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 2) if latencies.size else float("inf"),
+        "batches": int(latencies.size),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Autotune de hilos/workers/batch para inferencia en CPU")
+    parser.add_argument("--workers", type=_int_list, default=[1, 2])
+    parser.add_argument("--threads", type=_int_list, default=[1, 2, 4])
+    parser.add_argument("--batch-sizes", type=_int_list, default=[1, 4])
+    parser.add_argument("--clip-seconds", type=float, default=5.0)
+    parser.add_argument("--seconds", type=float, default=15.0, help="duración de la medición por combinación")
+    parser.add_argument("--no-pin", action="store_true", help="no fijar afinidad de CPU por worker")
+    parser.add_argument("--allow-oversubscribe", action="store_true",
+                        help="incluir combinaciones con workers × hilos > cores disponibles")
+    parser.add_argument("--output", help="guardar resultados en JSON")
+    args = parser.parse_args(argv)
+
+    n_cpus = len(available_cpus())
+    results = []
+    for w in args.workers:
+        for t in args.threads:
+            if w * t > n_cpus and not args.allow_oversubscribe:
+                print(f"[SKIP] workers={w} threads={t} excede {n_cpus} cores")
+                continue
+            for b in args.batch_sizes:
+                r = run_config(w, t, b, args.clip_seconds, args.seconds, pin=not args.no_pin)
+                print(f"workers={w} threads={t} batch={b} -> {r['throughput']:.2f} clips/s "
+                      f"p50={r['p50_ms']:.1f}ms p99={r['p99_ms']:.1f}ms")
+                results.append(r)
+
+    frontier = pareto_frontier(results)
+    print("\nFrontera de Pareto (throughput vs p99):")
+    print(f"{'workers':>8} {'threads':>8} {'batch':>6} {'clips/s':>10} {'p50 ms':>9} {'p99 ms':>9}")
+    for r in frontier:
+        print(f"{r['workers']:>8} {r['threads']:>8} {r['batch_size']:>6} {r['throughput']:>10.2f} "
+              f"{r['p50_ms']:>9.1f} {r['p99_ms']:>9.1f}")
+    if frontier:
+        best = max(frontier, key=lambda r: r["throughput"])
+        print(f"\nSugerencia: WORKERS={best['workers']} TORCH_INTRA_OP_THREADS={best['threads']} "
+              f"BLAS_THREADS={best['threads']} TORCH_INTER_OP_THREADS=1 CPU_AFFINITY=auto")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"cpus": n_cpus, "results": results, "frontier": frontier}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# app/infrastructure/cli/bench_features.py
+"""Compara Wav2Vec2Processor vs FeaturePreparer por petición y por batch.
+
+Uso:
+    python -m app.infrastructure.cli.bench_features --iterations 200 --batch-size 8
+"""
+import argparse
+import os
+import time
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from app.application.feature_preparation import FeaturePreparer
+from app.infrastructure.cli._synthetic import synthetic_speech
+
+SAMPLE_RATE = 16000
+
+
+def _time_per_call(fn: Callable[[], object], iterations: int) -> float:
+    for _ in range(3):  # warm-up
+        fn()
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - t0) / iterations
+
+
+def _load_feature_extractor(repo: Optional[str]):
+    from transformers import Wav2Vec2FeatureExtractor
+
+    if repo:
+        return Wav2Vec2FeatureExtractor.from_pretrained(repo)
+    return Wav2Vec2FeatureExtractor()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de preparación de features")
+    parser.add_argument("--repo", default=os.getenv("HF_MODEL_REPO"),
+                        help="repo/carpeta del modelo (por defecto HF_MODEL_REPO; vacío = config por defecto)")
+    parser.add_argument("--clip-seconds", type=float, default=5.0)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    fe = _load_feature_extractor(args.repo)
+    prep = FeaturePreparer.from_processor(fe)
+
+    signal = synthetic_speech(args.clip_seconds, SAMPLE_RATE, seed=0)
+    rng = np.random.default_rng(1)
+    batch = [
+        synthetic_speech(float(rng.uniform(1.0, args.clip_seconds)), SAMPLE_RATE, seed=i)
+        for i in range(args.batch_size)
+    ]
+
+    rows = [
+        ("petición",
+         _time_per_call(lambda: fe(signal, sampling_rate=SAMPLE_RATE, return_tensors="pt", padding=True), args.iterations),
+         _time_per_call(lambda: prep.prepare(signal), args.iterations)),
+        (f"batch x{args.batch_size}",
+         _time_per_call(lambda: fe(batch, sampling_rate=SAMPLE_RATE, return_tensors="pt", padding=True), args.iterations),
+         _time_per_call(lambda: prep.prepare_batch(batch), args.iterations)),
+    ]
+
+    print(f"{'caso':<12} {'processor µs':>14} {'preparer µs':>13} {'ahorro µs':>11} {'speedup':>8}")
+    for name, base, fast in rows:
+        print(f"{name:<12} {base * 1e6:>14.1f} {fast * 1e6:>13.1f} {(base - fast) * 1e6:>11.1f} {base / fast:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+# app/infrastructure/cli/bulk_score.py
+"""Re-puntuación offline de archivos de audio (sin pasar por la API).
+
+Decodifica en un pool de procesos, agrupa la inferencia por lotes con el
+mismo preprocesamiento y modelo que `AudioService` y escribe a CSV/JSONL o
+directamente en la tabla `audios`. Es reanudable: cada archivo terminado se
+apunta en el checkpoint y se salta en la siguiente ejecución.
+
+Uso:
+    python -m app.infrastructure.cli.bulk_score --input ./archivo --output scores.csv
+    python -m app.infrastructure.cli.bulk_score --input manifest.txt --to-db --user-id 1
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.config import get_settings
+from app.infrastructure.cli._dataset import AUDIO_EXTENSIONS, load_clip
+
+FIELDS = ["path", "result", "prediction", "inference_ms", "error"]
+
+
+# ---------------- Entrada ----------------
+def list_inputs(source: str) -> List[str]:
+    """Archivos de audio de una carpeta, o rutas de un manifiesto (.txt o .csv con columna `path`)."""
+    if os.path.isdir(source):
+        paths = []
+        for dirpath, _, filenames in os.walk(source):
+            paths.extend(os.path.join(dirpath, n) for n in filenames if n.lower().endswith(AUDIO_EXTENSIONS))
+        return sorted(paths)
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, newline="") as f:
+        if source.lower().endswith(".csv"):
+            entries = [row["path"] for row in csv.DictReader(f)]
+        else:
+            entries = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    return [p if os.path.isabs(p) else os.path.join(base, p) for p in entries]
+
+
+def read_checkpoint(path: Optional[str]) -> Set[str]:
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def decode(path: str, max_seconds: float) -> Tuple[str, Optional[np.ndarray], Optional[str]]:
+    """Se ejecuta en el pool de procesos: (ruta, señal 16 kHz, error)."""
+    from app.application.silence import is_silent
+
+    try:
+        signal = load_clip(path, max_seconds)
+    except Exception as e:
+        return path, None, f"decode: {e}"
+    if signal.size == 0 or is_silent(signal):
+        return path, None, "silence"
+    return path, signal.astype(np.float32, copy=False), None
+
+
+# ---------------- Lotes ----------------
+class LengthBatcher:
+    """Agrupa clips por longitud.
+
+    Sin attention mask el padding cambiaría la normalización y el resultado;
+    agrupando por longitud exacta cada lote da lo mismo que clip a clip
+    (y casi todo el archivo mide MAX_AUDIO_SECONDS, así que los lotes se llenan).
+    Con buckets de longitud (`LengthBuckets`) se agrupa por bucket.
+    """
+
+    def __init__(self, batch_size: int, exact_length: bool = True, buckets=None):
+        self.batch_size = batch_size
+        self.exact_length = exact_length
+        self.length_buckets = buckets
+        self._buckets: Dict[int, List[Tuple[str, np.ndarray]]] = {}
+
+    def add(self, path: str, signal: np.ndarray) -> Optional[List[Tuple[str, np.ndarray]]]:
+        if self.length_buckets is not None:
+            key = self.length_buckets.bucket_for(signal.shape[0])
+        else:
+            key = signal.shape[0] if self.exact_length else 0
+        bucket = self._buckets.setdefault(key, [])
+        bucket.append((path, signal))
+        if len(bucket) >= self.batch_size:
+            return self._buckets.pop(key)
+        return None
+
+    def flush(self) -> Iterable[List[Tuple[str, np.ndarray]]]:
+        while self._buckets:
+            yield self._buckets.pop(next(iter(self._buckets)))
+
+
+# ---------------- Salida ----------------
+class FileSink:
+    def __init__(self, path: str):
+        self.jsonl = path.lower().endswith((".jsonl", ".ndjson"))
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._f = open(path, "a", newline="")
+        self._csv = None
+        if not self.jsonl:
+            self._csv = csv.DictWriter(self._f, fieldnames=FIELDS)
+            if new:
+                self._csv.writeheader()
+
+    def write(self, rows: List[Dict]) -> None:
+        for row in rows:
+            if self.jsonl:
+                self._f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            else:
+                self._csv.writerow(row)
+        self._f.flush()
+
+    def close(self) -> None:
+        self._f.close()
+
+
+class DbSink:
+    """Inserta en `audios` en bloque (una transacción por lote)."""
+
+    def __init__(self, repository, user_id: int, device_id: str = "bulk"):
+        self.repository = repository
+        self.user_id = user_id
+        self.device_id = device_id
+
+    def write(self, rows: List[Dict]) -> None:
+        from app.application.audio_service import authenticity_score
+        from app.domain.models.audio import Audio
+
+        audios = [
+            Audio(
+                user_id=self.user_id,
+                filename=os.path.basename(r["path"]),
+                result=r["result"],
+                authenticity_score=authenticity_score(r["prediction"]),
+                device_id=self.device_id,
+                inference_start=r["_start"],
+                inference_end=r["_end"],
+                inference_duration=r["inference_ms"] / 1000.0,
+            )
+            for r in rows if not r["error"]
+        ]
+        if audios:
+            self.repository.save_many(audios)
+
+    def close(self) -> None:
+        pass
+
+
+class Checkpoint:
+    def __init__(self, path: Optional[str]):
+        self._f = open(path, "a") if path else None
+
+    def mark(self, paths: Iterable[str]) -> None:
+        if self._f is None:
+            return
+        self._f.writelines(p + "\n" for p in paths)
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def close(self) -> None:
+        if self._f is not None:
+            self._f.close()
+
+
+class Progress:
+    def __init__(self, total: int, every: float = 5.0, stream=sys.stderr):
+        self.total, self.done, self.every, self.stream = total, 0, every, stream
+        self._t0 = self._last = time.perf_counter()
+
+    def update(self, n: int, force: bool = False) -> None:
+        self.done += n
+        now = time.perf_counter()
+        if not force and now - self._last < self.every:
+            return
+        self._last = now
+        rate = self.done / max(now - self._t0, 1e-9)
+        eta = (self.total - self.done) / rate if rate else float("inf")
+        print(f"[bulk] {self.done}/{self.total} archivos  {rate:.1f} archivos/s  restante ~{_fmt_eta(eta)}",
+              file=self.stream, flush=True)
+
+
+def _fmt_eta(seconds: float) -> str:
+    if seconds == float("inf"):
+        return "?"
+    m, s = divmod(int(seconds), 60)
+    h, m = divmod(m, 60)
+    return f"{h:d}:{m:02d}:{s:02d}"
+
+
+# ---------------- Ejecución ----------------
+def score_batch(service, batch: List[Tuple[str, np.ndarray]]) -> List[Dict]:
+    start = datetime.now(timezone.utc)
+    t0 = time.perf_counter()
+    predictions = service.predict_batch([signal for _, signal in batch])
+    per_clip_ms = (time.perf_counter() - t0) * 1000.0 / len(batch)
+    end = datetime.now(timezone.utc)
+    return [
+        {"path": path, "result": "falso" if p == 1 else "real", "prediction": p,
+         "inference_ms": round(per_clip_ms, 3), "error": "", "_start": start, "_end": end}
+        for (path, _), p in zip(batch, predictions)
+    ]
+
+
+def run(service, paths: List[str], sink, checkpoint: Checkpoint, workers: int,
+        batch_size: int, max_seconds: float, progress: Optional[Progress] = None) -> Dict[str, int]:
+    batcher = LengthBatcher(batch_size, exact_length=not service.features.return_attention_mask,
+                            buckets=getattr(service, "buckets", None))
+    counts = {"scored": 0, "failed": 0}
+
+    def emit(rows: List[Dict]) -> None:
+        # primero la salida, luego el checkpoint: como mucho se repite un lote, nunca se pierde
+        sink.write(rows)
+        checkpoint.mark(r["path"] for r in rows)
+        for r in rows:
+            counts["failed" if r["error"] else "scored"] += 1
+        if progress:
+            progress.update(len(rows))
+
+    ctx = multiprocessing.get_context("spawn")  # sin fork tras cargar torch
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        pending, queue = deque(), iter(paths)
+        for path in queue:
+            pending.append(pool.submit(decode, path, max_seconds))
+            if len(pending) >= workers * 4:
+                break
+        while pending:
+            path, signal, error = pending.popleft().result()
+            nxt = next(queue, None)
+            if nxt is not None:
+                pending.append(pool.submit(decode, nxt, max_seconds))
+            if error:
+                emit([{"path": path, "result": "", "prediction": -1, "inference_ms": 0.0, "error": error,
+                       "_start": None, "_end": None}])
+                continue
+            batch = batcher.add(path, signal)
+            if batch:
+                emit(score_batch(service, batch))
+        for batch in batcher.flush():
+            emit(score_batch(service, batch))
+    if progress:
+        progress.update(0, force=True)
+    return counts
+
+
+class _PublicRows:
+    """Quita los campos internos (_start/_end) antes de escribir a archivo."""
+
+    def __init__(self, sink):
+        self.sink = sink
+
+    def write(self, rows: List[Dict]) -> None:
+        self.sink.write([{k: v for k, v in r.items() if not k.startswith("_")} for r in rows])
+
+    def close(self) -> None:
+        self.sink.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Puntuación masiva de audios")
+    parser.add_argument("--input", required=True, help="carpeta o manifiesto (.txt / .csv con columna path)")
+    out = parser.add_mutually_exclusive_group(required=True)
+    out.add_argument("--output", help="archivo .csv o .jsonl (se añade al final si existe)")
+    out.add_argument("--to-db", action="store_true", help="inserta los resultados en la tabla audios")
+    parser.add_argument("--user-id", type=int, help="usuario dueño de los registros (con --to-db)")
+    parser.add_argument("--checkpoint", help="archivo de progreso (por defecto <output>.ckpt)")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--max-seconds", type=float, default=settings.MAX_AUDIO_SECONDS)
+    args = parser.parse_args(argv)
+
+    if args.to_db and args.user_id is None:
+        parser.error("--to-db requiere --user-id")
+    checkpoint_path = args.checkpoint or (f"{args.output}.ckpt" if args.output else "bulk_score.ckpt")
+
+    paths = list_inputs(args.input)
+    done = read_checkpoint(checkpoint_path)
+    todo = [p for p in paths if p not in done]
+    print(f"[bulk] {len(paths)} archivos, {len(paths) - len(todo)} ya procesados, {len(todo)} pendientes",
+          file=sys.stderr)
+    if not todo:
+        return
+
+    from app.application.audio_service import AudioService
+    from app.infrastructure.model_loader import model, processor
+
+    if args.to_db:
+        from app.infrastructure.database.audio_repo_impl import SQLAudioRepository
+        repository = SQLAudioRepository()
+        sink = DbSink(repository, args.user_id)
+    else:
+        repository = None
+        sink = _PublicRows(FileSink(args.output))
+
+    service = AudioService(repository, model, processor, settings=settings)
+    checkpoint = Checkpoint(checkpoint_path)
+    try:
+        counts = run(service, todo, sink, checkpoint, args.workers, args.batch_size,
+                     args.max_seconds, Progress(len(todo)))
+    finally:
+        sink.close()
+        checkpoint.close()
+    print(f"[bulk] puntuados: {counts['scored']}  fallidos: {counts['failed']}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+# app/infrastructure/cli/cascade.py
+"""Entrena y evalúa offline la inferencia en cascada.
+
+Uso:
+    # etiquetas de carpeta (real/, falso/) o veredictos del modelo completo (destilación)
+    python -m app.infrastructure.cli.cascade train --data ./dataset --labels model
+
+    # cómputo ahorrado vs. concordancia con el modelo completo para varios umbrales
+    python -m app.infrastructure.cli.cascade eval --data ./dataset \
+        --fake-below 0.01,0.05,0.1 --prefix-seconds 2 --margins 2,3,4
+"""
+import argparse
+import json
+import time
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.application.cascade import CascadeClassifier, logit_margin, spectral_features
+from app.config import get_settings
+from app.infrastructure.cli._dataset import SAMPLE_RATE, iter_dataset, load_clip
+
+
+@dataclass
+class ClipRecord:
+    label: Optional[int]        # etiqueta de carpeta (si la hay)
+    full_pred: int              # veredicto del modelo completo (referencia)
+    full_s: float
+    features_s: float
+    p_fake: Optional[float] = None
+    prefix_pred: Optional[int] = None
+    prefix_margin: Optional[float] = None
+    prefix_s: float = 0.0
+
+
+def simulate(records: List[ClipRecord], fake_below: float, fake_above: float,
+             margin: Optional[float]) -> Dict[str, float]:
+    """Recorre la cascada con los tiempos medidos de cada etapa (sin volver a inferir)."""
+    full_cost = sum(r.full_s for r in records)
+    cost, agree, prefilter, prefix = 0.0, 0, 0, 0
+    for r in records:
+        pred = None
+        if r.p_fake is not None:
+            cost += r.features_s
+            if r.p_fake <= fake_below:
+                pred, prefilter = 0, prefilter + 1
+            elif r.p_fake >= fake_above:
+                pred, prefilter = 1, prefilter + 1
+        if pred is None and margin is not None and r.prefix_pred is not None:
+            cost += r.prefix_s
+            if r.prefix_margin >= margin:
+                pred, prefix = r.prefix_pred, prefix + 1
+        if pred is None:
+            cost += r.full_s
+            pred = r.full_pred
+        agree += int(pred == r.full_pred)
+    n = max(len(records), 1)
+    return {
+        "fake_below": fake_below,
+        "fake_above": fake_above,
+        "margin": margin,
+        "agreement": agree / n,
+        "exit_prefilter": prefilter / n,
+        "exit_prefix": prefix / n,
+        "compute_saved": 1.0 - cost / full_cost if full_cost else 0.0,
+    }
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def _load_model():
+    import torch
+    from app.application.feature_preparation import FeaturePreparer
+    from app.infrastructure.model_loader import model, processor
+
+    features = FeaturePreparer.from_processor(processor)
+
+    def infer(signal):
+        with torch.inference_mode():
+            return model(**features.prepare(signal)).logits[0].float().numpy()
+
+    return infer
+
+
+def _floats(text: str) -> List[float]:
+    return [float(x) for x in text.split(",") if x.strip()]
+
+
+def cmd_train(args) -> None:
+    items = iter_dataset(args.data)
+    infer = _load_model() if args.labels == "model" else None
+    X, y = [], []
+    for path, label in items:
+        signal = load_clip(path, args.max_seconds)
+        if infer is not None:
+            label = int(np.argmax(infer(signal)))
+        if label is None:
+            continue
+        X.append(spectral_features(signal, SAMPLE_RATE))
+        y.append(label)
+    if len(set(y)) < 2:
+        raise SystemExit("Se necesitan clips de ambas clases para entrenar el pre-clasificador")
+    clf = CascadeClassifier.train(np.stack(X), np.asarray(y))
+    clf.save(args.output)
+    print(f"Pre-clasificador entrenado con {len(y)} clips ({sum(y)} falsos) -> {args.output}")
+
+
+def cmd_eval(args) -> None:
+    clf = CascadeClassifier.load(args.cascade) if args.cascade else None
+    infer = _load_model()
+    prefix_n = int(args.prefix_seconds * SAMPLE_RATE) if args.prefix_seconds else None
+
+    records = []
+    for path, label in iter_dataset(args.data):
+        signal = load_clip(path, args.max_seconds)
+        logits, full_s = _timed(lambda: infer(signal))
+        rec = ClipRecord(label=label, full_pred=int(np.argmax(logits)), full_s=full_s, features_s=0.0)
+        if clf is not None:
+            p_fake, rec.features_s = _timed(lambda: float(clf.fake_probability(spectral_features(signal))[0]))
+            rec.p_fake = p_fake
+        if prefix_n and signal.shape[0] > prefix_n:
+            prefix_logits, rec.prefix_s = _timed(lambda: infer(signal[:prefix_n]))
+            rec.prefix_pred = int(np.argmax(prefix_logits))
+            rec.prefix_margin = logit_margin(prefix_logits)
+        records.append(rec)
+    if not records:
+        raise SystemExit(f"No hay audios en {args.data}")
+
+    margins = _floats(args.margins) if prefix_n else [None]
+    rows = [
+        simulate(records, fb, args.fake_above, m)
+        for fb in (_floats(args.fake_below) if clf is not None else [-1.0])
+        for m in margins
+    ]
+
+    labelled = [r for r in records if r.label is not None]
+    if labelled:
+        acc = np.mean([r.full_pred == r.label for r in labelled])
+        print(f"Modelo completo vs etiquetas: {acc:.3f} ({len(labelled)} clips)")
+    print(f"{'P(falso)<=':>10} {'margen':>7} {'concord.':>9} {'sal.pre':>8} {'sal.pref':>9} {'ahorro':>7}")
+    for row in rows:
+        margin = "-" if row["margin"] is None else f"{row['margin']:.2f}"
+        fb = "-" if row["fake_below"] < 0 else f"{row['fake_below']:.3f}"
+        print(f"{fb:>10} {margin:>7} {row['agreement']:>9.3f} {row['exit_prefilter']:>8.1%} "
+              f"{row['exit_prefix']:>9.1%} {row['compute_saved']:>7.1%}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"clips": len(records), "rows": rows, "records": [asdict(r) for r in records]}, f, indent=2)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Inferencia en cascada: entrenamiento y evaluación")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    train = sub.add_parser("train", help="entrena el pre-clasificador espectral")
+    train.add_argument("--data", required=True, help="carpeta con subcarpetas real/ y falso/")
+    train.add_argument("--labels", choices=["folder", "model"], default="folder",
+                       help="etiquetas de carpeta o veredictos del modelo completo")
+    train.add_argument("--output", default=settings.CASCADE_MODEL_PATH)
+    train.add_argument("--max-seconds", type=float, default=settings.MAX_AUDIO_SECONDS)
+    train.set_defaults(func=cmd_train)
+
+    ev = sub.add_parser("eval", help="cómputo ahorrado vs concordancia con el modelo completo")
+    ev.add_argument("--data", required=True)
+    ev.add_argument("--cascade", default=settings.CASCADE_MODEL_PATH,
+                    help="modelo del pre-clasificador (vacío = solo salida temprana)")
+    ev.add_argument("--fake-below", default=str(settings.CASCADE_FAKE_BELOW), help="lista separada por comas")
+    ev.add_argument("--fake-above", type=float, default=settings.CASCADE_FAKE_ABOVE)
+    ev.add_argument("--prefix-seconds", type=float, default=settings.EARLY_EXIT_SECONDS)
+    ev.add_argument("--margins", default=str(settings.EARLY_EXIT_MARGIN), help="lista separada por comas")
+    ev.add_argument("--max-seconds", type=float, default=settings.MAX_AUDIO_SECONDS)
+    ev.add_argument("--output", help="guarda el informe en JSON")
+    ev.set_defaults(func=cmd_eval)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
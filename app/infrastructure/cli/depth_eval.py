@@ -0,0 +1,84 @@
+# app/infrastructure/cli/depth_eval.py
+"""Precisión y latencia del clasificador por profundidad del encoder (modo rápido).
+
+Uso:
+    python -m app.infrastructure.cli.depth_eval --data ./dataset --depths 4,6,8,12
+"""
+import argparse
+import json
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.application.reduced_depth import encoder_depth, truncated_view
+from app.config import get_settings
+from app.infrastructure.cli._dataset import iter_dataset, load_clip
+
+
+def summarize_depth(depth: int, preds: Sequence[int], reference: Sequence[int],
+                    labels: Sequence[Optional[int]], seconds: Sequence[float]) -> Dict:
+    """Fila del informe: concordancia con el modelo completo, precisión y latencia."""
+    preds = np.asarray(preds)
+    ms = np.asarray(seconds) * 1000.0
+    labelled = [(p, l) for p, l in zip(preds, labels) if l is not None]
+    return {
+        "depth": depth,
+        "clips": int(preds.shape[0]),
+        "agreement": float(np.mean(preds == np.asarray(reference))),
+        "accuracy": float(np.mean([p == l for p, l in labelled])) if labelled else None,
+        "mean_ms": round(float(ms.mean()), 2),
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Evaluación del modo rápido por profundidad")
+    parser.add_argument("--data", required=True, help="carpeta con subcarpetas real/ y falso/")
+    parser.add_argument("--depths", help="profundidades separadas por comas (por defecto todas)")
+    parser.add_argument("--max-seconds", type=float, default=settings.MAX_AUDIO_SECONDS)
+    parser.add_argument("--output", help="guarda el informe en JSON")
+    args = parser.parse_args(argv)
+
+    import torch
+    from app.application.feature_preparation import FeaturePreparer
+    from app.infrastructure.model_loader import model, processor
+
+    total = encoder_depth(model)
+    if total is None:
+        raise SystemExit("El modelo no expone wav2vec2.encoder.layers")
+    depths = sorted({int(d) for d in args.depths.split(",")}) if args.depths else list(range(1, total + 1))
+    views = {d: truncated_view(model, d) for d in depths + [total]}
+
+    features = FeaturePreparer.from_processor(processor)
+    items = iter_dataset(args.data)
+    if not items:
+        raise SystemExit(f"No hay audios en {args.data}")
+
+    labels = [label for _, label in items]
+    preds = {d: [] for d in views}
+    seconds = {d: [] for d in views}
+    with torch.inference_mode():
+        for path, _ in items:
+            inputs = features.prepare(load_clip(path, args.max_seconds))
+            for d, view in views.items():
+                t0 = time.perf_counter()
+                logits = view(**inputs).logits
+                seconds[d].append(time.perf_counter() - t0)
+                preds[d].append(int(torch.argmax(logits, dim=1).item()))
+
+    rows = [summarize_depth(d, preds[d], preds[total], labels, seconds[d]) for d in sorted(views)]
+    print(f"{'capas':>5} {'concord.':>9} {'precisión':>10} {'media ms':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for r in rows:
+        acc = "-" if r["accuracy"] is None else f"{r['accuracy']:.3f}"
+        print(f"{r['depth']:>5} {r['agreement']:>9.3f} {acc:>10} {r['mean_ms']:>9.2f} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"total_layers": total, "rows": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
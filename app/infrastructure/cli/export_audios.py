@@ -0,0 +1,57 @@
+# app/infrastructure/cli/export_audios.py
+"""Exporta el historial de análisis a CSV/NDJSON en streaming (memoria constante),
+incluidos los meses que la retención ya movió a `audios_archive_YYYYMM`.
+
+Uso:
+    python -m app.infrastructure.cli.export_audios --format ndjson --output audios.ndjson.gz
+    python -m app.infrastructure.cli.export_audios --user-id 3 --since 2025-01-01 --result falso > falsos.csv
+"""
+import argparse
+import sys
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import HTTPException
+
+from app.application.audio_export import ExportFilters, iter_export, gzip_stream
+from app.config import get_settings
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Exportación del historial de audios")
+    parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    parser.add_argument("--output", help="archivo destino (.gz = comprimido); por defecto stdout")
+    parser.add_argument("--gzip", action="store_true", help="comprime aunque el destino no termine en .gz")
+    parser.add_argument("--user-id", type=int)
+    parser.add_argument("--since", type=datetime.fromisoformat, help="fecha/hora ISO (incluida)")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="fecha/hora ISO (excluida)")
+    parser.add_argument("--result", choices=["real", "falso"])
+    parser.add_argument("--batch-size", type=int, default=settings.EXPORT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    from app.infrastructure.database.audio_archive_repo_impl import SQLAudioArchiveRepository
+    from app.infrastructure.database.audio_repo_impl import SQLAudioRepository
+
+    filters = ExportFilters(user_id=args.user_id, since=args.since, until=args.until, result=args.result)
+    try:
+        chunks = iter_export(SQLAudioRepository(), args.format, filters, args.batch_size,
+                             archive=SQLAudioArchiveRepository())
+    except HTTPException as e:
+        parser.error(e.detail)
+    if args.gzip or (args.output or "").endswith(".gz"):
+        chunks = gzip_stream(chunks)
+
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+        else:
+            out.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# app/infrastructure/cli/import_report.py
+"""Tiempo de arranque e imports por rol (auth / history / inference).
+
+Cada rol se mide en un proceso limpio con `python -X importtime`, montando la
+app solo con ese rol. Sirve de control en CI: falla si un rol sin inferencia
+importa librerías de ML o si el arranque supera `--max-seconds`.
+
+Uso:
+    python -m app.infrastructure.cli.import_report
+    python -m app.infrastructure.cli.import_report --roles auth,auth+history --max-seconds 2 --json
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+# Paquetes que solo deberían cargarse con el rol de inferencia
+HEAVY_MODULES = ("torch", "transformers", "librosa", "sklearn", "numba")
+
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - t0
+print(json.dumps({"seconds": elapsed, "modules": len(sys.modules),
+                  "heavy": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+\d+\s+\|\s*(\S+)")
+
+
+def parse_importtime(stderr: str) -> Dict[str, int]:
+    """Microsegundos propios (self) sumados por paquete raíz.
+
+    Se suma el tiempo propio y no el acumulado: así `app` no se lleva el coste
+    de fastapi, sqlalchemy, torch... que importa por debajo.
+    """
+    totals: Dict[str, int] = {}
+    for line in stderr.splitlines():
+        m = _LINE.match(line)
+        if not m:
+            continue
+        root = m.group(2).split(".", 1)[0]
+        totals[root] = totals.get(root, 0) + int(m.group(1))
+    return totals
+
+
+def measure_role(roles: List[str], top: int = 10, env: Optional[Dict[str, str]] = None) -> Dict:
+    """Arranca `app.main` en un subproceso con APP_ROLES=roles y devuelve el informe."""
+    child_env = dict(os.environ if env is None else env)
+    child_env["APP_ROLES"] = json.dumps(roles)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE],
+        capture_output=True, text=True, env=child_env,
+        cwd=os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")),
+    )
+    if proc.returncode != 0:
+        errors = [l for l in proc.stderr.splitlines() if not l.startswith("import time:")]
+        raise RuntimeError(f"arranque con roles {roles} falló:\n" + "\n".join(errors[-15:]))
+    probe = json.loads(proc.stdout.strip().splitlines()[-1])
+    packages = sorted(parse_importtime(proc.stderr).items(), key=lambda kv: kv[1], reverse=True)
+    return {
+        "roles": roles,
+        "startup_s": round(probe["seconds"], 3),
+        "modules": probe["modules"],
+        "heavy": probe["heavy"],
+        "top_imports": [{"package": p, "ms": round(us / 1000.0, 1)} for p, us in packages[:top]],
+    }
+
+
+def check(report: Dict, max_seconds: Optional[float]) -> List[str]:
+    problems = []
+    if "inference" not in report["roles"] and report["heavy"]:
+        problems.append(f"{'+'.join(report['roles'])}: importa {', '.join(report['heavy'])}")
+    if max_seconds is not None and report["startup_s"] > max_seconds:
+        problems.append(f"{'+'.join(report['roles'])}: arranque {report['startup_s']}s > {max_seconds}s")
+    return problems
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Informe de tiempo de import por rol")
+    parser.add_argument("--roles", default="auth,history,inference",
+                        help="conjuntos separados por comas; '+' combina roles (p. ej. auth+history)")
+    parser.add_argument("--top", type=int, default=10, help="paquetes más lentos a mostrar")
+    parser.add_argument("--max-seconds", type=float, help="falla si algún conjunto sin inference tarda más")
+    parser.add_argument("--json", action="store_true", help="salida JSON")
+    args = parser.parse_args(argv)
+
+    reports = [measure_role(group.split("+"), args.top) for group in args.roles.split(",") if group]
+    problems = []
+    for report in reports:
+        limit = None if "inference" in report["roles"] else args.max_seconds
+        problems.extend(check(report, limit))
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        for r in reports:
+            print(f"{'+'.join(r['roles']):<24} {r['startup_s']:>7.2f}s  {r['modules']:>5} módulos"
+                  f"  ML: {', '.join(r['heavy']) or '-'}")
+            for item in r["top_imports"]:
+                print(f"    {item['package']:<28} {item['ms']:>9.1f} ms")
+    for p in problems:
+        print(f"[import-report] {p}", file=sys.stderr)
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# app/infrastructure/cli/inference_worker.py
+"""Worker de inferencia: carga el modelo y atiende la cola de los nodos API.
+
+Mismo host (socket Unix): un worker aloja la cola con --serve-queue y el
+resto (y las APIs) se conectan a INFERENCE_QUEUE_ADDRESS. Varios nodos:
+INFERENCE_TRANSPORT=redis.
+
+Uso:
+    python -m app.infrastructure.cli.inference_worker --serve-queue --threads 2
+    INFERENCE_TRANSPORT=redis python -m app.infrastructure.cli.inference_worker
+"""
+import argparse
+import signal
+import sys
+import threading
+from typing import List, Optional
+
+from app.config import get_settings
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Worker de inferencia remota")
+    parser.add_argument("--transport", choices=["queue", "redis"], default=settings.INFERENCE_TRANSPORT)
+    parser.add_argument("--address", default=settings.INFERENCE_QUEUE_ADDRESS, help="socket Unix (transport=queue)")
+    parser.add_argument("--redis-url", default=settings.INFERENCE_REDIS_URL)
+    parser.add_argument("--serve-queue", action="store_true", help="este proceso aloja la cola local")
+    parser.add_argument("--threads", type=int, default=max(1, settings.INFERENCE_THREADS))
+    args = parser.parse_args(argv)
+
+    settings = settings.copy(update={
+        "INFERENCE_TRANSPORT": args.transport,
+        "INFERENCE_QUEUE_ADDRESS": args.address,
+        "INFERENCE_REDIS_URL": args.redis_url,
+    })
+
+    from app.application.audio_service import AudioService
+    from app.application.cascade import load_cascade
+    from app.application.remote_inference import InferenceWorker
+    from app.infrastructure.inference_transport import transport_from_settings
+    from app.infrastructure.logs import configure_logging
+    from app.infrastructure.model_loader import model, processor
+
+    configure_logging(settings.LOG_LEVEL, settings.LOG_JSON)
+
+    transport = transport_from_settings(settings, serve=args.serve_queue)
+    # Sin repositorio: los resultados los guarda el nodo API
+    service = AudioService(None, model, processor, settings=settings, cascade=load_cascade(settings))
+    if settings.BUCKET_WARMUP:
+        service.warmup()
+    worker = InferenceWorker(transport, service.infer_signal, threads=args.threads,
+                             heartbeat_seconds=settings.REMOTE_HEARTBEAT_SECONDS)
+
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+    print(f"[worker] {worker.worker_id} atendiendo ({args.transport}, {args.threads} hilos)", file=sys.stderr)
+    worker.serve_forever(stop)
+    print(f"[worker] {worker.worker_id} detenido tras {worker.served} trabajos", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
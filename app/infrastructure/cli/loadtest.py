@@ -0,0 +1,365 @@
+# app/infrastructure/cli/loadtest.py
+"""Prueba de carga end-to-end de la API (login + /predict-audio + GET /audios).
+
+Uso:
+    # En proceso (ASGI), modelo simulado y SQLite local
+    python -m app.infrastructure.cli.loadtest --stub-model --database-url sqlite:///./loadtest.db
+
+    # Contra un uvicorn local
+    python -m app.infrastructure.cli.loadtest --base-url http://127.0.0.1:8000 --duration 60
+
+    # Comparar con un reporte anterior
+    python -m app.infrastructure.cli.loadtest --stub-model --output new.json --compare old.json
+
+    # Contra un servidor con usuarios ya creados (una línea "email,password" por usuario)
+    python -m app.infrastructure.cli.loadtest --base-url http://127.0.0.1:8000 --credentials users.csv
+
+El reporte JSON incluye commit, configuración y, por operación, throughput y
+latencias p50/p90/p99, para comparar entre commits. Los 429 (rate limit /
+cola por usuario) se cuentan aparte en `rate_limited` y no entran en las
+latencias.
+
+Para medir capacidad hay que desactivar el reparto justo y la admisión
+(FAIR_SCHEDULING=false ADMISSION_ENABLED=false): con pocos usuarios el rate
+limit por usuario rechaza casi todo y la admisión recorta la concurrencia,
+así que se mediría la política y no el servidor. En modo en proceso el
+reporte guarda ambos valores en `meta`.
+
+Los usuarios se crean directamente en la BD en modo en proceso; contra un
+servidor se registran vía /auth/register (el dominio de --email-domain debe
+pasar la comprobación de entregabilidad) o se pasan con --credentials.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import types
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.infrastructure.cli._synthetic import synthetic_wav_bytes
+
+DEFAULT_PASSWORD = "loadtest-password"
+
+
+# ---------------- Utilidades puras (reporte) ----------------
+def parse_mix(spec: str) -> Dict[str, float]:
+    """"predict=0.8,audios=0.2" -> pesos normalizados."""
+    weights: Dict[str, float] = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        name, _, value = part.partition("=")
+        name = name.strip()
+        if name not in ("predict", "audios"):
+            raise ValueError(f"Operación desconocida en --mix: {name}")
+        weights[name] = float(value or 1.0)
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError("--mix debe tener algún peso positivo")
+    return {k: v / total for k, v in weights.items()}
+
+
+def summarize(latencies: List[float], statuses: List[int], elapsed: float) -> Dict:
+    """Latencias en segundos -> resumen en ms (los 429 no cuentan como error ni para las latencias)."""
+    served = [l for l, s in zip(latencies, statuses) if s != 429]
+    lat = np.asarray(served, dtype=np.float64) * 1000.0
+    errors = sum(1 for s in statuses if (s >= 400 and s != 429) or s == 0)
+    out = {
+        "count": len(statuses),
+        "errors": errors,
+        "rate_limited": sum(1 for s in statuses if s == 429),
+        "statuses": {str(k): v for k, v in sorted(Counter(statuses).items())},
+        "throughput": round(len(statuses) / elapsed, 3) if elapsed > 0 else 0.0,
+    }
+    if lat.size:
+        out.update({
+            "mean_ms": round(float(lat.mean()), 2),
+            "p50_ms": round(float(np.percentile(lat, 50)), 2),
+            "p90_ms": round(float(np.percentile(lat, 90)), 2),
+            "p99_ms": round(float(np.percentile(lat, 99)), 2),
+            "max_ms": round(float(lat.max()), 2),
+        })
+    return out
+
+
+def compare_reports(old: Dict, new: Dict) -> List[Tuple[str, str, float, float, float]]:
+    """Filas (operación, métrica, antes, después, % de cambio)."""
+    rows = []
+    for op, stats in new.get("ops", {}).items():
+        before = old.get("ops", {}).get(op)
+        if not before:
+            continue
+        for metric in ("throughput", "p50_ms", "p99_ms"):
+            if metric in stats and metric in before and before[metric]:
+                change = 100.0 * (stats[metric] - before[metric]) / before[metric]
+                rows.append((op, metric, before[metric], stats[metric], round(change, 1)))
+    return rows
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# ---------------- Modelo simulado ----------------
+class StubModel:
+    """Devuelve logits fijos; aísla framework + BD del coste de inferencia."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+
+    def __call__(self, input_values=None, **kwargs):
+        import torch
+
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        batch = input_values.shape[0] if input_values is not None else 1
+        return types.SimpleNamespace(logits=torch.tensor([[1.0, 0.0]]).repeat(batch, 1))
+
+
+def install_stub_model(latency_ms: float = 0.0) -> None:
+    """Registra un model_loader simulado antes de importar la app."""
+    if "app.infrastructure.model_loader" in sys.modules:
+        raise RuntimeError("El modelo real ya está cargado; usa --stub-model antes de importar la app")
+    stub = types.ModuleType("app.infrastructure.model_loader")
+    stub.MODEL_REPO = "stub"
+    stub.model = StubModel(latency_ms)
+    stub.processor = None
+    sys.modules["app.infrastructure.model_loader"] = stub
+
+
+# ---------------- Generador de carga ----------------
+class LoadRunner:
+    def __init__(self, client, args, uploads: List[Tuple[str, bytes]]):
+        self.client = client
+        self.args = args
+        self.uploads = uploads
+        self.mix = parse_mix(args.mix)
+        self.tokens: List[str] = []
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, List[int]] = defaultdict(list)
+
+    async def login_users(self, credentials: Optional[List[Tuple[str, str]]] = None) -> None:
+        """Login de cada usuario; sin `credentials` se registran los que falten."""
+        register = credentials is None
+        if credentials is None:
+            credentials = [(f"{self.args.email_prefix}{i}@{self.args.email_domain}", DEFAULT_PASSWORD)
+                           for i in range(self.args.users)]
+        for email, password in credentials:
+            r = await self.client.post("/auth/login", json={"email": email, "password": password})
+            if r.status_code == 401 and register:
+                reg = await self.client.post("/auth/register", json={"email": email, "password": password})
+                if reg.status_code not in (201, 409):
+                    raise RuntimeError(f"No se pudo registrar {email}: {reg.status_code} {reg.text} "
+                                       "(usa --credentials o un --email-domain entregable)")
+                r = await self.client.post("/auth/login", json={"email": email, "password": password})
+            r.raise_for_status()
+            self.tokens.append(r.json()["tokens"]["access_token"])
+
+    async def _one(self, rng: random.Random, token: str, record: bool) -> None:
+        op = rng.choices(list(self.mix), weights=list(self.mix.values()))[0]
+        headers = {"Authorization": f"Bearer {token}"}
+        t0 = time.perf_counter()
+        try:
+            if op == "predict":
+                name, payload = rng.choice(self.uploads)
+                r = await self.client.post(
+                    "/predict-audio", headers=headers,
+                    files={"file": (name, payload, "audio/wav")},
+                )
+            else:
+                r = await self.client.get("/audios", headers=headers)
+            status = r.status_code
+        except Exception as e:
+            print(f"[ERROR] {op}: {e}")
+            status = 0
+        if record:
+            self.latencies[op].append(time.perf_counter() - t0)
+            self.statuses[op].append(status)
+
+    async def _user_loop(self, vu: int, deadline: float, budget: List[int]) -> None:
+        rng = random.Random(self.args.seed + vu)
+        token = self.tokens[vu % len(self.tokens)]
+        while time.perf_counter() < deadline:
+            if budget[0] <= 0:
+                return
+            budget[0] -= 1
+            await self._one(rng, token, record=True)
+
+    async def run(self, credentials: Optional[List[Tuple[str, str]]] = None) -> Tuple[Dict, float]:
+        await self.login_users(credentials)
+        rng = random.Random(self.args.seed)
+        for i in range(self.args.warmup):
+            await self._one(rng, self.tokens[i % len(self.tokens)], record=False)
+
+        budget = [self.args.requests if self.args.requests else sys.maxsize]
+        start = time.perf_counter()
+        deadline = start + self.args.duration
+        await asyncio.gather(*(self._user_loop(vu, deadline, budget) for vu in range(self.args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+        ops = {op: summarize(self.latencies[op], self.statuses[op], elapsed) for op in self.statuses}
+        all_lat = [v for op in self.latencies for v in self.latencies[op]]
+        all_st = [v for op in self.statuses for v in self.statuses[op]]
+        return {"ops": ops, "total": summarize(all_lat, all_st, elapsed)}, elapsed
+
+
+def _build_uploads(sample_rates: List[int], lengths: List[float]) -> List[Tuple[str, bytes]]:
+    uploads = []
+    for sr in sample_rates:
+        for seconds in lengths:
+            name = f"synthetic_{sr}hz_{seconds:g}s.wav"
+            uploads.append((name, synthetic_wav_bytes(seconds, sr, seed=sr + int(seconds * 10))))
+    return uploads
+
+
+def read_credentials(path: str) -> List[Tuple[str, str]]:
+    """Archivo con una línea "email,password" por usuario (se ignoran vacías y #comentarios)."""
+    out = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            email, _, password = line.partition(",")
+            out.append((email.strip(), password.strip() or DEFAULT_PASSWORD))
+    if not out:
+        raise ValueError(f"{path} no tiene credenciales")
+    return out
+
+
+def seed_users(emails: List[str], password: str = DEFAULT_PASSWORD) -> List[Tuple[str, str]]:
+    """Crea los usuarios directamente en la BD (sin /auth/register ni comprobación de dominio)."""
+    from app.domain.models.user import User
+    from app.infrastructure.database.user_repo_impl import SQLUserRepository
+    from app.infrastructure.security import hash_password
+
+    users = SQLUserRepository()
+    for email in emails:
+        if users.get_by_email(email) is None:
+            users.create(User(email=email, hashed_password=hash_password(password), is_verified=True))
+    return [(email, password) for email in emails]
+
+
+def _in_process_app(args):
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    if args.stub_model:
+        install_stub_model(args.stub_latency_ms)
+    from app.main import app
+    from app.infrastructure.database.connection import create_db_and_tables
+
+    create_db_and_tables()  # ASGITransport no ejecuta el lifespan
+    return app
+
+
+async def _main_async(args) -> Dict:
+    import httpx
+
+    credentials = read_credentials(args.credentials) if args.credentials else None
+    policy = {}
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout)
+        mode = "http"
+    else:
+        app = _in_process_app(args)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest",
+                                   timeout=args.timeout)
+        mode = "asgi"
+        if credentials is None:
+            credentials = seed_users([f"{args.email_prefix}{i}@{args.email_domain}" for i in range(args.users)])
+        from app.config import get_settings
+
+        settings = get_settings()
+        policy = {"fair_scheduling": settings.FAIR_SCHEDULING, "admission": settings.ADMISSION_ENABLED}
+        if any(policy.values()):
+            print("[loadtest] aviso: FAIR_SCHEDULING/ADMISSION_ENABLED activos; "
+                  "para medir capacidad desactívalos", file=sys.stderr)
+
+    uploads = _build_uploads(args.sample_rates, args.lengths)
+    async with client:
+        result, elapsed = await LoadRunner(client, args, uploads).run(credentials)
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "mode": mode,
+            "stub_model": bool(args.stub_model),
+            "concurrency": args.concurrency,
+            "users": args.users,
+            "mix": parse_mix(args.mix),
+            "sample_rates": args.sample_rates,
+            "lengths": args.lengths,
+            "elapsed_s": round(elapsed, 3),
+            **policy,
+        },
+        **result,
+    }
+
+
+def _print_report(report: Dict) -> None:
+    print(f"\ncommit={report['meta']['commit']} mode={report['meta']['mode']} "
+          f"stub={report['meta']['stub_model']} elapsed={report['meta']['elapsed_s']}s")
+    print(f"{'op':<9} {'n':>6} {'err':>5} {'429':>5} {'req/s':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} "
+          f"{'max ms':>8}")
+    for op, s in list(report["ops"].items()) + [("total", report["total"])]:
+        print(f"{op:<9} {s['count']:>6} {s['errors']:>5} {s.get('rate_limited', 0):>5} {s['throughput']:>8.2f} "
+              f"{s.get('p50_ms', 0):>8.1f} {s.get('p90_ms', 0):>8.1f} {s.get('p99_ms', 0):>8.1f} "
+              f"{s.get('max_ms', 0):>8.1f}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Prueba de carga de la API de detección")
+    parser.add_argument("--base-url", help="URL de un uvicorn en marcha; sin ella se usa la app en proceso (ASGI)")
+    parser.add_argument("--database-url", help="DATABASE_URL para el modo en proceso")
+    parser.add_argument("--stub-model", action="store_true", help="modelo simulado (solo en proceso)")
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--users", type=int, default=1, help="usuarios distintos (round-robin entre clientes)")
+    parser.add_argument("--email-prefix", default="loadtest")
+    parser.add_argument("--email-domain", default="gmail.com",
+                        help="dominio de los usuarios generados (con --base-url debe pasar la validación de email)")
+    parser.add_argument("--credentials", help='usuarios existentes: una línea "email,password" por usuario')
+    parser.add_argument("--duration", type=float, default=30.0, help="segundos de medición")
+    parser.add_argument("--requests", type=int, default=0, help="máximo de peticiones (0 = sin límite)")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--mix", default="predict=0.8,audios=0.2")
+    parser.add_argument("--sample-rates", type=lambda v: [int(x) for x in v.split(",")], default=[16000, 44100])
+    parser.add_argument("--lengths", type=lambda v: [float(x) for x in v.split(",")], default=[1.0, 3.0, 5.0])
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="guardar el reporte en JSON")
+    parser.add_argument("--compare", help="reporte JSON previo para comparar")
+    args = parser.parse_args(argv)
+
+    if args.stub_model and args.base_url:
+        parser.error("--stub-model solo aplica al modo en proceso")
+
+    report = asyncio.run(_main_async(args))
+    _print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        print(f"\nComparación con {old.get('meta', {}).get('commit')}:")
+        for op, metric, before, after, change in compare_reports(old, report):
+            print(f"  {op:<8} {metric:<11} {before:>10} -> {after:<10} ({change:+.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
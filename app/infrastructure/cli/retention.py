@@ -0,0 +1,42 @@
+# app/infrastructure/cli/retention.py
+"""Rollups diarios y archivado mensual del historial (pensado para un cron diario).
+
+Uso:
+    python -m app.infrastructure.cli.retention                   # rollups + archivado
+    python -m app.infrastructure.cli.retention --dry-run         # qué meses se archivarían
+    python -m app.infrastructure.cli.retention --rollup-only
+    python -m app.infrastructure.cli.retention --older-than-days 90
+"""
+import argparse
+import json
+import sys
+from typing import List, Optional
+
+from app.config import get_settings
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Retención del historial de audios")
+    parser.add_argument("--older-than-days", type=int, default=settings.RETENTION_DAYS)
+    parser.add_argument("--batch-size", type=int, default=settings.RETENTION_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="solo muestra el plan")
+    parser.add_argument("--rollup-only", action="store_true", help="recalcula rollups sin archivar")
+    args = parser.parse_args(argv)
+
+    from app.application.retention_service import RetentionService
+    from app.domain.models.user import User  # noqa: F401  (FK de audios)
+    from app.infrastructure.database.audio_archive_repo_impl import SQLAudioArchiveRepository
+    from app.infrastructure.database.connection import create_db_and_tables
+
+    create_db_and_tables()  # tablas de catálogo/rollups e índices de `created`
+    service = RetentionService(SQLAudioArchiveRepository(), args.older_than_days, args.batch_size)
+    report = service.run(dry_run=args.dry_run, archive=not args.rollup_only)
+    print(json.dumps(report, indent=2))
+    if not args.dry_run:
+        total = sum(report["archived"].values())
+        print(f"[retention] {total} filas archivadas en {len(report['archived'])} meses", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
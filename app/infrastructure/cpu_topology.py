@@ -0,0 +1,183 @@
+# app/infrastructure/cpu_topology.py
+"""Configuración de hilos (torch, BLAS, numba) y afinidad de CPU por worker."""
+import logging
+import os
+import tempfile
+from typing import Dict, List, Optional
+
+from app.config import Settings
+
+log = logging.getLogger(__name__)
+
+_SLOT_LOCK_PREFIX = "deepfake-cpu-slot-"
+
+# Referencia viva al limitador de threadpoolctl (si se libera, se restauran los límites)
+_blas_limiter = None
+
+
+def parse_cpu_list(spec: str) -> List[int]:
+    """Convierte "0-3,6" en [0, 1, 2, 3, 6]."""
+    cpus: List[int] = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            lo, hi = int(start), int(end)
+            if hi < lo:
+                raise ValueError(f"Rango de CPUs inválido: {part}")
+            cpus.extend(range(lo, hi + 1))
+        else:
+            cpus.append(int(part))
+    return sorted(set(cpus))
+
+
+def format_cpu_list(cpus: List[int]) -> str:
+    return ",".join(str(c) for c in cpus)
+
+
+def split_cpus(cpus: List[int], groups: int) -> List[List[int]]:
+    """Reparte los cores en `groups` bloques contiguos lo más parejos posible."""
+    if groups < 1:
+        raise ValueError("groups debe ser >= 1")
+    groups = min(groups, len(cpus))
+    size, extra = divmod(len(cpus), groups)
+    out, start = [], 0
+    for i in range(groups):
+        end = start + size + (1 if i < extra else 0)
+        out.append(cpus[start:end])
+        start = end
+    return out
+
+
+def available_cpus() -> List[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def claim_worker_slot(n_slots: int, lock_dir: Optional[str] = None) -> int:
+    """Reserva un hueco libre [0, n_slots) para este proceso mediante lock files.
+
+    Los workers de uvicorn no conocen su índice; cada uno toma el primer hueco
+    libre. Los huecos de procesos muertos se reutilizan. Si todos están
+    ocupados se devuelve pid % n_slots.
+    """
+    lock_dir = lock_dir or tempfile.gettempdir()
+    pid = os.getpid()
+    for slot in range(n_slots):
+        path = os.path.join(lock_dir, f"{_SLOT_LOCK_PREFIX}{slot}.lock")
+        for _ in range(2):
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    with open(path) as f:
+                        owner = int(f.read().strip() or 0)
+                except (OSError, ValueError):
+                    owner = 0
+                if owner == pid:
+                    return slot
+                if owner and _pid_alive(owner):
+                    break
+                # lock huérfano: se elimina y se reintenta una vez
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                continue
+            with os.fdopen(fd, "w") as f:
+                f.write(str(pid))
+            return slot
+    return pid % n_slots
+
+
+def resolve_affinity(spec: Optional[str], workers: int, lock_dir: Optional[str] = None) -> Optional[List[int]]:
+    """Devuelve los cores asignados a este worker según CPU_AFFINITY, o None."""
+    if not spec:
+        return None
+    spec = spec.strip()
+    if spec.lower() == "auto":
+        groups = split_cpus(available_cpus(), max(1, workers))
+    else:
+        groups = [parse_cpu_list(g) for g in spec.split(";") if g.strip()]
+    if len(groups) == 1:
+        return groups[0]
+    return groups[claim_worker_slot(len(groups), lock_dir)]
+
+
+def apply_thread_limits(
+    intra_op: Optional[int] = None,
+    inter_op: Optional[int] = None,
+    blas: Optional[int] = None,
+    numba_threads: Optional[int] = None,
+    cpus: Optional[List[int]] = None,
+) -> Dict[str, object]:
+    """Aplica afinidad y límites de hilos al proceso actual. Devuelve lo aplicado.
+
+    Todo se fija en caliente (torch, threadpoolctl, numba): cuando se llama,
+    torch ya está importado y OMP_NUM_THREADS & co. ya no tendrían efecto.
+    Para fijarlas por entorno hay que hacerlo antes de importar torch
+    (como cli/autotune.py al lanzar cada configuración).
+    """
+    global _blas_limiter
+    applied: Dict[str, object] = {}
+
+    if cpus:
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, cpus)
+            applied["cpus"] = format_cpu_list(cpus)
+        # sin límites explícitos, un hilo por core asignado
+        intra_op = intra_op or len(cpus)
+        blas = blas or len(cpus)
+        numba_threads = numba_threads or len(cpus)
+
+    import torch
+
+    if intra_op:
+        torch.set_num_threads(intra_op)
+        applied["torch_intra_op"] = intra_op
+    if inter_op:
+        try:
+            torch.set_num_interop_threads(inter_op)
+            applied["torch_inter_op"] = inter_op
+        except RuntimeError:
+            # solo se puede fijar una vez y antes de cualquier trabajo paralelo
+            log.warning("No se pudo fijar torch inter-op threads=%s", inter_op)
+
+    if blas:
+        from threadpoolctl import threadpool_limits
+        _blas_limiter = threadpool_limits(limits=blas, user_api="blas")
+        applied["blas"] = blas
+
+    if numba_threads:
+        try:
+            import numba
+            numba.set_num_threads(min(numba_threads, numba.config.NUMBA_NUM_THREADS))
+            applied["numba"] = numba_threads
+        except ImportError:
+            pass
+
+    return applied
+
+
+def configure_cpu_threads(settings: Settings) -> Dict[str, object]:
+    cpus = resolve_affinity(settings.CPU_AFFINITY, settings.WORKERS)
+    return apply_thread_limits(
+        intra_op=settings.TORCH_INTRA_OP_THREADS,
+        inter_op=settings.TORCH_INTER_OP_THREADS,
+        blas=settings.BLAS_THREADS,
+        numba_threads=settings.NUMBA_THREADS,
+        cpus=cpus,
+    )
@@ -0,0 +1,220 @@
+import logging
+from datetime import date, datetime, time, timezone
+from typing import Dict, Iterator, List, Optional
+from sqlalchemy import Column, Index, MetaData, Table, delete, func, insert, select as table_select
+from sqlmodel import select
+from app.domain.repositories.audio_archive_repository import IAudioArchiveRepository
+from app.domain.models.audio import Audio
+from app.domain.models.audio_archive import AudioArchiveMonth, AudioDailyRollup
+from app.infrastructure.database.connection import get_session
+
+log = logging.getLogger(__name__)
+
+# Tablas de archivo fuera de SQLModel.metadata: create_all no las crea, se crean al archivar
+_archive_metadata = MetaData()
+_hot = Audio.__table__
+
+
+def archive_table(month: str) -> Table:
+    """`audios_archive_YYYYMM`: mismas columnas que `audios`, sin FK, indexada por usuario y fecha."""
+    name = f"audios_archive_{month}"
+    table = _archive_metadata.tables.get(name)
+    if table is None:
+        columns = [Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable) for c in _hot.columns]
+        table = Table(name, _archive_metadata, *columns,
+                      Index(f"ix_{name}_user_id_created", "user_id", "created"))
+    return table
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+
+def _as_date(value) -> date:
+    # SQLite devuelve date() como texto; Postgres como date
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+
+def _month_overlaps(month: str, since: Optional[datetime], until: Optional[datetime]) -> bool:
+    start = datetime(int(month[:4]), int(month[4:]), 1)
+    end = datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+    if since is not None and end <= since.replace(tzinfo=None):
+        return False
+    return until is None or start < until.replace(tzinfo=None)
+
+
+class SQLAudioArchiveRepository(IAudioArchiveRepository):
+    # ---------------- Rollups diarios ----------------
+    def rollup_days(self, start: date, end: date) -> int:
+        """Recalcula los agregados de [start, end) desde la tabla caliente (idempotente)."""
+        day = func.date(Audio.created)
+        try:
+            with get_session() as session:
+                stmt = (
+                    select(
+                        day, Audio.user_id, Audio.result, func.count(),
+                        func.sum(Audio.authenticity_score),
+                        func.sum(func.coalesce(Audio.inference_duration, 0.0)),
+                        func.count(Audio.inference_duration),
+                    )
+                    .where(Audio.created >= _day_start(start), Audio.created < _day_start(end))
+                    .group_by(day, Audio.user_id, Audio.result)
+                )
+                rows = session.exec(stmt).all()
+                session.exec(delete(AudioDailyRollup).where(
+                    AudioDailyRollup.day >= start, AudioDailyRollup.day < end
+                ))
+                session.add_all([
+                    AudioDailyRollup(
+                        day=_as_date(d), user_id=u, result=r, count=n, score_sum=float(s or 0.0),
+                        inference_seconds_sum=float(secs or 0.0), inference_count=ni,
+                    )
+                    for d, u, r, n, s, secs, ni in rows
+                ])
+                session.commit()
+                return len(rows)
+        except Exception as e:
+            log.error("Rolling up audios failed: %s", e)
+            raise
+
+    def last_rollup_day(self) -> Optional[date]:
+        with get_session() as session:
+            value = session.exec(select(func.max(AudioDailyRollup.day))).first()
+            return _as_date(value) if value is not None else None
+
+    def oldest_hot(self) -> Optional[datetime]:
+        with get_session() as session:
+            return session.exec(select(func.min(Audio.created))).first()
+
+    def daily_stats(self, user_id: int, since: Optional[date] = None, until: Optional[date] = None) -> List[AudioDailyRollup]:
+        with get_session() as session:
+            stmt = select(AudioDailyRollup).where(AudioDailyRollup.user_id == user_id)
+            if since is not None:
+                stmt = stmt.where(AudioDailyRollup.day >= since)
+            if until is not None:
+                stmt = stmt.where(AudioDailyRollup.day < until)
+            return session.exec(stmt.order_by(AudioDailyRollup.day, AudioDailyRollup.result)).all()
+
+    # ---------------- Archivado ----------------
+    def archive_range(self, month: str, start: datetime, end: datetime, batch_size: int = 5000) -> int:
+        """Mueve las filas de [start, end) a la tabla del mes; una transacción por lote."""
+        table = archive_table(month)
+        moved = 0
+        try:
+            with get_session() as session:
+                table.create(session.get_bind(), checkfirst=True)
+            while True:
+                with get_session() as session:
+                    ids = session.exec(
+                        select(Audio.id)
+                        .where(Audio.created >= start, Audio.created < end)
+                        .order_by(Audio.id)
+                        .limit(batch_size)
+                    ).all()
+                    if not ids:
+                        break
+                    columns = [c.name for c in _hot.columns]
+                    session.exec(insert(table).from_select(
+                        columns, table_select(*[_hot.c[c] for c in columns]).where(_hot.c.id.in_(ids))
+                    ))
+                    session.exec(delete(_hot).where(_hot.c.id.in_(ids)))
+                    entry = session.get(AudioArchiveMonth, month) or AudioArchiveMonth(month=month, table_name=table.name)
+                    entry.rows += len(ids)
+                    entry.min_id = min(ids[0], entry.min_id if entry.min_id is not None else ids[0])
+                    entry.max_id = max(ids[-1], entry.max_id if entry.max_id is not None else ids[-1])
+                    entry.archived_at = datetime.now(timezone.utc)
+                    session.add(entry)
+                    session.commit()
+                    moved += len(ids)
+            return moved
+        except Exception as e:
+            log.error("Archiving audios for %s failed: %s", month, e)
+            raise
+
+    def months(self) -> List[AudioArchiveMonth]:
+        with get_session() as session:
+            return session.exec(select(AudioArchiveMonth).order_by(AudioArchiveMonth.month)).all()
+
+    # ---------------- Lectura ----------------
+    def get_archived_by_id(self, audio_id: int) -> Optional[Audio]:
+        with get_session() as session:
+            candidates = session.exec(
+                select(AudioArchiveMonth.month)
+                .where(AudioArchiveMonth.min_id <= audio_id, AudioArchiveMonth.max_id >= audio_id)
+            ).all()
+            for month in candidates:
+                table = archive_table(month)
+                row = session.exec(table_select(table).where(table.c.id == audio_id)).first()
+                if row is not None:
+                    return Audio(**row._mapping)
+        return None
+
+    def get_archived_by_user(
+        self, user_id: int, since: Optional[datetime] = None, until: Optional[datetime] = None
+    ) -> List[Audio]:
+        """Solo consulta los meses en los que el usuario tiene filas (según los rollups)."""
+        months = self._months_for_user(user_id, since, until)
+        audios: List[Audio] = []
+        with get_session() as session:
+            for month in months:
+                table = archive_table(month)
+                stmt = table_select(table).where(table.c.user_id == user_id)
+                if since is not None:
+                    stmt = stmt.where(table.c.created >= since)
+                if until is not None:
+                    stmt = stmt.where(table.c.created < until)
+                audios.extend(Audio(**row._mapping) for row in session.exec(stmt.order_by(table.c.created.desc())))
+        return audios
+
+    def iter_batches(
+        self,
+        batch_size: int = 1000,
+        user_id: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        result: Optional[str] = None,
+    ) -> Iterator[List[Audio]]:
+        """Filas archivadas por lotes keyset (mes a mes, del más antiguo), con los filtros del export."""
+        if user_id is not None:
+            months = sorted(self._months_for_user(user_id, since, until))
+        else:
+            months = [m.month for m in self.months() if _month_overlaps(m.month, since, until)]
+        for month in months:
+            table = archive_table(month)
+            filters = []
+            if user_id is not None:
+                filters.append(table.c.user_id == user_id)
+            if since is not None:
+                filters.append(table.c.created >= since)
+            if until is not None:
+                filters.append(table.c.created < until)
+            if result is not None:
+                filters.append(table.c.result == result)
+            last_id = 0
+            while True:
+                with get_session() as session:
+                    stmt = (
+                        table_select(table)
+                        .where(table.c.id > last_id, *filters)
+                        .order_by(table.c.id)
+                        .limit(batch_size)
+                    )
+                    batch = [Audio(**row._mapping) for row in session.exec(stmt)]
+                if not batch:
+                    break
+                last_id = batch[-1].id
+                yield batch
+
+    def _months_for_user(self, user_id: int, since: Optional[datetime], until: Optional[datetime]) -> List[str]:
+        with get_session() as session:
+            archived: Dict[str, AudioArchiveMonth] = {m.month: m for m in session.exec(select(AudioArchiveMonth)).all()}
+            if not archived:
+                return []
+            stmt = select(AudioDailyRollup.day).where(AudioDailyRollup.user_id == user_id).distinct()
+            if since is not None:
+                stmt = stmt.where(AudioDailyRollup.day >= since.date())
+            if until is not None:
+                stmt = stmt.where(AudioDailyRollup.day <= until.date())
+            days = session.exec(stmt).all()
+        months = {f"{_as_date(d):%Y%m}" for d in days}
+        return sorted((m for m in months if m in archived), reverse=True)
@@ -1,9 +1,14 @@
-from typing import List, Optional
+import logging
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+from sqlalchemy import func
 from sqlmodel import select
 from app.domain.repositories.audio_repository import IAudioRepository
 from app.domain.models.audio import Audio
 from app.infrastructure.database.connection import get_session
 
+log = logging.getLogger(__name__)
+
 
 class SQLAudioRepository(IAudioRepository):
     def save(self, audio: Audio) -> Audio:
@@ -14,7 +19,26 @@ class SQLAudioRepository(IAudioRepository):
                 session.refresh(audio)
                 return audio
         except Exception as e:
-            print(f"[ERROR] Saving audio failed: {e}")
+            log.error("Saving audio failed: %s", e)
+            raise
+
+    def save_many(self, audios: List[Audio]) -> int:
+        """Inserción en bloque (una transacción) para cargas offline."""
+        try:
+            with get_session() as session:
+                session.add_all(audios)
+                session.commit()
+                return len(audios)
+        except Exception as e:
+            log.error("Bulk saving audios failed: %s", e)
+            raise
+
+    def get_by_id(self, audio_id: int) -> Optional[Audio]:
+        try:
+            with get_session() as session:
+                return session.get(Audio, audio_id)
+        except Exception as e:
+            log.error("Fetching audio by id failed: %s", e)
             raise
 
     def get_all(self) -> List[Audio]:
@@ -23,7 +47,7 @@ class SQLAudioRepository(IAudioRepository):
                 stmt = select(Audio).order_by(Audio.created.desc())
                 return session.exec(stmt).all()
         except Exception as e:
-            print(f"[ERROR] Fetching audios failed: {e}")
+            log.error("Fetching audios failed: %s", e)
             raise
 
     # 🔁 Nuevo: filtra por usuario
@@ -33,11 +57,22 @@ class SQLAudioRepository(IAudioRepository):
                 stmt = (
                     select(Audio)
                     .where(Audio.user_id == user_id)
-                    .order_by(Audio.created.desc())
+                    .order_by(Audio.created.desc(), Audio.id.desc())  # mismo orden que HistoryCache.on_saved
                 )
                 return session.exec(stmt).all()
         except Exception as e:
-            print(f"[ERROR] Fetching audios by user_id failed: {e}")
+            log.error("Fetching audios by user_id failed: %s", e)
+            raise
+
+    # Marcador barato del historial (lo usa la caché para detectar escrituras de otros procesos)
+    def get_user_marker(self, user_id: int) -> Tuple[int, int]:
+        try:
+            with get_session() as session:
+                stmt = select(func.count(Audio.id), func.max(Audio.id)).where(Audio.user_id == user_id)
+                count, max_id = session.exec(stmt).one()
+                return int(count or 0), int(max_id or 0)
+        except Exception as e:
+            log.error("Fetching history marker failed: %s", e)
             raise
 
     # (Opcional) Si aún quieres combinar usuario + dispositivo:
@@ -51,5 +86,40 @@ class SQLAudioRepository(IAudioRepository):
                 )
                 return session.exec(stmt).all()
         except Exception as e:
-            print(f"[ERROR] Fetching audios by user_id and device_id failed: {e}")
+            log.error("Fetching audios by user_id and device_id failed: %s", e)
             raise
+
+    # Recorrido por lotes (keyset sobre id): memoria constante para exportaciones
+    def iter_batches(
+        self,
+        batch_size: int = 1000,
+        after_id: int = 0,
+        user_id: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        result: Optional[str] = None,
+    ) -> Iterator[List[Audio]]:
+        filters = []
+        if user_id is not None:
+            filters.append(Audio.user_id == user_id)
+        if since is not None:
+            filters.append(Audio.created >= since)
+        if until is not None:
+            filters.append(Audio.created < until)
+        if result is not None:
+            filters.append(Audio.result == result)
+
+        last_id = after_id
+        while True:
+            with get_session() as session:
+                stmt = (
+                    select(Audio)
+                    .where(Audio.id > last_id, *filters)
+                    .order_by(Audio.id)
+                    .limit(batch_size)
+                )
+                batch = list(session.exec(stmt).all())
+            if not batch:
+                return
+            last_id = batch[-1].id
+            yield batch
@@ -0,0 +1,71 @@
+# app/infrastructure/database/cached_audio_repo_impl.py
+"""Repositorio de audios con caché de lectura del historial por usuario.
+
+Envuelve a `SQLAudioRepository`: las lecturas del historial pasan por
+`HistoryCache` y las escrituras de este proceso la actualizan al momento.
+Con `validate` cada acierto se comprueba contra el marcador (filas, id máximo)
+del usuario, una consulta sobre el índice de user_id mucho más barata que
+traer y serializar el historial; así se ven también los audios guardados por
+otros procesos (nodos de inferencia separados, bulk_score, archivado).
+"""
+from functools import lru_cache
+from typing import List
+
+from app.application.history_cache import HistoryCache, HistoryPage
+from app.config import get_settings
+from app.domain.models.audio import Audio
+from app.infrastructure.database.audio_repo_impl import SQLAudioRepository
+
+
+class CachedAudioRepository:
+    def __init__(self, inner, cache: HistoryCache, validate: bool = True):
+        self.inner = inner
+        self.cache = cache
+        self.validate = validate
+
+    def __getattr__(self, name):
+        # el resto del contrato (get_by_id, iter_batches, ...) va directo a la BD
+        return getattr(self.inner, name)
+
+    def save(self, audio: Audio) -> Audio:
+        saved = self.inner.save(audio)
+        self.cache.on_saved(saved)
+        return saved
+
+    def save_many(self, audios: List[Audio]) -> int:
+        users = {a.user_id for a in audios}  # tras el commit las instancias quedan expiradas
+        try:
+            return self.inner.save_many(audios)
+        finally:
+            for user_id in users:
+                self.cache.invalidate(user_id)
+
+    def get_by_user(self, user_id: int) -> List[Audio]:
+        return self.get_history_page(user_id).audios
+
+    def get_history_page(self, user_id: int) -> HistoryPage:
+        marker = self.inner.get_user_marker(user_id) if self.validate else None
+        page = self.cache.get(user_id, marker)
+        if page is None:
+            page = self.cache.put(user_id, list(self.inner.get_by_user(user_id)))
+        return page
+
+
+@lru_cache
+def get_history_cache() -> HistoryCache:
+    """Una caché por proceso, compartida por los roles history e inference."""
+    settings = get_settings()
+    return HistoryCache(
+        max_rows=settings.HISTORY_CACHE_MAX_ROWS,
+        max_rows_per_user=settings.HISTORY_CACHE_MAX_ROWS_PER_USER,
+        ttl=settings.HISTORY_CACHE_TTL_SECONDS,
+    )
+
+
+def audio_repository(settings=None):
+    """`SQLAudioRepository`, envuelto con la caché si HISTORY_CACHE_ENABLED."""
+    settings = settings or get_settings()
+    repository = SQLAudioRepository()
+    if not settings.HISTORY_CACHE_ENABLED:
+        return repository
+    return CachedAudioRepository(repository, get_history_cache(), validate=settings.HISTORY_CACHE_VALIDATE)
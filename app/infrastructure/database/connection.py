@@ -1,3 +1,4 @@
+from sqlalchemy.pool import StaticPool
 from sqlmodel import create_engine, Session, SQLModel
 from dotenv import load_dotenv
 import os
@@ -6,11 +7,28 @@ load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./default.db")
 
+def _engine_options(url: str) -> dict:
+    if not url.startswith("sqlite"):
+        return {"connect_args": {}}
+    # SQLite: sesiones desde el threadpool; en memoria, una sola conexión compartida
+    # (cada conexión nueva vería una base vacía)
+    options = {"connect_args": {"check_same_thread": False}}
+    if url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url:
+        options["poolclass"] = StaticPool
+    return options
+
 # Para PostgreSQL se recomienda esto:
-engine = create_engine(DATABASE_URL, echo=False, connect_args={})
+engine = create_engine(DATABASE_URL, echo=False, **_engine_options(DATABASE_URL))
 
 def get_session():
     return Session(engine)
 
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
+    ensure_indexes()
+
+def ensure_indexes():
+    """create_all no añade índices nuevos a tablas que ya existen: se crean aquí si faltan."""
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
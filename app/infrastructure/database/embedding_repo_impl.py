@@ -0,0 +1,77 @@
+import logging
+from typing import Container, Iterator, List, Optional
+from sqlmodel import select
+from app.domain.repositories.embedding_repository import IEmbeddingRepository
+from app.domain.models.audio_embedding import AudioEmbedding
+from app.infrastructure.database.connection import get_session
+
+log = logging.getLogger(__name__)
+
+
+class SQLEmbeddingRepository(IEmbeddingRepository):
+    def save(self, embedding: AudioEmbedding) -> AudioEmbedding:
+        try:
+            with get_session() as session:
+                session.add(embedding)
+                session.commit()
+                session.refresh(embedding)
+                return embedding
+        except Exception as e:
+            log.error("Saving embedding failed: %s", e)
+            raise
+
+    def get_by_audio_id(self, audio_id: int) -> Optional[AudioEmbedding]:
+        with get_session() as session:
+            stmt = select(AudioEmbedding).where(AudioEmbedding.audio_id == audio_id)
+            return session.exec(stmt).first()
+
+    def get_by_audio_ids(self, audio_ids: List[int]) -> List[AudioEmbedding]:
+        if not audio_ids:
+            return []
+        with get_session() as session:
+            stmt = select(AudioEmbedding).where(AudioEmbedding.audio_id.in_(audio_ids))
+            return list(session.exec(stmt).all())
+
+    # Recorrido por lotes (keyset sobre id) para reconstruir el índice sin cargar toda la tabla
+    def iter_batches(self, batch_size: int = 1000, after_id: int = 0) -> Iterator[List[AudioEmbedding]]:
+        last_id = after_id
+        while True:
+            with get_session() as session:
+                stmt = (
+                    select(AudioEmbedding)
+                    .where(AudioEmbedding.id > last_id)
+                    .order_by(AudioEmbedding.id)
+                    .limit(batch_size)
+                )
+                batch = list(session.exec(stmt).all())
+            if not batch:
+                return
+            last_id = batch[-1].id
+            yield batch
+
+    def iter_missing(self, known: Container[int], batch_size: int = 1000) -> Iterator[List[AudioEmbedding]]:
+        """Embeddings cuyo audio_id no está en `known`, por lotes.
+
+        Recorre solo (id, audio_id) y carga los vectores que faltan: con varios
+        procesos escribiendo, los ids no llegan en orden y un "mayor id visto"
+        se saltaría filas.
+        """
+        last_id = 0
+        while True:
+            with get_session() as session:
+                stmt = (
+                    select(AudioEmbedding.id, AudioEmbedding.audio_id)
+                    .where(AudioEmbedding.id > last_id)
+                    .order_by(AudioEmbedding.id)
+                    .limit(batch_size)
+                )
+                pairs = session.exec(stmt).all()
+                if not pairs:
+                    return
+                last_id = pairs[-1][0]
+                missing = [row_id for row_id, audio_id in pairs if audio_id not in known]
+                batch = list(session.exec(
+                    select(AudioEmbedding).where(AudioEmbedding.id.in_(missing)).order_by(AudioEmbedding.id)
+                ).all()) if missing else []
+            if batch:
+                yield batch
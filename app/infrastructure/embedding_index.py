@@ -0,0 +1,244 @@
+# app/infrastructure/embedding_index.py
+"""Índice aproximado (pynndescent) de embeddings Wav2Vec2 de audios analizados.
+
+Los vectores nuevos se guardan primero en un tramo "pendiente" que se busca
+por fuerza bruta; cuando acumula `update_every` vectores se reconstruye el
+grafo ANN con una copia de los vectores, fuera del lock (en un hilo aparte
+si `background`), y se sustituye de golpe. Mientras tanto las consultas usan
+el grafo anterior + el tramo pendiente: una reconstrucción nunca las frena.
+Un grafo ya publicado no se modifica, así que `save` solo toma el lock para
+copiar referencias. Con pocos vectores (< `min_ann_size`) todo se resuelve
+por fuerza bruta, que es más rápido que construir el grafo.
+
+Varios procesos (WORKERS, roles) guardan embeddings y cada uno solo añade al
+índice los suyos: `catch_up` trae de BD los que falten (por audio_id, no por
+"mayor id visto", que con escritores concurrentes se salta filas). El archivo
+en disco es solo una caché para arrancar rápido; el último que guarda gana.
+"""
+import logging
+import os
+import pickle
+import tempfile
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.infrastructure.metrics import metrics
+
+log = logging.getLogger(__name__)
+
+Neighbor = Tuple[int, float, str]  # (audio_id, distancia coseno, veredicto)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class EmbeddingIndex:
+    def __init__(self, dim: Optional[int] = None, min_ann_size: int = 256,
+                 update_every: int = 128, n_neighbors: int = 15, background: bool = True):
+        self.dim = dim
+        self.min_ann_size = min_ann_size
+        self.update_every = update_every
+        self.n_neighbors = n_neighbors
+        self.background = background
+        self._lock = threading.RLock()
+        self._building = False
+        self._ids: List[int] = []
+        self._results: List[str] = []
+        self._positions = {}                    # audio_id -> fila
+        self._vectors = np.empty((0, dim or 0), dtype=np.float32)
+        self._size = 0
+        self._ann = None
+        self._ann_size = 0                      # filas ya incluidas en el grafo
+        self.dirty = 0                          # altas desde el último save()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, audio_id: int) -> bool:
+        return audio_id in self._positions
+
+    # ---------------- Escritura ----------------
+    def add(self, audio_id: int, vector: np.ndarray, result: str) -> None:
+        self.add_many([audio_id], np.asarray(vector)[None, :], [result])
+
+    def add_many(self, audio_ids: List[int], vectors: np.ndarray, results: List[str]) -> None:
+        vectors = _normalize(vectors)
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                self._vectors = np.empty((0, self.dim), dtype=np.float32)
+            if vectors.shape[1] != self.dim:
+                raise ValueError(f"Dimensión {vectors.shape[1]} distinta a la del índice ({self.dim})")
+            fresh = [i for i, a in enumerate(audio_ids) if a not in self._positions]
+            if not fresh:
+                return
+            self._reserve(self._size + len(fresh))
+            for i in fresh:
+                self._positions[audio_ids[i]] = self._size
+                self._vectors[self._size] = vectors[i]
+                self._ids.append(audio_ids[i])
+                self._results.append(results[i])
+                self._size += 1
+            self.dirty += len(fresh)
+            metrics.set_gauge("embedding_index_size", self._size)
+            refresh = self._needs_refresh()
+        if refresh:
+            self._schedule_build()
+
+    def _reserve(self, rows: int) -> None:
+        if rows > self._vectors.shape[0]:
+            grown = np.empty((max(rows, 2 * self._vectors.shape[0], 64), self.dim), dtype=np.float32)
+            grown[:self._size] = self._vectors[:self._size]
+            self._vectors = grown
+
+    def _needs_refresh(self) -> bool:
+        if self._building:
+            return False
+        if self._ann is None:
+            return self._size >= self.min_ann_size
+        return self._size - self._ann_size >= self.update_every
+
+    def _schedule_build(self) -> None:
+        with self._lock:
+            if self._building:
+                return
+            self._building = True
+        if self.background:
+            threading.Thread(target=self.build, name="embedding-index-build", daemon=True).start()
+        else:
+            self.build()
+
+    def _build_ann(self, data: np.ndarray):
+        from pynndescent import NNDescent
+
+        ann = NNDescent(
+            data,
+            metric="cosine",
+            n_neighbors=min(self.n_neighbors, max(2, data.shape[0] - 1)),
+            random_state=0,
+            low_memory=True,
+        )
+        ann.prepare()
+        return ann
+
+    def build(self) -> None:
+        """(Re)construye el grafo ANN con los vectores actuales y lo publica al terminar."""
+        try:
+            with self._lock:
+                size = self._size
+                data = self._vectors[:size].copy()
+            if size == 0:
+                return
+            with metrics.timer("embedding_index_build"):
+                ann = self._build_ann(data)   # fuera del lock: las consultas siguen con el grafo anterior
+            with self._lock:
+                if size > self._ann_size or self._ann is None:
+                    self._ann, self._ann_size = ann, size
+        except Exception as e:
+            log.error("building embedding index: %s", e)
+        finally:
+            with self._lock:
+                self._building = False
+
+    # ---------------- Lectura ----------------
+    def vector_of(self, audio_id: int) -> Optional[np.ndarray]:
+        with self._lock:
+            pos = self._positions.get(audio_id)
+            return None if pos is None else self._vectors[pos].copy()
+
+    def query(self, vector: np.ndarray, k: int = 5, exclude: Optional[int] = None) -> List[Neighbor]:
+        q = _normalize(vector)
+        with self._lock, metrics.timer("embedding_index_query"):
+            if self._size == 0:
+                return []
+            want = k + (1 if exclude is not None else 0)
+            candidates = {}
+            if self._ann is not None and self._ann_size:
+                idx, dist = self._ann.query(q[None, :], k=min(want, self._ann_size))
+                candidates.update({int(i): float(d) for i, d in zip(idx[0], dist[0]) if i >= 0})
+            # tramo pendiente (o todo el índice si aún no hay grafo): fuerza bruta
+            start = self._ann_size if self._ann is not None else 0
+            if start < self._size:
+                dist = 1.0 - self._vectors[start:self._size] @ q
+                top = np.argsort(dist)[:want]
+                candidates.update({start + int(i): float(dist[i]) for i in top})
+
+            ranked = sorted(candidates.items(), key=lambda item: item[1])
+            out = [(self._ids[i], max(d, 0.0), self._results[i]) for i, d in ranked if self._ids[i] != exclude]
+            return out[:k]
+
+    def query_among(self, vector: np.ndarray, audio_ids: List[int], k: int = 5,
+                    exclude: Optional[int] = None) -> List[Neighbor]:
+        """Vecinos exactos restringidos a `audio_ids` (p. ej. los audios de un usuario)."""
+        q = _normalize(vector)
+        with self._lock, metrics.timer("embedding_index_query"):
+            positions = [self._positions[a] for a in audio_ids if a != exclude and a in self._positions]
+            if not positions:
+                return []
+            rows = np.asarray(positions)
+            dist = 1.0 - self._vectors[rows] @ q
+            top = np.argsort(dist)[:k]
+            return [(self._ids[rows[i]], max(float(dist[i]), 0.0), self._results[rows[i]]) for i in top]
+
+    # ---------------- Persistencia ----------------
+    def save(self, path: str) -> None:
+        # bajo el lock solo se copia el estado; el grafo publicado no cambia y se serializa fuera
+        with self._lock:
+            state = {
+                "dim": self.dim,
+                "ids": list(self._ids),
+                "results": list(self._results),
+                "vectors": self._vectors[:self._size].copy(),
+                "ann": self._ann,
+                "ann_size": self._ann_size,
+                "params": (self.min_ann_size, self.update_every, self.n_neighbors),
+            }
+            self.dirty = 0
+        payload = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, path)  # escritura atómica
+
+    @classmethod
+    def load(cls, path: str) -> "EmbeddingIndex":
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        min_ann_size, update_every, n_neighbors = state["params"]
+        index = cls(state["dim"], min_ann_size, update_every, n_neighbors)
+        vectors = state["vectors"]
+        index._vectors = vectors
+        index._size = vectors.shape[0]
+        index._ids = state["ids"]
+        index._results = state["results"]
+        index._positions = {a: i for i, a in enumerate(index._ids)}
+        index._ann = state["ann"]
+        index._ann_size = state["ann_size"]
+        metrics.set_gauge("embedding_index_size", index._size)
+        return index
+
+
+def catch_up(index: EmbeddingIndex, repository, batch_size: int = 1000) -> int:
+    """Añade los embeddings de BD que el índice aún no tiene (guardados por otros procesos)."""
+    added = 0
+    for batch in repository.iter_missing(index, batch_size):
+        vectors = np.stack([np.frombuffer(e.vector, dtype="<f4") for e in batch])
+        index.add_many([e.audio_id for e in batch], vectors, [e.result for e in batch])
+        added += len(batch)
+    if added:
+        metrics.inc("embedding_index_caught_up", added)
+    return added
+
+
+def load_or_rebuild(path: Optional[str], repository, batch_size: int = 1000) -> EmbeddingIndex:
+    """Carga el índice de disco y añade lo que falte de BD; si no existe, lo reconstruye desde BD."""
+    index = EmbeddingIndex.load(path) if path and os.path.exists(path) else EmbeddingIndex()
+    catch_up(index, repository, batch_size)
+    return index
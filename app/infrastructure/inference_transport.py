@@ -0,0 +1,256 @@
+# app/infrastructure/inference_transport.py
+"""Transportes entre los nodos API y los workers de inferencia.
+
+Todos exponen la misma interfaz (mensajes = bytes):
+    push_request / pop_request      cola compartida de trabajos
+    push_reply / pop_reply          una cola de respuestas por cliente (proceso API)
+    heartbeat / workers             latidos de los workers para el health check
+    forget_worker                   borra el latido de un worker parado o caído
+
+- `QueueTransport`: colas de la librería estándar. En proceso (tests) o
+  servidas por un `multiprocessing` manager en un socket Unix (mismo host).
+- `RedisTransport`: listas + hash en Redis (varios nodos). Acepta cualquier
+  cliente compatible; `InMemoryRedis` lo sustituye en tests y desarrollo.
+"""
+import json
+import os
+import queue
+import struct
+import threading
+import time
+from multiprocessing.managers import BaseManager, DictProxy
+from typing import Dict, Optional, Tuple
+
+_HEADER = struct.Struct("<I")
+
+
+# ---------------- Mensajes ----------------
+def encode_message(header: dict, payload: bytes = b"") -> bytes:
+    """Cabecera JSON + bytes crudos (señal/embedding float32): sin pickle entre nodos."""
+    raw = json.dumps(header, separators=(",", ":")).encode()
+    return _HEADER.pack(len(raw)) + raw + payload
+
+
+def decode_message(data: bytes) -> Tuple[dict, memoryview]:
+    view = memoryview(data)
+    (size,) = _HEADER.unpack_from(view)
+    header = json.loads(bytes(view[_HEADER.size:_HEADER.size + size]))
+    return header, view[_HEADER.size + size:]
+
+
+# ---------------- Colas (mismo host) ----------------
+class QueueTransport:
+    def __init__(self, requests, replies_for, workers):
+        self._requests = requests
+        self._replies_for = replies_for   # client_id -> cola de respuestas
+        self._workers = workers           # worker_id -> latido (JSON)
+        self._reply_queues: Dict[str, object] = {}
+
+    @classmethod
+    def in_process(cls) -> "QueueTransport":
+        replies: Dict[str, queue.Queue] = {}
+        lock = threading.Lock()
+
+        def replies_for(client_id: str) -> queue.Queue:
+            with lock:
+                return replies.setdefault(client_id, queue.Queue())
+
+        return cls(queue.Queue(), replies_for, {})
+
+    def _replies(self, client_id: str):
+        q = self._reply_queues.get(client_id)
+        if q is None:
+            q = self._reply_queues[client_id] = self._replies_for(client_id)
+        return q
+
+    def push_request(self, data: bytes) -> None:
+        self._requests.put(data)
+
+    def pop_request(self, timeout: float) -> Optional[bytes]:
+        try:
+            return self._requests.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def push_reply(self, client_id: str, data: bytes) -> None:
+        self._replies(client_id).put(data)
+
+    def pop_reply(self, client_id: str, timeout: float) -> Optional[bytes]:
+        try:
+            return self._replies(client_id).get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def heartbeat(self, worker_id: str, info: dict) -> None:
+        self._workers[worker_id] = json.dumps(info)
+
+    def workers(self) -> Dict[str, dict]:
+        return {k: json.loads(v) for k, v in dict(self._workers).items()}
+
+    def forget_worker(self, worker_id: str) -> None:
+        self._workers.pop(worker_id, None)
+
+
+class _QueueManager(BaseManager):
+    pass
+
+
+def serve_queue(address: str, authkey: bytes) -> threading.Thread:
+    """Sirve las colas en un socket Unix desde este proceso (hilo daemon)."""
+    requests: queue.Queue = queue.Queue()
+    replies: Dict[str, queue.Queue] = {}
+    workers: Dict[str, str] = {}
+    lock = threading.Lock()
+
+    def replies_for(client_id: str) -> queue.Queue:
+        with lock:
+            return replies.setdefault(client_id, queue.Queue())
+
+    class Manager(_QueueManager):
+        pass
+
+    Manager.register("requests", callable=lambda: requests)
+    Manager.register("replies", callable=replies_for)
+    Manager.register("workers", callable=lambda: workers, proxytype=DictProxy)
+    if os.path.exists(address):
+        os.remove(address)  # socket huérfano de una ejecución anterior
+    server = Manager(address=address, authkey=authkey).get_server()
+    thread = threading.Thread(target=server.serve_forever, name="inference-queue", daemon=True)
+    thread.start()
+    return thread
+
+
+def connect_queue(address: str, authkey: bytes, wait: float = 10.0) -> QueueTransport:
+    class Manager(_QueueManager):
+        pass
+
+    for name in ("requests", "replies", "workers"):
+        Manager.register(name)
+    deadline = time.monotonic() + wait
+    while True:
+        manager = Manager(address=address, authkey=authkey)
+        try:
+            manager.connect()
+            break
+        except (FileNotFoundError, ConnectionRefusedError):
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.1)
+    return QueueTransport(manager.requests(), manager.replies, manager.workers())
+
+
+# ---------------- Redis ----------------
+class RedisTransport:
+    REPLY_TTL = 120  # s: colas de respuesta de clientes que ya no existen
+
+    def __init__(self, client, prefix: str = "inference"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, prefix: str = "inference") -> "RedisTransport":
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("INFERENCE_TRANSPORT=redis requiere el paquete `redis`") from e
+        return cls(redis.Redis.from_url(url), prefix)
+
+    def _key(self, *parts: str) -> str:
+        return ":".join((self.prefix,) + parts)
+
+    def push_request(self, data: bytes) -> None:
+        self.client.lpush(self._key("requests"), data)
+
+    def pop_request(self, timeout: float) -> Optional[bytes]:
+        item = self.client.brpop(self._key("requests"), timeout=timeout)
+        return item[1] if item else None
+
+    def push_reply(self, client_id: str, data: bytes) -> None:
+        key = self._key("reply", client_id)
+        self.client.lpush(key, data)
+        self.client.expire(key, self.REPLY_TTL)
+
+    def pop_reply(self, client_id: str, timeout: float) -> Optional[bytes]:
+        item = self.client.brpop(self._key("reply", client_id), timeout=timeout)
+        return item[1] if item else None
+
+    def heartbeat(self, worker_id: str, info: dict) -> None:
+        self.client.hset(self._key("workers"), worker_id, json.dumps(info))
+
+    def workers(self) -> Dict[str, dict]:
+        raw = self.client.hgetall(self._key("workers"))
+        return {_text(k): json.loads(v) for k, v in raw.items()}
+
+    def forget_worker(self, worker_id: str) -> None:
+        self.client.hdel(self._key("workers"), worker_id)
+
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class InMemoryRedis:
+    """Subconjunto de la API de redis-py que usa `RedisTransport` (en memoria, thread-safe)."""
+
+    def __init__(self):
+        self._lists: Dict[str, list] = {}
+        self._hashes: Dict[str, Dict[bytes, bytes]] = {}
+        self._cond = threading.Condition()
+
+    def lpush(self, key: str, *values) -> int:
+        with self._cond:
+            items = self._lists.setdefault(key, [])
+            for v in values:
+                items.insert(0, _bytes(v))
+            self._cond.notify_all()
+            return len(items)
+
+    def brpop(self, key: str, timeout: float = 0):
+        deadline = None if not timeout else time.monotonic() + timeout
+        with self._cond:
+            while not self._lists.get(key):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            return _bytes(key), self._lists[key].pop()
+
+    def expire(self, key: str, seconds: int) -> bool:
+        return key in self._lists
+
+    def hset(self, key: str, field, value) -> int:
+        with self._cond:
+            h = self._hashes.setdefault(key, {})
+            new = _bytes(field) not in h
+            h[_bytes(field)] = _bytes(value)
+            return int(new)
+
+    def hgetall(self, key: str) -> Dict[bytes, bytes]:
+        with self._cond:
+            return dict(self._hashes.get(key, {}))
+
+    def hdel(self, key: str, *fields) -> int:
+        with self._cond:
+            h = self._hashes.get(key, {})
+            return sum(h.pop(_bytes(f), None) is not None for f in fields)
+
+
+def _bytes(value) -> bytes:
+    return value.encode() if isinstance(value, str) else bytes(value)
+
+
+def transport_from_settings(settings, serve: bool = False, wait: float = 10.0):
+    """Transporte configurado (`serve=True`: este proceso aloja la cola local).
+
+    `wait`: segundos esperando a que aparezca el socket de la cola local (el
+    nodo API usa 0 y reintenta en la siguiente petición).
+    """
+    kind = settings.INFERENCE_TRANSPORT
+    if kind == "redis":
+        return RedisTransport.from_url(settings.INFERENCE_REDIS_URL)
+    if kind == "queue":
+        authkey = settings.INFERENCE_QUEUE_AUTHKEY.encode()
+        if serve:
+            serve_queue(settings.INFERENCE_QUEUE_ADDRESS, authkey)
+        return connect_queue(settings.INFERENCE_QUEUE_ADDRESS, authkey, wait=wait)
+    raise ValueError(f"INFERENCE_TRANSPORT desconocido: {kind}")
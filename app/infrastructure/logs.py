@@ -0,0 +1,93 @@
+# app/infrastructure/logs.py
+"""Logging estructurado sin bloquear la petición.
+
+Los módulos de la app registran con `logging.getLogger(__name__)`; el logger
+`app` tiene un `QueueHandler` (solo encola el registro) y un `QueueListener`
+en su propio hilo formatea y escribe. Cada registro lleva el request id de la
+petición en curso (ver `app.infrastructure.tracing`).
+"""
+import atexit
+import json
+import logging
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from app.infrastructure.metrics import metrics
+from app.infrastructure.tracing import current_request_id
+
+_listener: Optional[QueueListener] = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Añade `request_id` al registro en el hilo que lo emite (antes de encolarlo)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = current_request_id()
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Con la cola llena se descarta el registro: loguear nunca frena la petición."""
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.inc("logs_dropped")
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def configure_logging(level: str = "INFO", json_format: bool = True, stream=None, max_queue: int = 10000) -> None:
+    """Instala (una sola vez por proceso) el QueueHandler del logger `app`."""
+    global _listener
+    if _listener is not None:
+        return
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(
+        JsonFormatter() if json_format
+        else logging.Formatter("%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s")
+    )
+    records: "queue.Queue[logging.LogRecord]" = queue.Queue(max_queue)
+    handler = DroppingQueueHandler(records)
+    handler.addFilter(RequestIdFilter())
+
+    logger = logging.getLogger("app")
+    logger.setLevel(level.upper())
+    logger.addHandler(handler)
+    logger.propagate = False
+
+    _listener = QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Vacía la cola y detiene el hilo escritor."""
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
+    logger = logging.getLogger("app")
+    for handler in [h for h in logger.handlers if isinstance(h, QueueHandler)]:
+        logger.removeHandler(handler)
+    logger.propagate = True
@@ -0,0 +1,124 @@
+# app/infrastructure/memory.py
+"""Presupuesto de memoria por worker y contabilidad de pico por petición.
+
+- `MemoryBudget`: reserva bytes estimados antes de inferir; si no caben se
+  espera (hasta `timeout`) y si nunca cabrían se rechaza. Con varios hilos de
+  inferencia evita que coincidan clips largos y se dispare el RSS.
+- `PeakTracker`: RSS al empezar y en cada etapa; el máximo muestreado menos
+  el inicial es el delta de RSS de la petición. Es una aproximación: no ve
+  picos entre muestras, el allocator no devuelve al sistema todo lo que se
+  libera y con varios hilos el RSS es de todo el proceso.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import HTTPException
+
+from app.infrastructure.metrics import metrics
+
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+MB = 1024 * 1024
+
+
+def current_rss() -> int:
+    """RSS actual del proceso en bytes (0 si la plataforma no lo expone)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE
+    except (OSError, IndexError, ValueError):
+        try:
+            import resource
+
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # pico, no actual
+        except Exception:
+            return 0
+
+
+def estimate_request_bytes(samples: int, bytes_per_sample: int) -> int:
+    """Memoria de trabajo estimada de una inferencia (dominada por la 1ª conv del extractor)."""
+    return samples * bytes_per_sample
+
+
+class MemoryBudget:
+    def __init__(self, limit_bytes: int, timeout: float = 10.0):
+        self.limit = limit_bytes
+        self.timeout = timeout
+        self._used = 0
+        self._cond = threading.Condition()
+
+    @property
+    def used(self) -> int:
+        return self._used
+
+    @contextmanager
+    def reserve(self, nbytes: int):
+        if nbytes > self.limit:
+            metrics.inc("memory_budget_rejected")
+            raise HTTPException(status_code=413, detail="El audio es demasiado largo para procesarlo")
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while self._used + nbytes > self.limit:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    if self._used + nbytes > self.limit:
+                        metrics.inc("memory_budget_timeouts")
+                        raise HTTPException(status_code=503, detail="Memoria de inferencia agotada, reintenta")
+            self._used += nbytes
+            metrics.set_gauge("memory_budget_used_mb", self._used / MB)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._used -= nbytes
+                metrics.set_gauge("memory_budget_used_mb", self._used / MB)
+                self._cond.notify_all()
+
+
+class PeakTracker:
+    def __init__(self):
+        self.start = current_rss()
+        self.peak = self.start
+
+    def sample(self) -> None:
+        rss = current_rss()
+        if rss > self.peak:
+            self.peak = rss
+
+    @property
+    def delta(self) -> int:
+        return max(0, self.peak - self.start)
+
+
+_max_delta = 0
+_max_lock = threading.Lock()
+_tracker: ContextVar[Optional[PeakTracker]] = ContextVar("peak_tracker", default=None)
+
+
+def sample() -> None:
+    """Muestra el RSS para la petición en curso (no hace nada fuera de `track_peak`)."""
+    tracker = _tracker.get()
+    if tracker is not None:
+        tracker.sample()
+
+
+@contextmanager
+def track_peak(name: str = "request"):
+    """Publica el delta de RSS muestreado en `<name>_rss_delta_mb_last` / `_max` y `rss_mb`."""
+    global _max_delta
+    tracker = PeakTracker()
+    token = _tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _tracker.reset(token)
+        tracker.sample()
+        with _max_lock:
+            _max_delta = max(_max_delta, tracker.delta)
+            worst = _max_delta
+        metrics.set_gauge(f"{name}_rss_delta_mb_last", round(tracker.delta / MB, 2))
+        metrics.set_gauge(f"{name}_rss_delta_mb_max", round(worst / MB, 2))
+        metrics.set_gauge("rss_mb", round(tracker.peak / MB, 1))
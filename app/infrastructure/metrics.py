@@ -0,0 +1,88 @@
+# app/infrastructure/metrics.py
+"""Métricas en proceso (contadores, gauges y latencias) expuestas en /metrics.
+
+Los desgloses (`set_breakdown`) son mapas pequeños y acotados por quien los
+publica (p. ej. el top-N de colas por usuario): no crean una serie por clave.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict
+
+import numpy as np
+
+# Muestras de latencia que se conservan por métrica
+WINDOW = 2048
+
+
+class Metrics:
+    def __init__(self, window: int = WINDOW):
+        self._lock = threading.Lock()
+        self._window = window
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._timings: Dict[str, Deque[float]] = {}
+        self._timing_counts: Dict[str, int] = {}
+        self._breakdowns: Dict[str, Dict[str, float]] = {}
+
+    def inc(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self._gauges[name] = value
+
+    def set_breakdown(self, name: str, values: Dict[str, float]) -> None:
+        """Sustituye el mapa `name` (clave -> valor); quien publica acota su tamaño."""
+        with self._lock:
+            self._breakdowns[name] = dict(values)
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._timings.get(name)
+            if samples is None:
+                samples = self._timings[name] = deque(maxlen=self._window)
+            samples.append(seconds)
+            self._timing_counts[name] = self._timing_counts.get(name, 0) + 1
+
+    @contextmanager
+    def timer(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0)
+
+    def counter(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            breakdowns = {k: dict(v) for k, v in self._breakdowns.items()}
+            timings = {k: (list(v), self._timing_counts[k]) for k, v in self._timings.items()}
+        summary = {}
+        for name, (samples, count) in timings.items():
+            ms = np.asarray(samples) * 1000.0
+            summary[name] = {
+                "count": count,
+                "mean_ms": round(float(ms.mean()), 3),
+                "p50_ms": round(float(np.percentile(ms, 50)), 3),
+                "p99_ms": round(float(np.percentile(ms, 99)), 3),
+            }
+        return {"counters": counters, "gauges": gauges, "timings": summary, "breakdowns": breakdowns}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._timings.clear()
+            self._timing_counts.clear()
+            self._breakdowns.clear()
+
+
+metrics = Metrics()
@@ -1,8 +1,26 @@
 import os
 from transformers import Wav2Vec2Processor, Wav2Vec2ForSequenceClassification
 
+from app.config import get_settings
+from app.infrastructure.cpu_topology import configure_cpu_threads
+
 MODEL_REPO = os.getenv("HF_MODEL_REPO", "langulor/deepfake-voice-spanish")
 
-processor = Wav2Vec2Processor.from_pretrained(MODEL_REPO)
-model = Wav2Vec2ForSequenceClassification.from_pretrained(MODEL_REPO)
-model.eval()
\ No newline at end of file
+
+def load_model(settings):
+    """(processor, model) según MODEL_BACKEND: hf (descarga el real) | tiny (local, aleatorio)."""
+    if settings.MODEL_BACKEND == "tiny":
+        from app.infrastructure.tiny_model import build_tiny_model
+        return build_tiny_model()
+    if settings.MODEL_BACKEND != "hf":
+        raise ValueError(f"MODEL_BACKEND desconocido: {settings.MODEL_BACKEND}")
+    processor = Wav2Vec2Processor.from_pretrained(MODEL_REPO)
+    model = Wav2Vec2ForSequenceClassification.from_pretrained(MODEL_REPO)
+    model.eval()
+    return processor, model
+
+
+# Hilos / afinidad antes de cargar el modelo (evita sobre-suscripción con varios workers)
+cpu_config = configure_cpu_threads(get_settings())
+
+processor, model = load_model(get_settings())
@@ -0,0 +1,253 @@
+# app/infrastructure/profiling.py
+"""Perfilado bajo demanda de una sola petición de predicción.
+
+Se activa con la cabecera `X-Profile: <PROFILE_TOKEN>` o por muestreo
+(PROFILE_SAMPLE_RATE). El perfil viaja en un ContextVar, así que llega al
+hilo de inferencia (el pool copia el contexto) sin tocar las firmas. Con el
+perfilado apagado `span()` / `python_section()` / `torch_section()` solo
+hacen una lectura del ContextVar y devuelven un contexto nulo compartido.
+
+Por petición perfilada se escriben en PROFILE_DIR:
+    <id>.json        tiempos por etapa + funciones Python más costosas
+    <id>.pstats      cProfile (snakeviz / pstats)
+    <id>.torch.json  traza de torch.profiler (chrome://tracing / Perfetto)
+
+Los archivos (varios MB) los escribe `ProfileWriter` desde su propio hilo con
+una cola acotada: la petición perfilada solo encola y el event loop no se
+para mientras se vuelca la traza. Con la cola llena el perfil se descarta.
+"""
+import cProfile
+import hmac
+import io
+import json
+import logging
+import os
+import pstats
+import queue
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from contextvars import ContextVar
+
+from app.infrastructure.metrics import metrics
+
+log = logging.getLogger(__name__)
+
+_current: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+_NULL = nullcontext()
+TOP_FUNCTIONS = 30
+
+
+class RequestProfile:
+    def __init__(self, label: str):
+        self.id = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:6]}"
+        self.label = label
+        self.spans: List[dict] = []
+        self._t0 = time.perf_counter()
+        self._t_end: Optional[float] = None
+        self._lock = threading.Lock()
+        self._python: List[cProfile.Profile] = []
+        self._torch = []
+
+    @contextmanager
+    def span(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self.spans.append({
+                    "name": name,
+                    "start_ms": round((start - self._t0) * 1000, 3),
+                    "duration_ms": round((end - start) * 1000, 3),
+                    "thread": threading.current_thread().name,
+                })
+
+    @contextmanager
+    def python_section(self):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # ya hay otro profiler activo en este hilo
+            yield
+            return
+        try:
+            yield
+        finally:
+            profiler.disable()
+            with self._lock:
+                self._python.append(profiler)
+
+    @contextmanager
+    def torch_section(self):
+        from torch.profiler import ProfilerActivity, profile
+
+        with profile(activities=[ProfilerActivity.CPU], record_shapes=True) as prof:
+            yield
+        with self._lock:
+            self._torch.append(prof)
+
+    def finish(self) -> None:
+        """Fija la duración total al salir de la petición (la escritura llega después)."""
+        self._t_end = time.perf_counter()
+
+    # ---------------- Escritura ----------------
+    def write(self, directory: str, keep: int) -> str:
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, self.id)
+        summary = {
+            "id": self.id,
+            "label": self.label,
+            "total_ms": round(((self._t_end or time.perf_counter()) - self._t0) * 1000, 3),
+            "spans": sorted(self.spans, key=lambda s: s["start_ms"]),
+        }
+        if self._python:
+            stats = pstats.Stats(self._python[0], stream=io.StringIO())
+            for extra in self._python[1:]:
+                stats.add(extra)
+            stats.dump_stats(base + ".pstats")
+            summary["top_functions"] = _top_functions(stats, TOP_FUNCTIONS)
+        for i, prof in enumerate(self._torch):
+            suffix = "" if i == 0 else f".{i}"
+            prof.export_chrome_trace(f"{base}.torch{suffix}.json")
+            summary.setdefault("torch_ops", _top_torch_ops(prof))
+        with open(base + ".json", "w") as f:
+            json.dump(summary, f, indent=2)
+        enforce_retention(directory, keep)
+        return base + ".json"
+
+
+def _top_functions(stats: pstats.Stats, n: int) -> List[dict]:
+    rows = []
+    for (filename, line, func), (cc, nc, tt, ct, _) in stats.stats.items():
+        rows.append({
+            "function": f"{os.path.basename(filename)}:{line}({func})",
+            "calls": nc,
+            "self_ms": round(tt * 1000, 3),
+            "cumulative_ms": round(ct * 1000, 3),
+        })
+    rows.sort(key=lambda r: r["cumulative_ms"], reverse=True)
+    return rows[:n]
+
+
+def _top_torch_ops(prof, n: int = 15) -> List[dict]:
+    events = sorted(prof.key_averages(), key=lambda e: e.self_cpu_time_total, reverse=True)[:n]
+    return [
+        {"op": e.key, "calls": e.count, "self_cpu_ms": round(e.self_cpu_time_total / 1000, 3)}
+        for e in events
+    ]
+
+
+def enforce_retention(directory: str, keep: int) -> None:
+    """Conserva los `keep` perfiles más recientes (cada perfil = varios archivos con el mismo id)."""
+    groups = {}
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            continue
+        key = name.split(".", 1)[0]
+        groups[key] = max(groups.get(key, 0.0), mtime)
+    # el id empieza por la fecha: desempata perfiles escritos en el mismo instante
+    for key in sorted(groups, key=lambda k: (groups[k], k), reverse=True)[keep:]:
+        for name in os.listdir(directory):
+            if name.split(".", 1)[0] == key:
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+
+
+class ProfileWriter:
+    """Hilo escritor de perfiles con cola acotada (mismo esquema que tracing.JsonlExporter)."""
+
+    def __init__(self, max_queue: int = 8):
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, prof: RequestProfile, directory: str, keep: int) -> bool:
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait((prof, directory, keep))
+            return True
+        except queue.Full:
+            metrics.inc("profiles_dropped")
+            return False
+
+    def flush(self) -> None:
+        """Espera a que se escriba todo lo encolado."""
+        self._queue.join()
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profile-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            prof, directory, keep = self._queue.get()
+            try:
+                prof.write(directory, keep)
+                metrics.inc("profiles_written")
+            except Exception as e:
+                log.error("writing profile %s: %s", prof.id, e)
+            finally:
+                self._queue.task_done()
+
+
+writer = ProfileWriter()
+
+
+# ---------------- API para el resto de la app ----------------
+def span(name: str):
+    prof = _current.get()
+    return _NULL if prof is None else prof.span(name)
+
+
+def python_section():
+    prof = _current.get()
+    return _NULL if prof is None else prof.python_section()
+
+
+def torch_section():
+    prof = _current.get()
+    return _NULL if prof is None else prof.torch_section()
+
+
+def should_profile(header_value: Optional[str], settings) -> bool:
+    """Cabecera con el token de administración o muestreo aleatorio."""
+    token = settings.PROFILE_TOKEN
+    if token and header_value and hmac.compare_digest(header_value.encode(), token.encode()):
+        return True
+    rate = settings.PROFILE_SAMPLE_RATE
+    return bool(rate) and random.random() < rate
+
+
+@contextmanager
+def request_profile(enabled: bool, label: str, directory: str, keep: int):
+    """Activa el perfilado para todo lo que se ejecute dentro (incluido el pool de inferencia).
+
+    Al salir el perfil se encola en `writer`; `writer.flush()` espera a los archivos.
+    """
+    if not enabled:
+        yield None
+        return
+    prof = RequestProfile(label)
+    token = _current.set(prof)
+    try:
+        yield prof
+    finally:
+        _current.reset(token)
+        prof.finish()
+        writer.submit(prof, directory, keep)  # se escribe en el hilo del writer, no en el event loop
@@ -1,63 +1,135 @@
-from typing import List, Optional
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Depends
-from app.infrastructure.model_loader import model, processor
-from app.infrastructure.database.audio_repo_impl import SQLAudioRepository
+# app/infrastructure/routes/audio.py
+"""Rol "inference": rutas de predicción. Es el único módulo de rutas que
+importa el modelo (torch / transformers / librosa). Con INFERENCE_BACKEND=remote
+y sin fallback local el modelo no se carga en este proceso."""
+from contextlib import contextmanager
+from typing import Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Depends, Request, Header, Response
+from app.infrastructure.database.cached_audio_repo_impl import audio_repository
+from app.infrastructure.database.embedding_repo_impl import SQLEmbeddingRepository
 from app.application.audio_service import AudioService
-from app.application.schemas.audio_response import AudioResponse, AudioListItem
+from app.application.cascade import load_cascade
+from app.application.pcm import PcmFormat, read_pcm_body
+from app.application.fair_scheduler import FairScheduler
+from app.application.remote_inference import RemoteInferenceClient
+from app.infrastructure.inference_transport import transport_from_settings
+from app.application.schemas.audio_response import AudioResponse
 from app.infrastructure.security import get_current_user
+from app.infrastructure import profiling
 from app.domain.models.user import User
+from app.config import get_settings
 
 router = APIRouter()
-service = AudioService(SQLAudioRepository(), model, processor)
+settings = get_settings()
+remote_backend = settings.INFERENCE_BACKEND == "remote"
+scheduler = FairScheduler(
+    slots=settings.REMOTE_MAX_INFLIGHT if remote_backend else settings.INFERENCE_THREADS,
+    max_concurrency_per_user=settings.USER_MAX_CONCURRENCY,
+    max_queued_per_user=settings.USER_MAX_QUEUED,
+    rate_per_user=settings.USER_RATE_PER_SEC,
+    burst_per_user=settings.USER_BURST,
+) if settings.FAIR_SCHEDULING else None
+# Conexión perezosa: importar las rutas no espera a la cola ni falla si aún no existe
+remote = RemoteInferenceClient(
+    connect=lambda: transport_from_settings(settings, wait=0),
+    timeout=settings.REMOTE_TIMEOUT_SECONDS,
+    retries=settings.REMOTE_RETRIES,
+    heartbeat_max_age=settings.REMOTE_HEARTBEAT_SECONDS * 5,
+) if remote_backend else None
+if remote is None or settings.REMOTE_FALLBACK_LOCAL:
+    from app.infrastructure.model_loader import model, processor
+else:
+    model = processor = None
+service = AudioService(
+    audio_repository(settings), model, processor,
+    embeddings=SQLEmbeddingRepository(),
+    cascade=load_cascade(settings),
+    scheduler=scheduler,
+    remote=remote,
+)
+if settings.BUCKET_WARMUP:
+    service.warmup()
+
+
+@contextmanager
+def _maybe_profile(header: Optional[str], label: str, response: Response):
+    """Perfil de esta petición si se pidió (token) o tocó por muestreo; sin coste si no."""
+    enabled = profiling.should_profile(header, settings)
+    with profiling.request_profile(enabled, label, settings.PROFILE_DIR, settings.PROFILE_KEEP) as prof:
+        if prof is not None:
+            response.headers["X-Profile-Id"] = prof.id
+        yield
+
+
+def _audio_response(audio, duration: float) -> AudioResponse:
+    return AudioResponse(
+        id=audio.id,
+        message=(
+            "El audio tiene altas probabilidades de haber sido generado por IA"
+            if audio.result == "falso" else
+            "El audio parece ser original"
+        ),
+        authenticity_score=audio.authenticity_score,
+        filename=audio.filename,
+        result=audio.result,
+        timestamp=audio.created,
+        duration=round(duration, 2),
+        model_name="SpecRNet",
+        inference_start=audio.inference_start,
+        inference_end=audio.inference_end,
+        inference_duration=audio.inference_duration,
+    )
 
 @router.post("/predict-audio", response_model=AudioResponse)
 async def predict_audio(
+    response: Response,
     file: UploadFile = File(...),
     device_id: Optional[str] = Form(None),            # ← opcional
+    x_profile: Optional[str] = Header(None),          # ← token de perfilado (admin)
     user: User = Depends(get_current_user),           # ← tomado del access token
 ):
     try:
-        audio, duration = await service.predict_audio(
-            file=file,
-            user_id=user.id,
-            device_id=device_id,
-        )
-        return AudioResponse(
-            id=audio.id,
-            message=(
-                "El audio tiene altas probabilidades de haber sido generado por IA"
-                if audio.result == "falso" else
-                "El audio parece ser original"
-            ),
-            authenticity_score=audio.authenticity_score,
-            filename=audio.filename,
-            result=audio.result,
-            timestamp=audio.created,
-            duration=round(duration, 2),
-            model_name="SpecRNet",
-            inference_start=audio.inference_start,
-            inference_end=audio.inference_end,
-            inference_duration=audio.inference_duration,
-        )
+        with _maybe_profile(x_profile, "predict-audio", response):
+            audio, duration = await service.predict_audio(
+                file=file,
+                user_id=user.id,
+                device_id=device_id,
+            )
+        return _audio_response(audio, duration)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# ✨ NUEVO: Ahora NO requiere device_id como parámetro
-@router.get("/audios", response_model=List[AudioListItem])
-def get_audios(user: User = Depends(get_current_user)):
-    """Lista los audios del usuario autenticado."""
+@router.post("/predict-pcm", response_model=AudioResponse)
+async def predict_pcm(
+    request: Request,
+    response: Response,
+    x_sample_rate: int = Header(16000),
+    x_channels: int = Header(1),
+    x_sample_format: str = Header("s16le"),            # s16le | f32le (little-endian)
+    x_filename: Optional[str] = Header(None),
+    x_device_id: Optional[str] = Header(None),
+    x_profile: Optional[str] = Header(None),
+    user: User = Depends(get_current_user),
+):
+    """PCM crudo en el cuerpo (sin contenedor): se analiza en memoria, sin archivo temporal."""
+    fmt = PcmFormat(x_sample_format.lower(), x_sample_rate, x_channels).validate()
+    service.check_rate(user.id)  # 429 antes de leer el cuerpo
+    length = request.headers.get("content-length")
+    body = await read_pcm_body(
+        request.stream(), fmt.bytes_for(settings.MAX_AUDIO_SECONDS),
+        expected=int(length) if length and length.isdigit() else None,
+    )
+    if not body:
+        raise HTTPException(status_code=400, detail="El cuerpo de la petición está vacío")
     try:
-        audios = service.get_audios_by_user(user.id)
-        return [
-            AudioListItem(
-                id=a.id,
-                filename=a.filename,
-                result=a.result,
-                authenticity_score=a.authenticity_score,
-                inference_duration=a.inference_duration,
-                timestamp=a.created,
+        with _maybe_profile(x_profile, "predict-pcm", response):
+            audio, duration = await service.predict_pcm(
+                body, fmt, user_id=user.id, filename=x_filename, device_id=x_device_id,
             )
-            for a in audios
-        ]
+        return _audio_response(audio, duration)
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,146 @@
+# app/infrastructure/routes/history.py
+"""Rol "history": listado, exportación y búsqueda de similares.
+
+No importa nada de ML: un nodo con roles auth+history arranca sin torch.
+"""
+from datetime import date, datetime
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from app.infrastructure.database.cached_audio_repo_impl import audio_repository
+from app.infrastructure.database.embedding_repo_impl import SQLEmbeddingRepository
+from app.infrastructure.database.audio_archive_repo_impl import SQLAudioArchiveRepository
+from app.infrastructure.embedding_index import catch_up, load_or_rebuild
+from app.application.history_service import HistoryService
+from app.application.history_cache import HistoryPage, etag_matches
+from app.application.audio_export import ExportFilters, MEDIA_TYPES, iter_export, gzip_stream
+from app.application.schemas.audio_response import AudioListItem, SimilarAudioItem, DailyStatsItem
+from app.infrastructure.security import get_current_user
+from app.domain.models.user import User
+from app.infrastructure.metrics import metrics
+from app.config import get_settings
+
+router = APIRouter()
+settings = get_settings()
+history = HistoryService(audio_repository(settings), SQLEmbeddingRepository(), archive=SQLAudioArchiveRepository())
+
+
+# ---- Ciclo de vida del índice de embeddings (llamado desde el lifespan) ----
+def load_embedding_index(*consumers):
+    """Carga el índice y lo comparte con otros servicios del proceso (p. ej. el de inferencia)."""
+    if settings.EMBEDDING_INDEX_ENABLED:
+        index = load_or_rebuild(settings.EMBEDDING_INDEX_PATH, history.embeddings)
+        for svc in (history, *consumers):
+            svc.embedding_index = index
+
+
+def save_embedding_index():
+    """Tick periódico: trae lo que guardaron otros procesos y guarda la caché en disco."""
+    index = history.embedding_index
+    if index is None:
+        return
+    catch_up(index, history.embeddings)
+    if index.dirty:
+        index.save(settings.EMBEDDING_INDEX_PATH)
+
+
+_audio_list = TypeAdapter(List[AudioListItem])
+
+
+def _history_body(page: HistoryPage) -> bytes:
+    """JSON de la página; se guarda en ella para no volver a serializar en cada acierto."""
+    if page.body is None:
+        page.body = _audio_list.dump_json([
+            AudioListItem(
+                id=a.id,
+                filename=a.filename,
+                result=a.result,
+                authenticity_score=a.authenticity_score,
+                inference_duration=a.inference_duration,
+                timestamp=a.created,
+            )
+            for a in page.audios
+        ])
+    return page.body
+
+
+# ✨ NUEVO: Ahora NO requiere device_id como parámetro
+@router.get("/audios", response_model=List[AudioListItem])
+def get_audios(
+    request: Request,
+    include_archived: bool = Query(False, description="incluye los meses ya archivados"),
+    user: User = Depends(get_current_user),
+):
+    """Lista los audios del usuario autenticado (ETag: 304 si el cliente ya lo tiene)."""
+    try:
+        page = history.get_user_history(user.id, include_archived=include_archived)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    headers = {"ETag": page.etag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+    if etag_matches(request.headers.get("if-none-match"), page.etag):
+        metrics.inc("history_not_modified")
+        return Response(status_code=304, headers=headers)
+    return Response(_history_body(page), media_type="application/json", headers=headers)
+
+def is_admin(user: User) -> bool:
+    return user.email.lower() in {e.lower() for e in settings.ADMIN_EMAILS}
+
+
+@router.get("/audios/export")
+def export_audios(
+    request: Request,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    user_id: Optional[int] = Query(None, description="solo administradores pueden exportar otros usuarios"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    result: Optional[str] = Query(None, pattern="^(real|falso)$"),
+    user: User = Depends(get_current_user),
+):
+    """Exporta el historial en streaming (CSV o NDJSON), comprimido si el cliente acepta gzip."""
+    if not is_admin(user):
+        if user_id is not None and user_id != user.id:
+            raise HTTPException(status_code=403, detail="Solo puedes exportar tu propio historial")
+        user_id = user.id
+    filters = ExportFilters(user_id=user_id, since=since, until=until, result=result)
+    body = iter_export(history.repository, format, filters, settings.EXPORT_BATCH_SIZE, archive=history.archive)
+
+    headers = {"Content-Disposition": f'attachment; filename="audios.{format}"'}
+    if "gzip" in request.headers.get("accept-encoding", "").lower():
+        body = gzip_stream(body)
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    # generador síncrono: Starlette lo recorre en el threadpool, sin bloquear el event loop
+    return StreamingResponse(body, media_type=MEDIA_TYPES[format], headers=headers)
+
+
+@router.get("/audios/stats", response_model=List[DailyStatsItem])
+def get_daily_stats(
+    since: Optional[date] = None,
+    until: Optional[date] = Query(None, description="día excluido"),
+    user: User = Depends(get_current_user),
+):
+    """Agregados diarios del usuario (incluye los días ya archivados; hasta el último rollup)."""
+    return [
+        DailyStatsItem(
+            day=r.day,
+            result=r.result,
+            count=r.count,
+            avg_authenticity_score=round(r.score_sum / r.count, 2) if r.count else 0.0,
+            avg_inference_duration=(
+                round(r.inference_seconds_sum / r.inference_count, 4) if r.inference_count else None
+            ),
+        )
+        for r in history.get_daily_stats(user.id, since, until)
+    ]
+
+
+@router.get("/audios/{audio_id}/similar", response_model=List[SimilarAudioItem])
+def get_similar_audios(
+    audio_id: int,
+    k: int = Query(5, ge=1, le=50),
+    user: User = Depends(get_current_user),
+):
+    """Audios del propio usuario más parecidos (embedding Wav2Vec2) a uno suyo."""
+    neighbors = history.find_similar(audio_id, user.id, k)
+    return [SimilarAudioItem(audio_id=a, result=r, distance=round(d, 6)) for a, d, r in neighbors]
@@ -0,0 +1,26 @@
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException
+
+from app.config import get_settings
+from app.infrastructure.metrics import metrics
+
+router = APIRouter(tags=["Metrics"])
+
+
+def _check_token(authorization: Optional[str]) -> None:
+    token = get_settings().METRICS_TOKEN
+    if not token:
+        return
+    scheme, _, value = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(value.encode(), token.encode()):
+        raise HTTPException(status_code=401, detail="Token de métricas inválido",
+                            headers={"WWW-Authenticate": "Bearer"})
+
+
+@router.get("/metrics")
+def get_metrics(authorization: Optional[str] = Header(None)):
+    """Instantánea de contadores, gauges, latencias y desgloses acotados (top-N) de este worker."""
+    _check_token(authorization)
+    return metrics.snapshot()
@@ -9,6 +9,7 @@ from fastapi.security import OAuth2PasswordBearer
 from app.domain.models.user import User
 from app.infrastructure.database.user_repo_impl import SQLUserRepository
 from app.infrastructure.database.session_repo_impl import SQLSessionRepository
+from app.infrastructure import tracing
 
 JWT_SECRET = "super-dev-secret-que-no-cambia"
 JWT_ALG = "HS256"
@@ -76,7 +77,8 @@ def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     # validar sesión en BD
     jti = data.get("sid")
     sess_repo = SQLSessionRepository()
-    sess = sess_repo.get_by_jti(jti)
+    with tracing.span("auth.session"):
+        sess = sess_repo.get_by_jti(jti)
     now = _now()
 
     expires = _aware(sess.expires_at) if sess else None
@@ -88,7 +90,8 @@ def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
 
     # cargar usuario
     user_id = int(data["sub"])
-    user = SQLUserRepository().get_by_id(user_id)
+    with tracing.span("auth.user"):
+        user = SQLUserRepository().get_by_id(user_id)
     if not user or not user.is_active:
         raise HTTPException(status_code=401, detail="User not found or inactive")
 
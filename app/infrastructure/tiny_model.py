@@ -0,0 +1,30 @@
+# app/infrastructure/tiny_model.py
+"""Wav2Vec2 diminuto con pesos aleatorios para tests y desarrollo sin red.
+
+Misma arquitectura y mismas entradas/salidas que el modelo real (clasificador
+de 2 clases sobre audio a 16 kHz), pero se construye en milisegundos y sin
+descargar nada. Las predicciones no significan nada: solo sirve para
+ejercitar el camino completo. Se activa con MODEL_BACKEND=tiny.
+"""
+import torch
+from transformers import Wav2Vec2Config, Wav2Vec2FeatureExtractor, Wav2Vec2ForSequenceClassification
+
+
+def build_tiny_model(seed: int = 0):
+    """(processor, model) deterministas para una misma semilla."""
+    config = Wav2Vec2Config(
+        hidden_size=32, num_hidden_layers=2, num_attention_heads=2, intermediate_size=64,
+        conv_dim=(16, 16), conv_kernel=(10, 3), conv_stride=(5, 2),
+        num_conv_pos_embeddings=16, num_conv_pos_embedding_groups=2,
+        classifier_proj_size=16, num_labels=2,
+        id2label={0: "real", 1: "fake"}, label2id={"real": 0, "fake": 1},
+    )
+    # El feature extractor hace las veces de processor (solo se usa su configuración)
+    processor = Wav2Vec2FeatureExtractor(
+        feature_size=1, sampling_rate=16000, padding_value=0.0,
+        do_normalize=True, return_attention_mask=False,
+    )
+    with torch.random.fork_rng():
+        torch.manual_seed(seed)
+        model = Wav2Vec2ForSequenceClassification(config)
+    return processor, model.eval()
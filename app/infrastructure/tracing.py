@@ -0,0 +1,221 @@
+# app/infrastructure/tracing.py
+"""Trazas ligeras por petición: request id, spans anidados y exportación JSONL.
+
+- `RequestTracingMiddleware` asigna a cada petición un id (respeta un
+  `X-Request-ID` válido del cliente), lo devuelve en la respuesta y lo deja en
+  un ContextVar para los logs (ver `app.infrastructure.logs`).
+- Solo una fracción de las peticiones (TRACE_SAMPLE_RATE) lleva traza. Sin
+  traza, `span()` es una lectura del ContextVar (y la del perfilado).
+- Los spans viajan en ContextVars: llegan a los hilos del pool de inferencia,
+  a `asyncio.to_thread` y a las dependencias síncronas de FastAPI.
+- `span()` también abre el span del perfilado si la petición está perfilada.
+- `JsonlExporter` escribe las trazas terminadas desde un hilo propio con una
+  cola acotada: si el disco no da abasto se descartan trazas, nunca se frena
+  una petición.
+"""
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from app.infrastructure import profiling
+from app.infrastructure.metrics import metrics
+
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+_trace: ContextVar[Optional["Trace"]] = ContextVar("trace", default=None)
+_parent: ContextVar[Optional[str]] = ContextVar("trace_parent", default=None)
+_VALID_ID = re.compile(r"^[A-Za-z0-9._:-]{1,64}$")
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+@contextmanager
+def request_context(request_id: Optional[str]):
+    """Fija el request id fuera de HTTP (p. ej. un trabajo en el worker de inferencia)."""
+    token = _request_id.set(request_id)
+    try:
+        yield
+    finally:
+        _request_id.reset(token)
+
+
+class Trace:
+    def __init__(self, request_id: str, name: str):
+        self.request_id = request_id
+        self.name = name
+        self.started_at = datetime.now(timezone.utc)
+        self.spans: List[dict] = []
+        self.status: Optional[int] = None
+        self._t0 = time.perf_counter()
+        self._ids = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str):
+        with self._lock:
+            self._ids += 1
+            span_id = str(self._ids)
+        parent = _parent.get()
+        token = _parent.set(span_id)
+        error = None
+        start = time.perf_counter()
+        try:
+            with profiling.span(name):
+                yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            end = time.perf_counter()
+            _parent.reset(token)
+            record = {
+                "id": span_id,
+                "parent": parent,
+                "name": name,
+                "start_ms": round((start - self._t0) * 1000, 3),
+                "duration_ms": round((end - start) * 1000, 3),
+                "thread": threading.current_thread().name,
+            }
+            if error:
+                record["error"] = error
+            with self._lock:
+                self.spans.append(record)
+
+    def to_dict(self) -> dict:
+        return {
+            "request_id": self.request_id,
+            "name": self.name,
+            "start": self.started_at.isoformat(),
+            "duration_ms": round((time.perf_counter() - self._t0) * 1000, 3),
+            "status": self.status,
+            "spans": sorted(self.spans, key=lambda s: s["start_ms"]),
+        }
+
+
+def span(name: str):
+    """Span `name` dentro de la traza en curso (contexto nulo si la petición no se traza)."""
+    trace = _trace.get()
+    return profiling.span(name) if trace is None else trace.span(name)
+
+
+# ---------------- Exportación ----------------
+class JsonlExporter:
+    def __init__(self, path: str, max_queue: int = 1000, max_bytes: int = 100 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._queue: "queue.Queue[Optional[dict]]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, record: dict) -> bool:
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            metrics.inc("traces_dropped")
+            return False
+
+    def flush(self) -> None:
+        """Espera a que se escriba todo lo encolado."""
+        self._queue.join()
+
+    def close(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        while True:
+            record = self._queue.get()
+            try:
+                if record is None:
+                    return
+                self._write(record)
+                metrics.inc("traces_exported")
+            except Exception as e:
+                metrics.inc("traces_dropped")
+                print(f"[ERROR] exporting trace: {e}")  # sin logging: el handler podría trazar a su vez
+            finally:
+                self._queue.task_done()
+
+    def _write(self, record: dict) -> None:
+        # rotación simple: un solo archivo anterior (<path>.1)
+        if self.max_bytes and os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+            os.replace(self.path, self.path + ".1")
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+# ---------------- Middleware ----------------
+class RequestTracingMiddleware:
+    """ASGI: request id en todas las peticiones y traza en la fracción muestreada."""
+
+    def __init__(self, app, exporter: Optional[JsonlExporter], sample_rate: float = 0.0,
+                 header: str = "x-request-id"):
+        self.app = app
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.header = header.lower().encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope["headers"]).get(self.header, b"").decode("latin-1")
+        request_id = incoming if _VALID_ID.match(incoming) else new_request_id()
+        trace = None
+        if self.exporter is not None and self.sample_rate and random.random() < self.sample_rate:
+            trace = Trace(request_id, f"{scope['method']} {scope['path']}")
+        id_token = _request_id.set(request_id)
+        trace_token = _trace.set(trace)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(self.header, request_id.encode())]
+                if trace is not None:
+                    trace.status = message["status"]
+            await send(message)
+
+        try:
+            if trace is None:
+                await self.app(scope, receive, send_with_id)
+            else:
+                with trace.span("request"):
+                    await self.app(scope, receive, send_with_id)
+        finally:
+            _trace.reset(trace_token)
+            _request_id.reset(id_token)
+            if trace is not None:
+                if trace.status is None:
+                    trace.status = 500
+                self.exporter.submit(trace.to_dict())
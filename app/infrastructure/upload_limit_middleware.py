@@ -0,0 +1,73 @@
+# app/infrastructure/upload_limit_middleware.py
+"""Middleware ASGI que limita el tamaño del cuerpo de las subidas.
+
+Starlette vuelca todo el multipart a disco antes de llamar a la ruta, así que
+el límite de `receive_upload` llega tarde para una subida enorme. Aquí se
+corta antes: con `Content-Length` por encima del límite se responde 413 sin
+leer nada, y sin él (chunked) se cuentan los bytes según llegan y se aborta
+en cuanto se pasa.
+"""
+from typing import Iterable
+
+from starlette.responses import JSONResponse
+
+from app.application.audio_upload import TOO_LARGE_DETAIL
+from app.infrastructure.metrics import metrics
+
+# Margen para el boundary, las cabeceras de cada parte y los campos de formulario
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class BodyTooLarge(Exception):
+    pass
+
+
+class UploadLimitMiddleware:
+    def __init__(self, app, max_bytes: int, paths: Iterable[str]):
+        self.app = app
+        self.max_bytes = max_bytes + MULTIPART_OVERHEAD
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > self.max_bytes:
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+        exceeded = started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    exceeded = True
+                    raise BodyTooLarge()
+            return message
+
+        async def tracking_send(message):
+            nonlocal started
+            if exceeded and not started:
+                return  # FastAPI convierte el corte en un 400 de parseo: se sustituye por el 413
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except BodyTooLarge:
+            if started:
+                raise
+        if exceeded and not started:
+            await self._reject(scope, receive, send)
+
+    async def _reject(self, scope, receive, send):
+        metrics.inc("upload_rejected_size")
+        response = JSONResponse({"detail": TOO_LARGE_DETAIL}, status_code=413, headers={"Connection": "close"})
+        await response(scope, receive, send)
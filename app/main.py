@@ -1,32 +1,129 @@
+import asyncio
+import importlib
+import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
+from typing import Iterable, Optional
 
 from app.infrastructure.database.connection import create_db_and_tables
-from app.infrastructure.routes.audio import router as audio_router
-from app.infrastructure.routes.user import router as auth_router
+from app.infrastructure.routes.metrics import router as metrics_router
+from app.infrastructure.logs import configure_logging
+from app.infrastructure.tracing import JsonlExporter, RequestTracingMiddleware
 from app.config import Settings
 
 settings = Settings()
+log = logging.getLogger(__name__)
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    create_db_and_tables()
-    yield
+# rol -> módulo de rutas (se importa solo si el rol está activo; inference trae torch + modelo)
+ROLE_MODULES = {
+    "auth": "app.infrastructure.routes.user",
+    "history": "app.infrastructure.routes.history",
+    "inference": "app.infrastructure.routes.audio",
+}
 
-app = FastAPI(title="Deepfake Detection API", lifespan=lifespan)
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.ALLOWED_ORIGINS,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+def _check_roles(roles: Iterable[str]) -> list:
+    roles = [r.strip().lower() for r in roles if r.strip()]
+    unknown = [r for r in roles if r not in ROLE_MODULES]
+    if unknown or not roles:
+        raise ValueError(f"Roles no válidos: {unknown or roles} (disponibles: {', '.join(ROLE_MODULES)})")
+    return roles
 
-app.include_router(auth_router)
-app.include_router(audio_router, prefix="", tags=["Audio Detection"])
 
-@app.get("/health")
-def health():
-    return {"status": "ok"}
+def create_app(roles: Optional[Iterable[str]] = None, settings: Settings = settings) -> FastAPI:
+    """Monta solo los routers de `roles` (por defecto APP_ROLES)."""
+    roles = _check_roles(roles if roles is not None else settings.APP_ROLES)
+    configure_logging(settings.LOG_LEVEL, settings.LOG_JSON)
+    modules = {role: importlib.import_module(ROLE_MODULES[role]) for role in roles}
+
+    # El índice de embeddings vive en el módulo de historial y se comparte con inferencia
+    index_owner = None
+    if settings.EMBEDDING_INDEX_ENABLED and ("history" in modules or "inference" in modules):
+        index_owner = modules.get("history") or importlib.import_module(ROLE_MODULES["history"])
+    consumers = [modules["inference"].service] if "inference" in modules else []
+
+    async def _save_index_periodically():
+        while True:
+            await asyncio.sleep(settings.EMBEDDING_INDEX_SAVE_SECONDS)
+            try:
+                await asyncio.to_thread(index_owner.save_embedding_index)
+            except Exception as e:
+                log.error("saving embedding index: %s", e)
+
+    exporter = JsonlExporter(
+        settings.TRACE_FILE, max_queue=settings.TRACE_QUEUE_SIZE, max_bytes=settings.TRACE_MAX_MB * 1024 * 1024,
+    ) if settings.TRACE_SAMPLE_RATE else None
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        create_db_and_tables()
+        try:
+            if index_owner is None:
+                yield
+                return
+            await asyncio.to_thread(index_owner.load_embedding_index, *consumers)
+            saver = asyncio.create_task(_save_index_periodically())
+            yield
+            saver.cancel()
+            with suppress(asyncio.CancelledError):
+                await saver
+            index_owner.save_embedding_index()
+        finally:
+            if exporter is not None:
+                await asyncio.to_thread(exporter.close)
+
+    app = FastAPI(title="Deepfake Detection API", lifespan=lifespan)
+    app.state.roles = roles
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.ALLOWED_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    if "inference" in modules:
+        from app.infrastructure.upload_limit_middleware import UploadLimitMiddleware
+
+        app.add_middleware(UploadLimitMiddleware, max_bytes=settings.MAX_UPLOAD_BYTES, paths=["/predict-audio"])
+
+    if settings.ADMISSION_ENABLED and "inference" in modules:
+        from app.infrastructure.admission_middleware import AdmissionMiddleware
+        from app.application.admission import AdaptiveLimiter
+
+        app.add_middleware(
+            AdmissionMiddleware,
+            limiter=AdaptiveLimiter(
+                algorithm=settings.ADMISSION_ALGORITHM,
+                initial_limit=settings.ADMISSION_INITIAL_LIMIT,
+                min_limit=settings.ADMISSION_MIN_LIMIT,
+                max_limit=settings.ADMISSION_MAX_LIMIT,
+                target_latency=settings.ADMISSION_TARGET_LATENCY_MS / 1000.0,
+                backoff=settings.ADMISSION_BACKOFF,
+                tolerance=settings.ADMISSION_TOLERANCE,
+            ),
+            paths=settings.ADMISSION_PATHS,
+        )
+
+    # Exterior a todo lo demás: también los 503 de admisión llevan request id
+    app.add_middleware(RequestTracingMiddleware, exporter=exporter, sample_rate=settings.TRACE_SAMPLE_RATE)
+    app.state.trace_exporter = exporter
+
+    if "auth" in modules:
+        app.include_router(modules["auth"].router)
+    if "history" in modules:
+        app.include_router(modules["history"].router, tags=["Audio History"])
+    if "inference" in modules:
+        app.include_router(modules["inference"].router, prefix="", tags=["Audio Detection"])
+    app.include_router(metrics_router)
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok", "roles": roles}
+
+    return app
+
+
+app = create_app()
@@ -0,0 +1,64 @@
+# tests/conftest.py
+"""Modo de test hermético: modelo diminuto local y SQLite en memoria.
+
+Se fija antes de importar la app, así `model_loader` no descarga nada y el
+engine no intenta conectar al Postgres del .env. Los tests con el modelo real
+llevan `@pytest.mark.real_model` y solo se ejecutan con `--real-model`.
+"""
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+os.environ["MODEL_BACKEND"] = "tiny"
+os.environ["DATABASE_URL"] = os.environ.get("TEST_DATABASE_URL", "sqlite://")
+os.environ["TRACE_SAMPLE_RATE"] = "0"  # sin trazas a disco; los tests de tracing crean su exportador
+
+import pytest
+
+
+def pytest_addoption(parser):
+    parser.addoption("--real-model", action="store_true", default=False,
+                     help="ejecuta también los tests marcados real_model (descarga el modelo de HF)")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--real-model"):
+        return
+    skip = pytest.mark.skip(reason="usa el modelo real de Hugging Face (ejecutar con --real-model)")
+    for item in items:
+        if "real_model" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture
+def db():
+    """Tablas creadas en la base de test (SQLite en memoria) y borradas al terminar."""
+    from sqlalchemy import MetaData
+    from sqlmodel import SQLModel
+    from app.infrastructure.database.connection import engine
+    # todos los modelos registrados en el metadata (FK entre tablas)
+    from app.domain.models import audio, audio_archive, audio_embedding, session, token, user  # noqa: F401
+
+    SQLModel.metadata.create_all(engine)
+    try:
+        yield engine
+    finally:
+        # todo lo que haya en la base, incluidas tablas creadas al vuelo (archivos mensuales)
+        existing = MetaData()
+        existing.reflect(bind=engine)
+        existing.drop_all(bind=engine)
+
+
+@pytest.fixture(scope="session")
+def tiny_model():
+    """(processor, model) diminutos, construidos localmente."""
+    from app.infrastructure.tiny_model import build_tiny_model
+    return build_tiny_model()
+
+
+@pytest.fixture(scope="session")
+def real_model():
+    """(processor, model) reales de Hugging Face; solo para tests `real_model`."""
+    from app.config import Settings
+    from app.infrastructure.model_loader import load_model
+    return load_model(Settings(MODEL_BACKEND="hf"))
@@ -0,0 +1,121 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+
+from unittest.mock import MagicMock
+
+from app.application import admission
+from app.application.admission import AdaptiveLimiter
+from app.application.audio_service import AudioService
+from app.infrastructure.admission_middleware import AdmissionMiddleware
+
+
+def _fill(limiter, n):
+    for _ in range(n):
+        assert limiter.try_acquire()
+
+
+def test_aimd_sube_con_uso_y_baja_con_latencia_alta():
+    limiter = AdaptiveLimiter("aimd", initial_limit=4, max_limit=10, target_latency=1.0, backoff=0.5)
+    _fill(limiter, 4)
+    assert not limiter.try_acquire()
+    limiter.release(0.2)          # iba al límite y fue rápido -> +1
+    assert limiter.limit == 5
+    limiter.release(3.0)          # lenta -> ×0.5
+    assert limiter.limit == 2
+    limiter.release(None)         # 4xx: sin muestra
+    assert limiter.limit == 2 and limiter.inflight == 1
+
+
+def test_gradient_reduce_el_limite_cuando_sube_la_latencia():
+    limiter = AdaptiveLimiter("gradient", initial_limit=20, max_limit=50, smoothing=0.5, tolerance=1.0)
+    for _ in range(30):           # régimen estable a 100 ms con el límite bien usado
+        _fill(limiter, limiter.limit)
+        for _ in range(limiter.limit):
+            limiter.release(0.1)
+    stable = limiter.limit
+    _fill(limiter, stable)        # la latencia se dispara (cola interna)
+    for _ in range(stable):
+        limiter.release(1.0)
+    assert limiter.limit < stable / 2
+    assert limiter.limit >= limiter.min_limit
+
+
+def _app(limiter, gate, calls):
+    app = FastAPI()
+
+    @app.post("/predict-audio")
+    async def predict():
+        calls.append(1)
+        await gate.wait()
+        return {"ok": True}
+
+    @app.post("/predict-pcm")
+    async def predict_pcm():
+        admission.record_service_time(0.25)  # lo que anotaría AudioService._schedule
+        return {"ok": True}
+
+    @app.post("/auth/login")
+    async def login():
+        return {"token": "x"}
+
+    @app.get("/bad")
+    async def bad():
+        raise HTTPException(status_code=500)
+
+    app.add_middleware(AdmissionMiddleware, limiter=limiter, paths=["/predict-audio", "/predict-pcm", "/bad"])
+    return app
+
+
+@pytest.mark.asyncio
+async def test_middleware_rechaza_pronto_y_no_afecta_a_otras_rutas():
+    limiter = AdaptiveLimiter("aimd", initial_limit=1, min_limit=1)
+    gate, calls = asyncio.Event(), []
+    transport = httpx.ASGITransport(app=_app(limiter, gate, calls))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        first = asyncio.ensure_future(client.post("/predict-audio", content=b"x" * 1000))
+        while not calls:
+            await asyncio.sleep(0.001)
+
+        shed = await client.post("/predict-audio", content=b"y" * 1000)
+        assert shed.status_code == 503
+        assert shed.headers["Retry-After"] == "1"
+        assert len(calls) == 1    # el endpoint ni se llegó a ejecutar
+
+        assert (await client.post("/auth/login")).status_code == 200
+
+        gate.set()
+        assert (await first).status_code == 200
+        assert limiter.inflight == 0
+
+        # un 5xx cuenta como fallo y reduce el límite
+        limiter._limit = 4.0
+        assert (await client.get("/bad")).status_code == 500
+        assert limiter.limit == 3
+
+
+@pytest.mark.asyncio
+async def test_limitador_recibe_el_tiempo_de_servicio_no_el_de_extremo_a_extremo():
+    limiter = AdaptiveLimiter("aimd", initial_limit=4)
+    released = []
+    release = limiter.release
+    limiter.release = lambda latency, failed=False: (released.append(latency), release(latency, failed))
+    transport = httpx.ASGITransport(app=_app(limiter, asyncio.Event(), []))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        assert (await client.post("/predict-pcm", content=b"x" * 1000)).status_code == 200
+        assert (await client.post("/auth/login")).status_code == 200
+    assert released == [0.25]
+
+
+@pytest.mark.asyncio
+async def test_servicio_anota_espera_e_inferencia():
+    service = AudioService(MagicMock(), MagicMock(), None)
+    with admission.collect_service_time() as samples:
+        assert await service._schedule(1, lambda: 42) == 42
+    assert len(samples) == 1 and samples[0] > 0
+    await service._schedule(1, lambda: 0)  # fuera del middleware no se anota nada
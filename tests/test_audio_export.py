@@ -0,0 +1,72 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("DATABASE_URL", "sqlite://")  # sin depender del Postgres del .env
+
+import gzip
+import json
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+from fastapi import HTTPException
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, Session, create_engine
+
+from app.application.audio_export import ExportFilters, iter_export, gzip_stream
+from app.domain.models.audio import Audio
+from app.domain.models.user import User  # noqa: F401  (tabla referenciada por audios.user_id)
+from app.infrastructure.database.audio_repo_impl import SQLAudioRepository
+
+T0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def repo():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        for i in range(25):
+            session.add(Audio(
+                user_id=1 + i % 2, filename=f"a{i}.wav", result="falso" if i % 3 == 0 else "real",
+                authenticity_score=50.0, created=T0 + timedelta(days=i),
+            ))
+        session.commit()
+    with patch("app.infrastructure.database.audio_repo_impl.get_session", lambda: Session(engine)):
+        yield SQLAudioRepository()
+
+
+def test_iter_batches_keyset_con_filtros(repo):
+    batches = list(repo.iter_batches(batch_size=4, user_id=1, result="real"))
+    rows = [a for b in batches for a in b]
+    assert all(len(b) <= 4 for b in batches)
+    assert all(a.user_id == 1 and a.result == "real" for a in rows)
+    assert [a.id for a in rows] == sorted(a.id for a in rows)
+    assert len(rows) == 8
+
+    window = [a for b in repo.iter_batches(since=T0 + timedelta(days=5), until=T0 + timedelta(days=10)) for a in b]
+    assert [a.filename for a in window] == [f"a{i}.wav" for i in range(5, 10)]
+
+
+def test_export_csv_por_lotes(repo):
+    chunks = list(iter_export(repo, "csv", ExportFilters(user_id=2), batch_size=5))
+    assert len(chunks) == 3  # 12 filas en lotes de 5: un chunk por lote
+    lines = b"".join(chunks).decode().splitlines()
+    assert lines[0].startswith("id,user_id,filename")
+    assert len(lines) == 13
+
+
+def test_export_ndjson_gzip(repo):
+    body = b"".join(gzip_stream(iter_export(repo, "ndjson", ExportFilters(result="falso"), batch_size=3)))
+    rows = [json.loads(line) for line in gzip.decompress(body).decode().splitlines()]
+    assert len(rows) == 9
+    assert {r["result"] for r in rows} == {"falso"}
+    assert rows[0]["created"].startswith("2025-01-01")
+
+
+def test_export_vacio_y_validacion(repo):
+    assert b"".join(iter_export(repo, "csv", ExportFilters(user_id=99))).count(b"\n") == 1
+    assert b"".join(iter_export(repo, "ndjson", ExportFilters(user_id=99))) == b""
+    with pytest.raises(HTTPException):
+        iter_export(repo, "xml", ExportFilters())
+    with pytest.raises(HTTPException):
+        iter_export(repo, "csv", ExportFilters(since=T0, until=T0))
@@ -6,7 +6,7 @@ import pytest
 import torch
 from unittest.mock import AsyncMock, MagicMock, patch
 from fastapi import UploadFile, HTTPException
-from app.infrastructure.model_loader import model, processor  # ← usa tus reales
+from app.infrastructure.model_loader import model, processor  # ← MODEL_BACKEND=tiny en tests (conftest)
 from app.application.audio_service import AudioService
 from app.domain.models.audio import Audio
 from datetime import datetime, timedelta, timezone
@@ -16,7 +16,7 @@ async def test_predict_audio_real():
     # Mock de archivo de audio
     mock_file = MagicMock(spec=UploadFile)
     mock_file.filename = "real_audio.wav"
-    mock_file.read = AsyncMock(return_value=b"dummy audio bytes")
+    mock_file.read = AsyncMock(side_effect=[b"RIFF\x24\x00\x00\x00WAVEdummy audio bytes", b""])
 
     # Mock del modelo que devuelve logits válidos para clase 0 (real)
     class MockModel:
@@ -51,7 +51,7 @@ async def test_predict_audio_real():
         mock_sf.return_value.__enter__.return_value.samplerate = 16000
 
         # Ejecutar predicción
-        audio, duration = await service.predict_audio(mock_file, "device123")
+        audio, duration = await service.predict_audio(mock_file, user_id=1, device_id="device123")
 
         # Verificaciones
         assert isinstance(audio, Audio)
@@ -69,7 +69,7 @@ async def test_predict_audio_fake():
     # Mock de archivo de audio
     mock_file = MagicMock(spec=UploadFile)
     mock_file.filename = "fake_audio.wav"
-    mock_file.read = AsyncMock(return_value=b"dummy audio bytes")
+    mock_file.read = AsyncMock(side_effect=[b"RIFF\x24\x00\x00\x00WAVEdummy audio bytes", b""])
 
     # Mock del modelo que devuelve logits válidos
     class MockModel:
@@ -106,7 +106,7 @@ async def test_predict_audio_fake():
         mock_sf.return_value.__enter__.return_value.samplerate = 16000
 
         # Ejecutar predicción
-        audio, duration = await service.predict_audio(mock_file, "device123")
+        audio, duration = await service.predict_audio(mock_file, user_id=1, device_id="device123")
 
         # Verificaciones
         assert isinstance(audio, Audio)
@@ -128,19 +128,19 @@ def test_get_audios_by_device():
 
     # Mock del repositorio
     mock_repo = MagicMock()
-    mock_repo.get_by_device = MagicMock(return_value=fake_audios)
+    mock_repo.get_by_user_and_device = MagicMock(return_value=fake_audios)
 
     # Servicio (modelo y processor pueden ser None para este caso)
     service = AudioService(repository=mock_repo, model=None, processor=None)
 
-    result = service.get_audios_by_device("device123")
+    result = service.get_audios_by_user_and_device(1, "device123")
 
     # Verificaciones
     assert isinstance(result, list)
     assert len(result) == 2
     assert result[0].filename == "audio1.wav"
     assert result[1].result == "falso"
-    mock_repo.get_by_device.assert_called_once_with("device123")
+    mock_repo.get_by_user_and_device.assert_called_once_with(1, "device123")
 
     print(" Historial recuperado correctamente:", [a.filename for a in result])
 
@@ -150,7 +150,7 @@ async def test_predict_audio_silencioso():
     # 🎧 Archivo simulado (vacío o en silencio)
     mock_file = MagicMock(spec=UploadFile)
     mock_file.filename = "silencio.wav"
-    mock_file.read = AsyncMock(return_value=b"dummy audio bytes")
+    mock_file.read = AsyncMock(side_effect=[b"RIFF\x24\x00\x00\x00WAVEdummy audio bytes", b""])
 
     # Modelo simulado (no importa, no llega a usarse)
     mock_model = MagicMock()
@@ -175,7 +175,7 @@ async def test_predict_audio_silencioso():
 
         # Ejecutar y verificar que se lanza error por silencio
         with pytest.raises(HTTPException) as exc_info:
-            await service.predict_audio(mock_file, "device123")
+            await service.predict_audio(mock_file, user_id=1, device_id="device123")
 
         assert exc_info.value.status_code == 400
         assert "silencio" in exc_info.value.detail.lower()
@@ -207,7 +207,7 @@ async def test_predict_audio_archivo_danado():
 
         # Verifica que se lanza un error por archivo dañado
         with pytest.raises(HTTPException) as exc_info:
-            await service.predict_audio(mock_file, "device123")
+            await service.predict_audio(mock_file, user_id=1, device_id="device123")
 
         assert exc_info.value.status_code == 400
         assert "no es válido" in exc_info.value.detail.lower()
@@ -237,11 +237,27 @@ async def test_predict_audio_real_desde_archivo():
 
     # Solo parcheamos la eliminación del archivo temporal
     with patch("os.remove"):
-        audio, duration = await service.predict_audio(upload_file, "device123")
+        audio, duration = await service.predict_audio(upload_file, user_id=1, device_id="device123")
 
         # Validaciones
         assert isinstance(audio, Audio)
         assert audio.result in ["real", "falso"]
         assert 0 <= audio.authenticity_score <= 100
         assert duration > 0.0  # ahora mide el tiempo real
-        print(f" Resultado: {audio.result}, Score: {audio.authenticity_score}, Tiempo de inferencia: {duration:.4f}s")
\ No newline at end of file
+        print(f" Resultado: {audio.result}, Score: {audio.authenticity_score}, Tiempo de inferencia: {duration:.4f}s")
+
+
+@pytest.mark.real_model
+@pytest.mark.asyncio
+async def test_modelo_real_desde_archivo(real_model):
+    real_processor, real = real_model
+    with open("tests/resources/audio.wav", "rb") as f:
+        upload_file = UploadFile(filename="audio_real.wav", file=io.BytesIO(f.read()))
+
+    mock_repo = MagicMock()
+    mock_repo.save = MagicMock(side_effect=lambda audio: audio)
+    service = AudioService(mock_repo, real, real_processor)
+
+    audio, duration = await service.predict_audio(upload_file, user_id=1, device_id="device123")
+    assert audio.result in ["real", "falso"]
+    assert duration > 0.0
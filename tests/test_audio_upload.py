@@ -0,0 +1,160 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import io
+import pytest
+import numpy as np
+import soundfile as sf
+from fastapi import UploadFile, HTTPException
+
+from app.application.audio_upload import (
+    sniff_container, parse_wav_header, receive_upload, SNIFF_BYTES,
+)
+
+
+def _wav(seconds, sr=16000, channels=1):
+    buf = io.BytesIO()
+    data = 0.1 * np.random.default_rng(0).standard_normal((int(seconds * sr), channels))
+    sf.write(buf, data.astype(np.float32), sr, format="WAV", subtype="PCM_16")
+    return buf.getvalue()
+
+
+def _upload(payload, name="clip.wav"):
+    return UploadFile(filename=name, file=io.BytesIO(payload))
+
+
+def test_sniff_container():
+    assert sniff_container(_wav(0.1)[:SNIFF_BYTES]) == "wav"
+    assert sniff_container(b"fLaC\x00\x00\x00\x22" + b"\x00" * 8) == "flac"
+    assert sniff_container(b"OggS" + b"\x00" * 12) == "ogg"
+    assert sniff_container(b"ID3\x04" + b"\x00" * 12) == "mp3"
+    assert sniff_container(b"FORM\x00\x00\x00\x00AIFF") == "aiff"
+    assert sniff_container(b"%PDF-1.7 blah blah") is None
+    assert sniff_container(b"RIFF") is None  # demasiado corto
+
+
+def test_parse_wav_header():
+    layout = parse_wav_header(_wav(1.0, sr=24000, channels=2))
+    assert layout.sample_rate == 24000
+    assert layout.block_align == 4
+    assert layout.data_size == 24000 * 4
+
+
+@pytest.mark.asyncio
+async def test_wav_largo_se_corta_en_la_duracion_de_analisis():
+    payload = _wav(12.0)
+    stored = await receive_upload(_upload(payload), max_bytes=10 * 1024 * 1024, max_seconds=5.0, chunk_size=4096)
+    try:
+        assert stored.truncated
+        assert stored.size < len(payload)
+        # el WAV truncado sigue siendo válido y tiene exactamente 5 s
+        info = sf.info(stored.path)
+        assert info.frames == 5 * 16000
+    finally:
+        os.remove(stored.path)
+
+
+@pytest.mark.asyncio
+async def test_wav_corto_se_guarda_completo():
+    payload = _wav(1.0)
+    stored = await receive_upload(_upload(payload), max_bytes=10 * 1024 * 1024, max_seconds=5.0, chunk_size=1024)
+    try:
+        assert not stored.truncated
+        assert stored.size == len(payload)
+        with open(stored.path, "rb") as f:
+            assert f.read() == payload
+    finally:
+        os.remove(stored.path)
+
+
+@pytest.mark.asyncio
+async def test_archivo_no_audio_se_rechaza_sin_leer_el_resto():
+    reads = []
+
+    class Tracking(io.BytesIO):
+        def read(self, size=-1):
+            reads.append(size)
+            return super().read(size)
+
+    upload = UploadFile(filename="doc.pdf", file=Tracking(b"%PDF-1.7" + b"x" * 1_000_000))
+    with pytest.raises(HTTPException) as exc_info:
+        await receive_upload(upload, max_bytes=10 * 1024 * 1024, max_seconds=5.0, chunk_size=4096)
+    assert exc_info.value.status_code == 400
+    assert len(reads) == 1
+
+
+@pytest.mark.asyncio
+async def test_formato_comprimido_demasiado_grande_devuelve_413():
+    payload = b"OggS" + b"\x00" * 50_000
+    with pytest.raises(HTTPException) as exc_info:
+        await receive_upload(_upload(payload, "clip.ogg"), max_bytes=20_000, max_seconds=5.0, chunk_size=4096)
+    assert exc_info.value.status_code == 413
+
+
+def _limited_app(max_bytes):
+    from fastapi import FastAPI, File
+    from app.infrastructure.upload_limit_middleware import UploadLimitMiddleware
+
+    app = FastAPI()
+
+    @app.post("/predict-audio")
+    async def predict(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    app.add_middleware(UploadLimitMiddleware, max_bytes=max_bytes, paths=["/predict-audio"])
+    return app
+
+
+async def _call(app, headers, chunks):
+    """Llama a la app ASGI con un cuerpo por bloques; devuelve (status, bloques leídos)."""
+    pulled, sent = [0], []
+
+    async def receive():
+        if pulled[0] < len(chunks):
+            pulled[0] += 1
+            return {"type": "http.request", "body": chunks[pulled[0] - 1], "more_body": pulled[0] < len(chunks)}
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/predict-audio", "raw_path": b"/predict-audio",
+             "query_string": b"", "headers": headers, "http_version": "1.1", "scheme": "http",
+             "server": ("t", 80), "client": ("c", 1), "root_path": ""}
+    await app(scope, receive, send)
+    return sent[0]["status"], pulled[0]
+
+
+def _multipart(payload, boundary=b"xyz"):
+    head = (b"--" + boundary + b'\r\nContent-Disposition: form-data; name="file"; filename="a.wav"\r\n'
+            b"Content-Type: audio/wav\r\n\r\n")
+    return head + payload + b"\r\n--" + boundary + b"--\r\n"
+
+
+@pytest.mark.asyncio
+async def test_content_length_excesivo_se_rechaza_sin_leer():
+    app = _limited_app(1024)
+    headers = [(b"content-type", b"multipart/form-data; boundary=xyz"), (b"content-length", b"500000000")]
+    status, pulled = await _call(app, headers, [b"x" * 65536] * 10)
+    assert status == 413 and pulled == 0
+
+
+@pytest.mark.asyncio
+async def test_cuerpo_chunked_excesivo_se_corta_a_mitad():
+    app = _limited_app(1024)
+    body = _multipart(b"\x00" * (2 * 1024 * 1024))
+    chunks = [body[i:i + 16384] for i in range(0, len(body), 16384)]
+    status, pulled = await _call(app, [(b"content-type", b"multipart/form-data; boundary=xyz")], chunks)
+    assert status == 413
+    assert pulled < len(chunks) // 2      # no se recibió la subida entera
+
+
+@pytest.mark.asyncio
+async def test_subida_dentro_del_limite_pasa():
+    app = _limited_app(1024 * 1024)
+    body = _multipart(_wav(0.5))
+    headers = [(b"content-type", b"multipart/form-data; boundary=xyz"),
+               (b"content-length", str(len(body)).encode())]
+    status, _ = await _call(app, headers, [body])
+    assert status == 200
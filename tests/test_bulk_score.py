@@ -0,0 +1,77 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import csv
+import numpy as np
+import soundfile as sf
+from types import SimpleNamespace
+
+from app.infrastructure.cli._synthetic import synthetic_speech
+from app.infrastructure.cli.bulk_score import (
+    Checkpoint, FileSink, LengthBatcher, _PublicRows, list_inputs, read_checkpoint, run,
+)
+
+
+class FakeService:
+    def __init__(self):
+        self.features = SimpleNamespace(return_attention_mask=False)
+        self.batches = []
+
+    def predict_batch(self, signals):
+        self.batches.append([s.shape[0] for s in signals])
+        return [i % 2 for i in range(len(signals))]
+
+
+def _archive(tmp_path):
+    root = tmp_path / "archivo"
+    (root / "sub").mkdir(parents=True)
+    for i in range(5):
+        sf.write(str(root / f"clip{i}.wav"), synthetic_speech(1.0, seed=i), 16000)
+    sf.write(str(root / "sub" / "corto.wav"), synthetic_speech(0.5, seed=9), 16000)
+    sf.write(str(root / "sub" / "mudo.wav"), np.zeros(16000, dtype=np.float32), 16000)
+    (root / "notas.txt").write_text("no es audio")
+    return root
+
+
+def test_length_batcher_agrupa_por_longitud():
+    b = LengthBatcher(batch_size=2)
+    assert b.add("a", np.zeros(10)) is None
+    assert b.add("b", np.zeros(20)) is None
+    assert [p for p, _ in b.add("c", np.zeros(10))] == ["a", "c"]
+    assert [[p for p, _ in batch] for batch in b.flush()] == [["b"]]
+
+
+def test_manifiesto_con_rutas_relativas(tmp_path):
+    (tmp_path / "lista.txt").write_text("# comentario\nx.wav\n/abs/y.wav\n")
+    assert list_inputs(str(tmp_path / "lista.txt")) == [str(tmp_path / "x.wav"), "/abs/y.wav"]
+
+
+def test_run_escribe_csv_y_es_reanudable(tmp_path):
+    root = _archive(tmp_path)
+    paths = list_inputs(str(root))
+    assert len(paths) == 7
+
+    out, ckpt_path = str(tmp_path / "scores.csv"), str(tmp_path / "scores.csv.ckpt")
+    service = FakeService()
+    sink, ckpt = _PublicRows(FileSink(out)), Checkpoint(ckpt_path)
+    counts = run(service, paths[:4], sink, ckpt, workers=1, batch_size=2, max_seconds=5.0)
+    sink.close(); ckpt.close()
+    assert counts == {"scored": 4, "failed": 0}
+
+    # segunda ejecución: solo lo que falta según el checkpoint
+    done = read_checkpoint(ckpt_path)
+    todo = [p for p in paths if p not in done]
+    assert len(todo) == 3
+    sink, ckpt = _PublicRows(FileSink(out)), Checkpoint(ckpt_path)
+    counts = run(service, todo, sink, ckpt, workers=1, batch_size=2, max_seconds=5.0)
+    sink.close(); ckpt.close()
+    assert counts == {"scored": 2, "failed": 1}
+
+    with open(out) as f:
+        rows = list(csv.DictReader(f))
+    assert sorted(r["path"] for r in rows) == sorted(paths)
+    assert {r["error"] for r in rows if r["path"].endswith("mudo.wav")} == {"silence"}
+    # los lotes nunca mezclan longitudes distintas
+    assert all(len(set(b)) == 1 for b in service.batches)
+    assert read_checkpoint(ckpt_path) == set(paths)
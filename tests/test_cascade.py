@@ -0,0 +1,109 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pytest
+import torch
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi import UploadFile
+
+from app.application.audio_service import AudioService
+from app.application.cascade import CascadeClassifier, spectral_features, logit_margin
+from app.config import Settings
+from app.infrastructure.cli._synthetic import synthetic_speech
+from app.infrastructure.cli.cascade import ClipRecord, simulate
+
+
+def _tonal(seconds, seed):
+    # "falso" de juguete: tono puro sin envolvente ni ruido
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * 16000)) / 16000
+    return (0.3 * np.sin(2 * np.pi * rng.uniform(300, 900) * t)).astype(np.float32)
+
+
+def test_spectral_features_tamano_fijo():
+    a = spectral_features(synthetic_speech(1.0, seed=0))
+    b = spectral_features(synthetic_speech(3.0, seed=1))
+    c = spectral_features(np.zeros(100, dtype=np.float32))  # más corto que una ventana
+    assert a.shape == b.shape == c.shape
+    assert np.isfinite(a).all()
+    assert logit_margin([0.2, 3.2]) == pytest.approx(3.0)
+
+
+def test_pre_clasificador_separa_y_persiste(tmp_path):
+    X = [spectral_features(synthetic_speech(1.0, seed=i)) for i in range(12)]
+    X += [spectral_features(_tonal(1.0, seed=i)) for i in range(12)]
+    y = np.array([0] * 12 + [1] * 12)
+    clf = CascadeClassifier.train(np.stack(X), y, fake_below=0.2, fake_above=0.8)
+    assert clf.decide(synthetic_speech(1.0, seed=99)) == 0
+    assert clf.decide(_tonal(1.0, seed=99)) == 1
+
+    path = str(tmp_path / "cascade.joblib")
+    clf.save(path)
+    loaded = CascadeClassifier.load(path, fake_below=-1, fake_above=2)
+    assert loaded.decide(synthetic_speech(1.0, seed=99)) is None  # todo es "dudoso"
+
+
+class CountingModel:
+    def __init__(self, logits):
+        self.lengths = []
+        self._logits = logits
+
+    def __call__(self, input_values=None, **kwargs):
+        self.lengths.append(input_values.shape[-1])
+        return type('Output', (object,), {"logits": self._logits})
+
+
+async def _predict(service):
+    f = MagicMock(spec=UploadFile)
+    f.filename = "clip.wav"
+    f.read = AsyncMock(side_effect=[b"RIFF\x24\x00\x00\x00WAVEcascade", b""])
+    with patch("librosa.load", return_value=(synthetic_speech(5.0, seed=0), 16000)), \
+         patch("soundfile.SoundFile") as mock_sf:
+        mock_sf.return_value.__enter__.return_value.samplerate = 16000
+        return await service.predict_audio(f, user_id=1)
+
+
+def _service(model, **kwargs):
+    repo = MagicMock()
+    repo.save = MagicMock(side_effect=lambda audio: audio)
+    return AudioService(repo, model, None, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_pre_clasificador_evita_wav2vec2():
+    model = CountingModel(torch.tensor([[0.1, 0.9]]))
+    cascade = MagicMock()
+    cascade.decide = MagicMock(return_value=0)
+    audio, _ = await _predict(_service(model, cascade=cascade))
+    assert audio.result == "real"
+    assert model.lengths == []
+
+
+@pytest.mark.asyncio
+async def test_salida_temprana_segun_margen():
+    settings = Settings(EARLY_EXIT_SECONDS=1.0, EARLY_EXIT_MARGIN=2.0)
+
+    confident = CountingModel(torch.tensor([[0.0, 5.0]]))
+    audio, _ = await _predict(_service(confident, settings=settings))
+    assert confident.lengths == [16000]
+    assert audio.result == "falso"
+
+    doubtful = CountingModel(torch.tensor([[0.4, 0.6]]))
+    await _predict(_service(doubtful, settings=settings))
+    assert doubtful.lengths == [16000, 80000]
+
+
+def test_simulate_ahorro_y_concordancia():
+    records = [
+        ClipRecord(label=0, full_pred=0, full_s=1.0, features_s=0.1, p_fake=0.01, prefix_pred=0, prefix_margin=5, prefix_s=0.4),
+        ClipRecord(label=1, full_pred=1, full_s=1.0, features_s=0.1, p_fake=0.5, prefix_pred=1, prefix_margin=4, prefix_s=0.4),
+        ClipRecord(label=1, full_pred=1, full_s=1.0, features_s=0.1, p_fake=0.5, prefix_pred=0, prefix_margin=0.5, prefix_s=0.4),
+    ]
+    row = simulate(records, fake_below=0.05, fake_above=2.0, margin=3.0)
+    assert row["agreement"] == 1.0
+    assert row["exit_prefilter"] == pytest.approx(1 / 3)
+    assert row["exit_prefix"] == pytest.approx(1 / 3)
+    # coste: 0.1 + (0.1+0.4) + (0.1+0.4+1.0) = 2.1 frente a 3.0
+    assert row["compute_saved"] == pytest.approx(0.3)
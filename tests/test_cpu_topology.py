@@ -0,0 +1,63 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from unittest.mock import MagicMock
+from app.infrastructure.cpu_topology import (
+    parse_cpu_list, split_cpus, claim_worker_slot, resolve_affinity,
+)
+from app.infrastructure.cli.autotune import inference_step, pareto_frontier
+
+
+def test_parse_cpu_list():
+    assert parse_cpu_list("0-3,6") == [0, 1, 2, 3, 6]
+    assert parse_cpu_list(" 2 , 1 ") == [1, 2]
+    with pytest.raises(ValueError):
+        parse_cpu_list("3-1")
+
+
+def test_split_cpus_reparte_parejo():
+    assert split_cpus(list(range(8)), 3) == [[0, 1, 2], [3, 4, 5], [6, 7]]
+    # nunca más grupos que cores
+    assert split_cpus([0, 1], 4) == [[0], [1]]
+
+
+def test_claim_worker_slot_reutiliza_y_salta_ocupados(tmp_path):
+    assert claim_worker_slot(4, str(tmp_path)) == 0
+    # el mismo proceso recupera su hueco
+    assert claim_worker_slot(4, str(tmp_path)) == 0
+
+    # hueco 0 de otro proceso vivo (pid 1) -> se toma el 1
+    (tmp_path / "deepfake-cpu-slot-0.lock").write_text("1")
+    assert claim_worker_slot(4, str(tmp_path)) == 1
+
+    # lock huérfano de un pid inexistente -> se reutiliza
+    (tmp_path / "deepfake-cpu-slot-0.lock").write_text("999999999")
+    (tmp_path / "deepfake-cpu-slot-1.lock").unlink()
+    assert claim_worker_slot(4, str(tmp_path)) == 0
+
+
+def test_resolve_affinity_grupos_explicitos(tmp_path):
+    assert resolve_affinity(None, 2) is None
+    assert resolve_affinity("0-1", 4) == [0, 1]
+    assert resolve_affinity("0-1;2-3", 2, str(tmp_path)) == [0, 1]
+
+
+def test_pareto_frontier():
+    results = [
+        {"workers": 1, "threads": 4, "batch_size": 1, "throughput": 10.0, "p99_ms": 100.0},
+        {"workers": 2, "threads": 2, "batch_size": 1, "throughput": 15.0, "p99_ms": 150.0},
+        {"workers": 2, "threads": 2, "batch_size": 4, "throughput": 14.0, "p99_ms": 400.0},  # dominada
+        {"workers": 4, "threads": 1, "batch_size": 4, "throughput": 20.0, "p99_ms": 600.0},
+    ]
+    frontier = pareto_frontier(results)
+    assert [r["throughput"] for r in frontier] == [10.0, 15.0, 20.0]
+
+
+def test_autotune_mide_el_camino_del_servicio():
+    service = MagicMock()
+    inference_step(service, ["a"])()
+    service.infer_signal.assert_called_once_with("a")
+    inference_step(service, ["a", "b"])()
+    service.predict_batch.assert_called_once_with(["a", "b"])
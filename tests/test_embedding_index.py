@@ -0,0 +1,240 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import threading
+import time
+import types
+import numpy as np
+import pytest
+import torch
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi import UploadFile
+
+from app.application.audio_service import AudioService
+from app.application.history_service import HistoryService
+from app.config import Settings
+from app.domain.models.audio_embedding import AudioEmbedding
+from app.infrastructure.database.embedding_repo_impl import SQLEmbeddingRepository
+from app.infrastructure.embedding_index import EmbeddingIndex, catch_up, load_or_rebuild
+
+
+def _vectors(n, dim=16, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+
+
+class BruteForceANN:
+    """Sustituto determinista de NNDescent (misma interfaz query/update)."""
+
+    def __init__(self, data):
+        self.data = data.copy()
+
+    def query(self, q, k):
+        dist = 1.0 - self.data @ q[0]
+        order = np.argsort(dist)[:k]
+        return order[None, :], dist[order][None, :]
+
+    def update(self, xs_fresh):
+        self.data = np.vstack([self.data, xs_fresh])
+
+
+def test_query_fuerza_bruta_y_exclude():
+    X = _vectors(20)
+    idx = EmbeddingIndex(min_ann_size=1000)
+    idx.add_many(list(range(100, 120)), X, ["real"] * 10 + ["falso"] * 10)
+
+    # un vector casi idéntico al 105 (ruido mínimo) lo encuentra primero
+    near = idx.query(X[5] + 1e-4, k=3)
+    assert near[0][0] == 105
+    assert near[0][1] < 1e-3
+    assert len(near) == 3
+
+    assert all(a != 105 for a, _, _ in idx.query(X[5], k=3, exclude=105))
+    # altas repetidas se ignoran
+    idx.add(105, X[0], "falso")
+    assert len(idx) == 20
+
+
+def test_combina_grafo_y_tramo_pendiente():
+    X = _vectors(30, seed=1)
+    idx = EmbeddingIndex(min_ann_size=1000, update_every=100)
+    idx.add_many(list(range(20)), X[:20], ["real"] * 20)
+    # simula un grafo ya construido con las 20 primeras filas
+    idx._ann, idx._ann_size = BruteForceANN(idx._vectors[:20]), 20
+    idx.add_many(list(range(20, 30)), X[20:], ["falso"] * 10)
+
+    assert idx.query(X[3], k=1)[0][0] == 3          # desde el grafo
+    assert idx.query(X[25], k=1)[0] == (25, pytest.approx(0.0, abs=1e-5), "falso")  # pendiente
+
+
+def test_reconstruye_el_grafo_y_lo_sustituye():
+    X = _vectors(12, seed=2)
+    idx = EmbeddingIndex(min_ann_size=1000, update_every=4, background=False)
+    idx._build_ann = BruteForceANN
+    idx.add_many(list(range(4)), X[:4], ["real"] * 4)
+    old = idx._ann = BruteForceANN(idx._vectors[:4])
+    idx._ann_size = 4
+    idx.add_many(list(range(4, 8)), X[4:8], ["real"] * 4)
+    assert idx._ann is not old and idx._ann_size == 8
+    assert idx._ann.data.shape[0] == 8
+    assert old.data.shape[0] == 4          # el grafo publicado no se modifica
+
+
+def test_las_consultas_no_esperan_a_la_reconstruccion():
+    X = _vectors(8, seed=3)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_build(data):
+        started.set()
+        release.wait(5)
+        return BruteForceANN(data)
+
+    idx = EmbeddingIndex(min_ann_size=4, update_every=4)
+    idx._build_ann = slow_build
+    idx.add_many(list(range(4)), X[:4], ["real"] * 4)   # lanza la construcción en segundo plano
+    assert started.wait(5)
+    t0 = time.perf_counter()
+    assert idx.query(X[2], k=1)[0][0] == 2              # fuerza bruta mientras tanto
+    assert time.perf_counter() - t0 < 1.0
+    release.set()
+    deadline = time.monotonic() + 5
+    while idx._ann is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert idx._ann_size == 4
+
+
+def test_query_among_solo_entre_los_ids_dados():
+    X = _vectors(10, seed=4)
+    idx = EmbeddingIndex(min_ann_size=1000)
+    idx.add_many(list(range(10)), X, ["real"] * 5 + ["falso"] * 5)
+    near = idx.query_among(X[7], [1, 2, 3, 7], k=5, exclude=7)
+    assert [a for a, _, _ in near] and {a for a, _, _ in near} <= {1, 2, 3}
+    assert idx.query_among(X[7], [99], k=3) == []
+
+
+def test_save_y_load(tmp_path):
+    X = _vectors(5)
+    idx = EmbeddingIndex(min_ann_size=1000)
+    idx.add_many([1, 2, 3, 4, 5], X, ["real", "falso", "real", "falso", "real"])
+    path = str(tmp_path / "index.pkl")
+    idx.save(path)
+    assert idx.dirty == 0
+
+    loaded = EmbeddingIndex.load(path)
+    assert len(loaded) == 5 and 4 in loaded and 6 not in loaded
+    assert loaded.query(X[1], k=1)[0][0] == 2
+    np.testing.assert_allclose(loaded.vector_of(4), idx.vector_of(4))
+
+
+def _save_embedding(repo, audio_id, vector, result="real"):
+    return repo.save(AudioEmbedding(audio_id=audio_id, result=result, dim=vector.shape[0],
+                                    vector=vector.astype("<f4").tobytes()))
+
+
+def test_load_or_rebuild_desde_repositorio(db):
+    X = _vectors(3)
+    repo = SQLEmbeddingRepository()
+    for i in range(3):
+        _save_embedding(repo, 10 + i, X[i])
+    idx = load_or_rebuild(None, repo, batch_size=2)
+    assert len(idx) == 3
+    np.testing.assert_allclose(idx.vector_of(12), X[2] / np.linalg.norm(X[2]), rtol=1e-5)
+
+
+def test_dos_escritores_no_pierden_embeddings(db, tmp_path):
+    # dos procesos (A y B) con su propio índice y el mismo archivo en disco
+    path = str(tmp_path / "index.pkl")
+    repo = SQLEmbeddingRepository()
+    X = _vectors(4, seed=9)
+    a, b = load_or_rebuild(path, repo), load_or_rebuild(path, repo)
+
+    _save_embedding(repo, 99, X[0]); b.add(99, X[0], "real")    # B guarda la fila menor...
+    _save_embedding(repo, 100, X[1]); a.add(100, X[1], "falso")  # ...y A la mayor
+    a.save(path)                                                 # el archivo solo tiene la de A
+    assert 99 in load_or_rebuild(path, repo)                     # un reinicio no se salta la de B
+
+    # proceso solo de historial: cargó al arrancar y se pone al día en cada tick
+    history_only = load_or_rebuild(path, repo)
+    _save_embedding(repo, 101, X[2])
+    assert 101 not in history_only
+    assert catch_up(history_only, repo) == 1
+    assert all(i in history_only for i in (99, 100, 101))
+    assert catch_up(history_only, repo) == 0
+
+
+def test_similares_incluye_audios_guardados_por_otro_proceso(db):
+    repo, X = SQLEmbeddingRepository(), _vectors(3, seed=11)
+    idx = EmbeddingIndex(min_ann_size=1000)
+    idx.add(1, X[0], "real")
+    _save_embedding(repo, 1, X[0])
+    _save_embedding(repo, 2, X[0] + 0.01, "falso")  # guardado por otro worker: no está en idx
+    audios = MagicMock()
+    audios.get_by_id.return_value = MagicMock(id=1, user_id=10)
+    audios.get_by_user.return_value = [MagicMock(id=1), MagicMock(id=2), MagicMock(id=3)]  # el 3 no tiene embedding
+    svc = HistoryService(audios, repo, embedding_index=idx)
+    assert [(a, r) for a, _, r in svc.find_similar(1, user_id=10)] == [(2, "falso")]
+    assert 2 in idx
+
+
+class TinyClassifierModel(torch.nn.Module):
+    """Modelo mínimo con `classifier` para que el servicio capture el embedding."""
+
+    def __init__(self, logits):
+        super().__init__()
+        self.classifier = torch.nn.Linear(4, 2)
+        self._logits = logits
+
+    def forward(self, input_values=None, **kwargs):
+        self.classifier(input_values[:, :4])
+        return types.SimpleNamespace(logits=self._logits)
+
+
+@pytest.mark.asyncio
+async def test_predict_reutiliza_veredicto_de_casi_duplicado():
+    mock_file = MagicMock(spec=UploadFile)
+    mock_file.filename = "reupload.wav"
+    mock_file.read = AsyncMock(side_effect=[b"RIFF\x24\x00\x00\x00WAVEdummy audio bytes", b""])
+
+    model = TinyClassifierModel(torch.tensor([[0.9, 0.1]]))  # el modelo diría "real"
+    index = MagicMock()
+    index.query = MagicMock(return_value=[(7, 0.001, "falso")])
+    embeddings = MagicMock()
+    embeddings.save = MagicMock(side_effect=lambda e: e)
+    repo = MagicMock()
+    repo.save = MagicMock(side_effect=lambda audio: audio)
+
+    service = AudioService(repo, model, None, embeddings=embeddings, embedding_index=index,
+                           settings=Settings(NEAR_DUPLICATE_REUSE=True))
+
+    with patch("librosa.load", return_value=(torch.randn(16000).numpy(), 16000)), \
+         patch("soundfile.SoundFile") as mock_sf:
+        mock_sf.return_value.__enter__.return_value.samplerate = 16000
+        audio, _ = await service.predict_audio(mock_file, user_id=1)
+
+    assert audio.result == "falso"
+    stored = embeddings.save.call_args[0][0]
+    assert stored.dim == 4
+    assert np.frombuffer(stored.vector, dtype="<f4").shape == (4,)
+    index.add.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_casi_duplicado_desactivado_por_defecto():
+    model = TinyClassifierModel(torch.tensor([[0.9, 0.1]]))
+    index = MagicMock()
+    index.query = MagicMock(return_value=[(7, 0.001, "falso")])
+    service = AudioService(MagicMock(), model, None, embedding_index=index, settings=Settings())
+    analysis = service._analyze_signal(np.random.default_rng(0).standard_normal(16000).astype(np.float32))
+    assert analysis.prediction == 0
+    index.query.assert_not_called()
+
+
+def test_similares_solo_del_propio_usuario():
+    X = _vectors(4, seed=5)
+    idx = EmbeddingIndex(min_ann_size=1000)
+    idx.add_many([1, 2, 3, 4], X, ["real", "falso", "real", "falso"])
+    repo = MagicMock()
+    repo.get_by_id.return_value = MagicMock(id=1, user_id=10)
+    repo.get_by_user.return_value = [MagicMock(id=1), MagicMock(id=3)]   # el 2 y el 4 son de otro usuario
+    svc = HistoryService(repo, embedding_index=idx)
+    assert [a for a, _, _ in svc.find_similar(1, user_id=10, k=5)] == [3]
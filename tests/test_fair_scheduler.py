@@ -0,0 +1,171 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from fastapi import HTTPException, UploadFile
+
+from app.application.audio_service import AudioService
+from app.application.fair_scheduler import FairScheduler, TokenBucket
+from app.infrastructure.metrics import metrics
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+async def _run_jobs(scheduler, jobs):
+    """Lanza los trabajos en orden de llegada y devuelve el orden en que obtienen turno."""
+    order = []
+    gate = asyncio.Event()
+
+    async def job(user):
+        async with scheduler.slot(user):
+            order.append(user)
+            await gate.wait()  # el primero retiene el turno hasta que llegan todos
+
+    tasks = []
+    for user in jobs:
+        tasks.append(asyncio.ensure_future(job(user)))
+        await asyncio.sleep(0)  # llegan de una en una
+    gate.set()
+    await asyncio.gather(*tasks)
+    return order
+
+
+@pytest.mark.asyncio
+async def test_rafaga_de_un_usuario_no_acapara_la_cola():
+    scheduler = FairScheduler(slots=1, max_concurrency_per_user=1, max_queued_per_user=10)
+    order = await _run_jobs(scheduler, ["a"] * 5 + ["b"] * 2)
+    # "b" llega detrás de 5 de "a" (la 2ª ya esperaba turno antes) y desde ahí se alternan
+    assert order == ["a", "a", "b", "a", "b", "a", "a"]
+
+
+@pytest.mark.asyncio
+async def test_pesos_deficit_round_robin():
+    scheduler = FairScheduler(slots=1, max_queued_per_user=10, weights={"a": 2})
+    order = await _run_jobs(scheduler, ["a"] * 6 + ["b"] * 3)
+    assert order[:7] == ["a", "a", "a", "b", "a", "a", "b"]  # "a" gasta su cuanto de 2 por turno
+
+
+@pytest.mark.asyncio
+async def test_limite_de_concurrencia_por_usuario():
+    scheduler = FairScheduler(slots=4, max_concurrency_per_user=1)
+    peak, active = 0, 0
+
+    async def job():
+        nonlocal peak, active
+        async with scheduler.slot(1):
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    await asyncio.gather(*[job() for _ in range(4)])
+    assert peak == 1
+
+
+@pytest.mark.asyncio
+async def test_cola_llena_y_cancelacion():
+    metrics.reset()
+    scheduler = FairScheduler(slots=1, max_queued_per_user=1)
+    gate = asyncio.Event()
+
+    async def hold():
+        async with scheduler.slot(1):
+            await gate.wait()
+
+    holder = asyncio.ensure_future(hold())
+    await asyncio.sleep(0)
+    waiter = asyncio.ensure_future(hold())
+    await asyncio.sleep(0)
+    assert scheduler.queue_depth(1) == 1
+
+    with pytest.raises(HTTPException) as exc_info:
+        async with scheduler.slot(1):
+            pass
+    assert exc_info.value.status_code == 429
+    assert metrics.counter("scheduler_rejected_queue") == 1
+
+    waiter.cancel()
+    await asyncio.sleep(0)
+    assert scheduler.queue_depth(1) == 0
+    gate.set()
+    await holder
+    assert scheduler.waiting == 0
+
+
+@pytest.mark.asyncio
+async def test_profundidad_por_usuario_solo_top_n():
+    metrics.reset()
+    scheduler = FairScheduler(slots=1, max_concurrency_per_user=1, max_queued_per_user=10, top_users=2)
+    gate = asyncio.Event()
+
+    async def job(user):
+        async with scheduler.slot(user):
+            await gate.wait()
+
+    tasks = [asyncio.ensure_future(job(u)) for u in [1] + [2] * 4 + [3] * 2 + [4]]
+    await asyncio.sleep(0)
+    by_user = metrics.snapshot()["breakdowns"]["scheduler_queue_depth_by_user"]
+    assert by_user == {"2": 4, "3": 2}  # el 1 tiene el turno; el 4 queda fuera del top 2
+    assert metrics.snapshot()["gauges"]["scheduler_queue_depth"] == 7
+    gate.set()
+    await asyncio.gather(*tasks)
+    assert metrics.snapshot()["breakdowns"]["scheduler_queue_depth_by_user"] == {}
+
+
+def test_token_bucket_y_retry_after():
+    clock = FakeClock()
+    scheduler = FairScheduler(slots=1, rate_per_user=0.5, burst_per_user=2, clock=clock)
+    scheduler.check_rate(7)
+    scheduler.check_rate(7)
+    with pytest.raises(HTTPException) as exc_info:
+        scheduler.check_rate(7)
+    assert exc_info.value.status_code == 429
+    assert exc_info.value.headers["Retry-After"] == "2"
+    scheduler.check_rate(8)  # otro usuario tiene su propio bucket
+    clock.now = 2.0
+    scheduler.check_rate(7)
+
+    bucket = TokenBucket(rate=4, burst=1, clock=clock)
+    assert bucket.take() == 0
+    assert bucket.take() == pytest.approx(0.25)
+
+
+def test_buckets_de_usuarios_inactivos_se_descartan():
+    clock = FakeClock()
+    scheduler = FairScheduler(slots=1, rate_per_user=1, burst_per_user=2, clock=clock)
+    for user_id in range(1000):
+        scheduler.check_rate(user_id)
+    assert len(scheduler._buckets) == 1000
+    clock.now = 1.5
+    scheduler.check_rate(0)
+    scheduler.check_rate(0)  # el usuario 0 sigue activo y con el bucket vacío
+    clock.now = 2.5
+    scheduler.check_rate(1)  # barrido: el resto ya se rellenó
+    assert set(scheduler._buckets) == {0, 1}
+    scheduler.check_rate(0)  # el bucket de 0 se conserva: solo había recuperado 1 token
+    with pytest.raises(HTTPException):
+        scheduler.check_rate(0)
+
+
+@pytest.mark.asyncio
+async def test_servicio_responde_429_sin_leer_la_subida():
+    scheduler = FairScheduler(slots=1, rate_per_user=1, burst_per_user=1, clock=FakeClock())
+    service = AudioService(MagicMock(), MagicMock(), None, scheduler=scheduler)
+    scheduler.check_rate(3)  # agota el bucket
+
+    f = MagicMock(spec=UploadFile)
+    f.filename = "clip.wav"
+    f.read = AsyncMock(return_value=b"")
+    with pytest.raises(HTTPException) as exc_info:
+        await service.predict_audio(f, user_id=3)
+    assert exc_info.value.status_code == 429
+    f.read.assert_not_called()
@@ -0,0 +1,60 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pytest
+import torch
+from transformers import Wav2Vec2FeatureExtractor
+
+from app.application.feature_preparation import FeaturePreparer
+
+
+def _signals(lengths, seed=0):
+    rng = np.random.default_rng(seed)
+    return [(0.2 * rng.standard_normal(n) + 0.05).astype(np.float32) for n in lengths]
+
+
+@pytest.mark.parametrize("return_attention_mask", [False, True])
+def test_paridad_un_clip(return_attention_mask):
+    fe = Wav2Vec2FeatureExtractor(return_attention_mask=return_attention_mask)
+    prep = FeaturePreparer.from_processor(fe)
+    signal = _signals([80000])[0]
+
+    expected = fe(signal, sampling_rate=16000, return_tensors="pt", padding=True)
+    got = prep.prepare(signal)
+
+    assert got["input_values"].dtype == torch.float32
+    torch.testing.assert_close(got["input_values"], expected["input_values"], atol=1e-5, rtol=1e-5)
+    if return_attention_mask:
+        assert torch.equal(got["attention_mask"].long(), expected["attention_mask"].long())
+
+
+@pytest.mark.parametrize("return_attention_mask", [False, True])
+def test_paridad_batch_con_padding(return_attention_mask):
+    fe = Wav2Vec2FeatureExtractor(return_attention_mask=return_attention_mask)
+    prep = FeaturePreparer.from_processor(fe)
+    signals = _signals([16000, 48000, 31000], seed=1)
+
+    expected = fe(signals, sampling_rate=16000, return_tensors="pt", padding=True)
+    got = prep.prepare_batch(signals)
+
+    torch.testing.assert_close(got["input_values"], expected["input_values"], atol=1e-5, rtol=1e-5)
+    if return_attention_mask:
+        assert torch.equal(got["attention_mask"].long(), expected["attention_mask"].long())
+
+
+def test_buffers_se_reutilizan():
+    prep = FeaturePreparer()
+    first = prep.prepare(_signals([32000])[0])["input_values"]
+    ptr = first.data_ptr()
+    # un clip más corto usa el mismo almacenamiento
+    second = prep.prepare(_signals([16000], seed=2)[0])["input_values"]
+    assert second.data_ptr() == ptr
+    assert second.shape == (1, 16000)
+
+
+def test_from_processor_none_usa_valores_por_defecto():
+    prep = FeaturePreparer.from_processor(None)
+    assert prep.do_normalize is True
+    assert prep.return_attention_mask is False
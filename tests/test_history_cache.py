@@ -0,0 +1,156 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.application.history_cache import HistoryCache, HistoryPage, etag_matches
+from app.application.history_service import HistoryService
+from app.domain.models.audio import Audio
+from app.domain.models.user import User
+from app.infrastructure.database.audio_repo_impl import SQLAudioRepository
+from app.infrastructure.database.cached_audio_repo_impl import CachedAudioRepository
+from app.infrastructure.metrics import metrics
+from app.infrastructure.security import get_current_user
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _audio(id, user_id=1, result="real"):
+    return Audio(id=id, user_id=user_id, filename=f"{id}.wav", result=result, authenticity_score=80.0,
+                 created=datetime(2025, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=id))
+
+
+def test_etag_depende_del_contenido():
+    a = HistoryPage.build([_audio(2), _audio(1)])
+    b = HistoryPage.build([_audio(2), _audio(1)])
+    c = HistoryPage.build([_audio(2, result="falso"), _audio(1)])
+    assert a.etag == b.etag != c.etag
+    assert a.marker == (2, 2)
+    assert etag_matches(a.etag, a.etag)
+    assert etag_matches(f'"otro", W/{a.etag}', a.etag)
+    assert etag_matches("*", a.etag)
+    assert not etag_matches(None, a.etag)
+    assert not etag_matches(c.etag, a.etag)
+
+
+def test_lru_por_filas_y_limite_por_usuario():
+    metrics.reset()
+    cache = HistoryCache(max_rows=5, max_rows_per_user=3)
+    cache.put(1, [_audio(1), _audio(2)])
+    cache.put(2, [_audio(3, 2), _audio(4, 2)])
+    assert cache.get(1) is not None          # 1 pasa a ser el más reciente
+    cache.put(3, [_audio(5, 3), _audio(6, 3)])
+    assert cache.get(2) is None              # expulsado el menos usado
+    assert cache.get(1) is not None and cache.rows == 4
+    cache.put(4, [_audio(i, 4) for i in range(10, 14)])  # demasiado largo: no se guarda
+    assert cache.get(4) is None and cache.rows == 4
+    snap = metrics.snapshot()
+    assert snap["counters"]["history_cache_evictions"] == 1
+    assert snap["gauges"]["history_cache_hit_rate"] == pytest.approx(2 / 4)
+
+
+def test_ttl_y_marcador():
+    clock = FakeClock()
+    cache = HistoryCache(ttl=10, clock=clock)
+    cache.put(1, [_audio(1)])
+    assert cache.get(1, marker=(1, 1)) is not None
+    assert cache.get(1, marker=(2, 7)) is None   # otro proceso escribió
+    cache.put(1, [_audio(1)])
+    clock.now = 11
+    assert cache.get(1) is None
+
+
+def test_on_saved_actualiza_la_pagina():
+    cache = HistoryCache()
+    old = cache.put(1, [_audio(1)])
+    cache.on_saved(_audio(2))
+    cache.on_saved(_audio(3, user_id=2))         # usuario no cacheado: nada
+    page = cache.get(1, marker=(2, 2))
+    assert [a.id for a in page.audios] == [2, 1]
+    assert page.etag != old.etag and page.body is None
+    assert cache.get(2) is None
+
+
+def test_on_saved_fuera_de_orden_respeta_el_orden_del_historial():
+    cache = HistoryCache()
+    cache.put(1, [_audio(5), _audio(3)])
+    cache.on_saved(_audio(4))   # un guardado concurrente termina después que el 5
+    cache.on_saved(_audio(2))
+    cache.on_saved(_audio(6))
+    cache.on_saved(_audio(4))   # repetido: no se duplica
+    tied = _audio(7)
+    tied.created = _audio(6).created
+    cache.on_saved(tied)        # mismo created: desempata el id
+    page = cache.get(1)
+    assert [a.id for a in page.audios] == [7, 6, 5, 4, 3, 2]
+    assert page.etag == HistoryPage.build(page.audios).etag
+
+
+def test_pagina_cacheada_igual_a_la_de_bd_con_guardados_desordenados(db):
+    inner = SQLAudioRepository()
+    cached = CachedAudioRepository(inner, HistoryCache(), validate=False)
+    base = datetime(2025, 1, 1, 12, 0)
+    cached.save(Audio(user_id=1, filename="a.wav", result="real", authenticity_score=90.0, created=base))
+    cached.get_history_page(1)
+    # llega después pero es más antiguo (p. ej. un guardado concurrente que tardó más)
+    cached.save(Audio(user_id=1, filename="b.wav", result="real", authenticity_score=80.0,
+                      created=base - timedelta(minutes=5)))
+    assert [a.id for a in cached.get_history_page(1).audios] == [a.id for a in inner.get_by_user(1)]
+
+
+def test_repositorio_cacheado_ve_escrituras_propias_y_ajenas(db):
+    plain = SQLAudioRepository()
+    repo = CachedAudioRepository(SQLAudioRepository(), HistoryCache())
+    repo.save(Audio(user_id=1, filename="a.wav", result="real", authenticity_score=90.0))
+    first = repo.get_history_page(1)
+    assert repo.get_history_page(1) is first
+
+    repo.save(Audio(user_id=1, filename="b.wav", result="falso", authenticity_score=5.0))
+    second = repo.get_history_page(1)
+    assert [a.filename for a in second.audios] == ["b.wav", "a.wav"]
+
+    # escritura desde otro proceso (sin pasar por la caché): la detecta el marcador
+    plain.save(Audio(user_id=1, filename="c.wav", result="real", authenticity_score=70.0))
+    assert [a.filename for a in repo.get_by_user(1)] == ["c.wav", "b.wav", "a.wav"]
+
+    repo.save_many([Audio(user_id=1, filename="d.wav", result="real", authenticity_score=60.0)])
+    assert len(repo.get_by_user(1)) == 4
+    assert repo.get_by_id(first.audios[0].id).filename == "a.wav"   # delegado
+
+
+def test_ruta_audios_con_etag(db, monkeypatch):
+    from app.infrastructure.routes import history as history_routes
+
+    repo = CachedAudioRepository(SQLAudioRepository(), HistoryCache())
+    monkeypatch.setattr(history_routes, "history", HistoryService(repo))
+    app = FastAPI()
+    app.include_router(history_routes.router)
+    app.dependency_overrides[get_current_user] = lambda: User(id=1, email="u@x.com", hashed_password="x")
+    client = TestClient(app)
+
+    repo.save(Audio(user_id=1, filename="a.wav", result="real", authenticity_score=90.0, inference_duration=0.2))
+    r = client.get("/audios")
+    assert r.status_code == 200
+    assert [a["filename"] for a in r.json()] == ["a.wav"]
+    etag = r.headers["etag"]
+
+    metrics.reset()
+    r = client.get("/audios", headers={"If-None-Match": etag})
+    assert r.status_code == 304 and r.content == b""
+    assert metrics.snapshot()["counters"]["history_not_modified"] == 1
+
+    repo.save(Audio(user_id=1, filename="b.wav", result="falso", authenticity_score=3.0))
+    r = client.get("/audios", headers={"If-None-Match": etag})
+    assert r.status_code == 200 and r.headers["etag"] != etag
+    assert [a["filename"] for a in r.json()] == ["b.wav", "a.wav"]
@@ -0,0 +1,118 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pytest
+import torch
+from unittest.mock import MagicMock
+from transformers import Wav2Vec2Config, Wav2Vec2ForSequenceClassification
+
+from app.application.audio_service import AudioService
+from app.application.feature_preparation import FeaturePreparer
+from app.application.length_buckets import LengthBuckets, supports_padding
+from app.config import Settings
+from app.infrastructure.cli._synthetic import synthetic_speech
+from app.infrastructure.cli.bulk_score import LengthBatcher
+from app.infrastructure.metrics import metrics
+from app.infrastructure.tiny_model import build_tiny_model
+
+
+def _tiny_model():
+    config = Wav2Vec2Config(
+        hidden_size=16, num_hidden_layers=2, num_attention_heads=2, intermediate_size=32,
+        conv_dim=(8, 8), conv_kernel=(10, 3), conv_stride=(5, 2), feat_extract_norm="layer",
+        num_conv_pos_embeddings=16, num_conv_pos_embedding_groups=2,
+        classifier_proj_size=8, num_labels=2,
+    )
+    torch.manual_seed(0)
+    return Wav2Vec2ForSequenceClassification(config).eval()
+
+
+def test_bucket_mas_pequeno_que_contiene_y_recorte():
+    b = LengthBuckets([2, 0.5, 1])
+    assert b.sizes == [8000, 16000, 32000]
+    assert b.bucket_for(100) == 8000
+    assert b.bucket_for(8000) == 8000
+    assert b.bucket_for(8001) == 16000
+    assert b.bucket_for(50000) == 32000
+    with pytest.raises(ValueError):
+        LengthBuckets([])
+
+
+def test_metricas_de_distribucion_y_relleno():
+    metrics.reset()
+    b = LengthBuckets([1, 2])
+    b.record(12000, 16000)
+    b.record(32000, 32000)
+    b.record(40000, 32000)
+    snap = metrics.snapshot()
+    assert snap["counters"]["bucket_1s"] == 1 and snap["counters"]["bucket_2s"] == 2
+    assert snap["counters"]["bucket_cropped"] == 1
+    assert snap["counters"]["bucket_padding_samples"] == 4000
+    assert snap["gauges"]["bucket_padding_ratio"] == round(4000 / 80000, 4)
+
+
+def test_preparacion_a_longitud_fija_con_mascara():
+    prep = FeaturePreparer()
+    signal = synthetic_speech(0.3, seed=1)
+    free = prep.prepare(signal)["input_values"].clone()
+    fixed = prep.prepare(signal, 8000)
+    n = signal.shape[0]
+    assert fixed["input_values"].shape == (1, 8000)
+    assert fixed["attention_mask"][0, :n].all() and not fixed["attention_mask"][0, n:].any()
+    torch.testing.assert_close(fixed["input_values"][0, :n], free[0], rtol=1e-4, atol=1e-5)
+    # recorte: más largo que el bucket
+    cropped = prep.prepare(synthetic_speech(1.0, seed=2), 8000)
+    assert cropped["input_values"].shape == (1, 8000) and cropped["attention_mask"].all()
+
+
+def test_logits_con_relleno_y_mascara_iguales_al_original():
+    model = _tiny_model()
+    prep = FeaturePreparer()
+    signal = synthetic_speech(0.3, seed=3)
+    with torch.inference_mode():
+        free = model(**prep.prepare(signal)).logits
+        bucketed = model(**prep.prepare(signal, 8000)).logits
+    torch.testing.assert_close(bucketed, free, rtol=1e-4, atol=1e-4)
+
+
+def test_modelo_por_defecto_no_admite_buckets():
+    # el tiny (como wav2vec2-base) usa GroupNorm en la 1ª conv: el relleno sí cambia los logits
+    _, model = build_tiny_model()
+    assert model.config.feat_extract_norm == "group" and not supports_padding(model)
+    prep = FeaturePreparer()
+    signal = synthetic_speech(0.3, seed=3)
+    with torch.inference_mode():
+        free = model(**prep.prepare(signal)).logits
+        bucketed = model(**prep.prepare(signal, 8000)).logits
+    assert not torch.allclose(bucketed, free, rtol=1e-4, atol=1e-4)
+
+    service = AudioService(MagicMock(), model, None, settings=Settings(LENGTH_BUCKETS_SECONDS=[0.5]))
+    assert service.buckets is None
+
+
+def test_servicio_usa_buckets_y_calienta_cada_uno():
+    metrics.reset()
+    model = _tiny_model()
+    settings = Settings(LENGTH_BUCKETS_SECONDS=[0.25, 0.5])
+    service = AudioService(MagicMock(), model, None, settings=settings)
+    service.warmup()
+    gauges = metrics.snapshot()["gauges"]
+    assert {"warmup_ms_full_0.25s", "warmup_ms_full_0.5s"} <= set(gauges)
+
+    shapes = []
+    model.register_forward_pre_hook(lambda m, args, kwargs: shapes.append(tuple(kwargs["input_values"].shape)),
+                                    with_kwargs=True)
+    for seconds in (0.1, 0.3, 0.45, 0.9):
+        service._infer(synthetic_speech(seconds, seed=4))
+    assert shapes == [(1, 4000), (1, 8000), (1, 8000), (1, 8000)]
+    assert service.predict_batch([synthetic_speech(0.1, seed=5), synthetic_speech(0.2, seed=6)]) is not None
+    assert shapes[-1] == (2, 4000)
+
+
+def test_bulk_agrupa_por_bucket():
+    b = LengthBatcher(batch_size=2, buckets=LengthBuckets([1, 2]))
+    assert b.add("a", np.zeros(9000)) is None
+    assert b.add("b", np.zeros(20000)) is None
+    assert [p for p, _ in b.add("c", np.zeros(15000))] == ["a", "c"]
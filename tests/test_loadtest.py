@@ -0,0 +1,65 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from app.infrastructure.cli.loadtest import (
+    parse_mix, summarize, compare_reports, StubModel, read_credentials, seed_users,
+)
+
+
+def test_parse_mix_normaliza_pesos():
+    assert parse_mix("predict=3,audios=1") == {"predict": 0.75, "audios": 0.25}
+    assert parse_mix("audios") == {"audios": 1.0}
+    with pytest.raises(ValueError):
+        parse_mix("delete=1")
+
+
+def test_summarize_percentiles_y_errores():
+    latencies = [i / 1000.0 for i in range(1, 101)]  # 1..100 ms
+    statuses = [200] * 98 + [500, 0]
+    s = summarize(latencies, statuses, elapsed=2.0)
+    assert s["count"] == 100
+    assert s["errors"] == 2
+    assert s["throughput"] == 50.0
+    assert s["p50_ms"] == pytest.approx(50.5)
+    assert s["max_ms"] == pytest.approx(100.0)
+    assert s["statuses"] == {"0": 1, "200": 98, "500": 1}
+
+
+def test_summarize_cuenta_429_aparte():
+    s = summarize([0.001, 0.001, 0.1, 0.2], [429, 429, 200, 500], elapsed=1.0)
+    assert s["rate_limited"] == 2
+    assert s["errors"] == 1
+    assert s["p50_ms"] == pytest.approx(150.0)   # solo las respuestas servidas
+
+
+def test_credenciales_y_usuarios_sembrados(db, tmp_path):
+    from app.infrastructure.database.user_repo_impl import SQLUserRepository
+    from app.infrastructure.security import verify_password
+
+    path = tmp_path / "users.csv"
+    path.write_text("# email,password\na@example.com,secreto\nb@example.com\n")
+    assert read_credentials(str(path)) == [("a@example.com", "secreto"), ("b@example.com", "loadtest-password")]
+
+    # example.com no pasaría la validación de /auth/register; sembrados van directos a la BD
+    creds = seed_users(["lt0@example.com", "lt0@example.com"])
+    user = SQLUserRepository().get_by_email("lt0@example.com")
+    assert creds[0] == ("lt0@example.com", "loadtest-password")
+    assert verify_password("loadtest-password", user.hashed_password)
+
+
+def test_compare_reports():
+    old = {"ops": {"predict": {"throughput": 10.0, "p50_ms": 100.0, "p99_ms": 200.0}}}
+    new = {"ops": {"predict": {"throughput": 12.0, "p50_ms": 90.0, "p99_ms": 200.0},
+                   "audios": {"throughput": 5.0}}}
+    rows = compare_reports(old, new)
+    assert ("predict", "throughput", 10.0, 12.0, 20.0) in rows
+    assert ("predict", "p50_ms", 100.0, 90.0, -10.0) in rows
+    assert all(r[0] != "audios" for r in rows)
+
+
+def test_stub_model_devuelve_logits_por_batch():
+    import torch
+    out = StubModel()(input_values=torch.zeros(3, 16000))
+    assert out.logits.shape == (3, 2)
@@ -0,0 +1,124 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from torch.profiler import ProfilerActivity, profile
+
+from app.application.audio_service import is_silent
+from app.application.feature_preparation import FeaturePreparer
+from app.infrastructure import memory
+from app.infrastructure.memory import MemoryBudget, track_peak
+from app.infrastructure.metrics import metrics
+from app.infrastructure.cli._synthetic import synthetic_speech
+
+
+def _peak_bytes(fn):
+    """Pico de Python/numpy (tracemalloc) + pico del allocator de torch (profiler).
+
+    tracemalloc no ve los tensores de torch; el profiler anota cada reserva en
+    su op y cada liberación como evento `[memory]`: la suma acumulada en orden
+    temporal da el pico. Se mide en dos pasadas (el profiler reserva memoria
+    de Python que tracemalloc contaría) y sumar ambos picos es una cota superior.
+    """
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        fn()
+        python_peak = tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+    with profile(activities=[ProfilerActivity.CPU], profile_memory=True) as prof:
+        fn()
+    current = torch_peak = 0
+    for event in sorted(prof.events(), key=lambda e: e.time_range.start):
+        current += event.self_cpu_memory_usage
+        torch_peak = max(torch_peak, current)
+    return python_peak + torch_peak
+
+
+def test_medicion_ve_los_tensores_de_torch():
+    import torch
+
+    signal = np.ones(128000, dtype=np.float32)
+    assert _peak_bytes(lambda: torch.from_numpy(signal).clone()) >= signal.nbytes
+
+
+def test_rms_sin_temporales():
+    signal = synthetic_speech(5.0, seed=0)
+    assert _peak_bytes(lambda: is_silent(signal)) < 4096
+    assert not is_silent(signal)
+    assert is_silent(np.zeros(16000, dtype=np.float32))
+    assert is_silent(np.zeros(0, dtype=np.float32))
+
+
+@pytest.mark.parametrize("seconds", [2.0, 8.0])
+def test_pico_de_preparacion_acotado_por_longitud(seconds):
+    signal = synthetic_speech(seconds, seed=1)
+    prep = FeaturePreparer()
+    prep.prepare(signal)  # primera llamada: reserva los buffers reutilizables
+    peak = _peak_bytes(lambda: (is_silent(signal), prep.prepare(signal)))
+    # buffers reutilizados: en régimen no se vuelve a copiar la señal entera
+    assert peak < 0.25 * signal.nbytes
+
+
+def test_presupuesto_espera_y_libera():
+    budget = MemoryBudget(100, timeout=2.0)
+    entered = threading.Event()
+    release = threading.Event()
+
+    def holder():
+        with budget.reserve(80):
+            entered.set()
+            release.wait(2)
+
+    t = threading.Thread(target=holder)
+    t.start()
+    entered.wait(1)
+    assert budget.used == 80
+    threading.Timer(0.1, release.set).start()
+    t0 = time.monotonic()
+    with budget.reserve(50):
+        assert budget.used == 50
+    assert time.monotonic() - t0 >= 0.05
+    t.join()
+    assert budget.used == 0
+
+
+def test_presupuesto_timeout_y_demasiado_grande():
+    metrics.reset()
+    budget = MemoryBudget(100, timeout=0.05)
+    with pytest.raises(HTTPException) as exc:
+        with budget.reserve(101):
+            pass
+    assert exc.value.status_code == 413
+    with budget.reserve(60):
+        with pytest.raises(HTTPException) as exc:
+            with budget.reserve(60):
+                pass
+        assert exc.value.status_code == 503
+    assert budget.used == 0
+    snap = metrics.snapshot()
+    assert snap["counters"]["memory_budget_rejected"] == 1
+    assert snap["counters"]["memory_budget_timeouts"] == 1
+
+
+def test_track_peak_publica_gauges():
+    metrics.reset()
+    memory.sample()  # fuera de track_peak no hace nada
+    with track_peak("predict") as tracker:
+        block = np.ones(8 * memory.MB, dtype=np.uint8)
+        memory.sample()
+        del block
+    assert tracker.peak >= tracker.start
+    gauges = metrics.snapshot()["gauges"]
+    assert gauges["predict_rss_delta_mb_last"] >= 0
+    assert gauges["predict_rss_delta_mb_max"] >= gauges["predict_rss_delta_mb_last"]
+    assert gauges["rss_mb"] > 0
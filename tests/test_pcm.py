@@ -0,0 +1,93 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pytest
+import torch
+from unittest.mock import MagicMock, patch
+from fastapi import HTTPException
+
+from app.application.audio_service import AudioService
+from app.application.pcm import PcmFormat, pcm_to_signal, read_pcm_body
+from app.infrastructure.cli._synthetic import synthetic_speech
+
+
+async def _chunks(payload, size):
+    for i in range(0, len(payload), size):
+        yield payload[i:i + size]
+
+
+def test_f32_mono_sin_copia():
+    signal = synthetic_speech(0.5, seed=0)
+    body = bytearray(signal.astype("<f4").tobytes())
+    out = pcm_to_signal(body, PcmFormat("f32le", 16000, 1).validate())
+    assert np.shares_memory(out, np.frombuffer(body, dtype="<f4"))
+    np.testing.assert_array_equal(out, signal)
+
+
+def test_s16_estereo_a_mono():
+    left = (np.arange(100) * 100).astype("<i2")
+    right = -left
+    inter = np.stack([left, right + 200], axis=1).ravel().astype("<i2")
+    out = pcm_to_signal(bytearray(inter.tobytes()), PcmFormat("s16le", 16000, 2))
+    assert out.dtype == np.float32
+    np.testing.assert_allclose(out, np.full(100, 100 / 32768.0), rtol=1e-6)
+
+
+def test_validaciones():
+    with pytest.raises(HTTPException):
+        PcmFormat("mp3", 16000, 1).validate()
+    with pytest.raises(HTTPException):
+        PcmFormat("s16le", 16000, 0).validate()
+    with pytest.raises(HTTPException):
+        pcm_to_signal(bytearray(b"\x00\x01\x02"), PcmFormat("s16le", 16000, 1))  # muestra incompleta
+    with pytest.raises(HTTPException):
+        pcm_to_signal(bytearray(np.array([np.nan], dtype="<f4").tobytes()), PcmFormat("f32le", 16000, 1))
+
+
+@pytest.mark.asyncio
+async def test_cuerpo_se_corta_en_la_duracion_de_analisis():
+    fmt = PcmFormat("s16le", 16000, 1)
+    payload = bytes(10 * 16000 * 2)  # 10 s
+    body = await read_pcm_body(_chunks(payload, 4096), fmt.bytes_for(5.0))
+    assert len(body) == 5 * 16000 * 2
+
+
+@pytest.mark.asyncio
+async def test_buffer_segun_content_length_o_creciendo():
+    payload = bytes(range(256)) * 40
+    limit = 8000
+    # sin Content-Length, con uno exacto, uno corto (el cliente envía más) y uno enorme
+    for expected in (None, len(payload), 100, 10 ** 12):
+        body = await read_pcm_body(_chunks(payload, 1000), limit, expected=expected)
+        assert body == payload[:limit]
+    assert await read_pcm_body(_chunks(b"", 10), limit, expected=10 ** 12) == b""
+
+
+def test_check_rate_antes_de_leer_el_cuerpo():
+    scheduler = MagicMock()
+    scheduler.check_rate.side_effect = HTTPException(status_code=429)
+    service = AudioService(MagicMock(), MagicMock(), None, scheduler=scheduler)
+    with pytest.raises(HTTPException):
+        service.check_rate(3)
+    scheduler.check_rate.assert_called_once_with(3)
+    AudioService(MagicMock(), MagicMock(), None).check_rate(3)  # sin scheduler no hay límite
+
+
+@pytest.mark.asyncio
+async def test_predict_pcm_sin_archivo_ni_decodificacion():
+    model = MagicMock(return_value=type("Output", (object,), {"logits": torch.tensor([[0.9, 0.1]])}))
+    repo = MagicMock()
+    repo.save = MagicMock(side_effect=lambda audio: audio)
+    service = AudioService(repo, model, None)
+
+    pcm = (synthetic_speech(1.0, seed=1) * 32767).astype("<i2").tobytes()
+    with patch("librosa.load") as load, patch("soundfile.SoundFile") as sfile, patch("tempfile.mkstemp") as mkstemp:
+        audio, _ = await service.predict_pcm(bytearray(pcm), PcmFormat("s16le", 16000, 1), user_id=4)
+
+    assert audio.result == "real" and audio.user_id == 4
+    assert audio.filename == "audio.pcm"
+    load.assert_not_called(); sfile.assert_not_called(); mkstemp.assert_not_called()
+    values = model.call_args.kwargs["input_values"]
+    assert values.shape == (1, 16000)
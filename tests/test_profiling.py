@@ -0,0 +1,88 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import threading
+import types
+import pytest
+import torch
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi import UploadFile
+
+from app.application.audio_service import AudioService
+from app.config import Settings
+from app.infrastructure import profiling
+from app.infrastructure.cli._synthetic import synthetic_speech
+
+
+class TorchModel:
+    def __call__(self, input_values=None, **kwargs):
+        x = torch.nn.functional.avg_pool1d(input_values[:, None, :], 400)
+        logits = torch.stack([x.mean(dim=(1, 2)), -x.mean(dim=(1, 2))], dim=1)
+        return types.SimpleNamespace(logits=logits)
+
+
+def test_sin_perfil_no_hay_contexto_nuevo():
+    assert profiling.span("forward") is profiling._NULL
+    assert profiling.python_section() is profiling._NULL
+    assert profiling.torch_section() is profiling._NULL
+
+
+def test_should_profile():
+    settings = Settings(PROFILE_TOKEN="s3cret", PROFILE_SAMPLE_RATE=0.0)
+    assert profiling.should_profile("s3cret", settings)
+    assert not profiling.should_profile("otro", settings)
+    assert not profiling.should_profile(None, settings)
+    assert profiling.should_profile(None, Settings(PROFILE_SAMPLE_RATE=1.0))
+
+
+@pytest.mark.asyncio
+async def test_perfil_de_una_prediccion(tmp_path):
+    repo = MagicMock()
+    repo.save = MagicMock(side_effect=lambda audio: audio)
+    service = AudioService(repo, TorchModel(), None)
+
+    f = MagicMock(spec=UploadFile)
+    f.filename = "lento.wav"
+    f.read = AsyncMock(side_effect=[b"RIFF\x24\x00\x00\x00WAVEperfil", b""])
+    with patch("librosa.load", return_value=(synthetic_speech(1.0, sr=8000, seed=0), 8000)), \
+         patch("soundfile.SoundFile") as mock_sf, \
+         profiling.request_profile(True, "predict-audio", str(tmp_path), keep=10) as prof:
+        mock_sf.return_value.__enter__.return_value.samplerate = 8000
+        await service.predict_audio(f, user_id=1)
+
+    profiling.writer.flush()
+    summary = json.loads((tmp_path / f"{prof.id}.json").read_text())
+    names = [s["name"] for s in summary["spans"]]
+    for stage in ("decode", "resample", "features", "forward", "db"):
+        assert stage in names
+    # decode/inferencia en el hilo del pool, BD desde el event loop
+    threads = {s["name"]: s["thread"] for s in summary["spans"]}
+    assert threads["forward"].startswith("inference")
+    assert summary["top_functions"]
+    assert summary["torch_ops"]
+    assert (tmp_path / f"{prof.id}.pstats").exists()
+    assert (tmp_path / f"{prof.id}.torch.json").exists()
+
+
+def test_retencion(tmp_path):
+    ids = []
+    for i in range(4):
+        with profiling.request_profile(True, "x", str(tmp_path), keep=2) as prof:
+            with profiling.span("algo"):
+                pass
+        ids.append(prof.id)
+    profiling.writer.flush()
+    remaining = {p.name.split(".")[0] for p in tmp_path.iterdir()}
+    assert remaining == set(ids[2:])
+
+
+def test_escritura_fuera_del_hilo_de_la_peticion(tmp_path, monkeypatch):
+    writers = []
+    monkeypatch.setattr(profiling.RequestProfile, "write",
+                        lambda self, directory, keep: writers.append(threading.current_thread().name))
+    with profiling.request_profile(True, "x", str(tmp_path), keep=2):
+        pass
+    profiling.writer.flush()
+    assert writers == ["profile-writer"]
@@ -0,0 +1,89 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+import torch
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi import UploadFile
+from transformers import Wav2Vec2Config, Wav2Vec2ForSequenceClassification
+
+from app.application.audio_service import AudioService
+from app.application.reduced_depth import encoder_depth, truncated_view
+from app.config import Settings
+from app.infrastructure.cli.depth_eval import summarize_depth
+from app.infrastructure.metrics import metrics
+
+
+def _tiny_model(**overrides):
+    config = Wav2Vec2Config(
+        hidden_size=16, num_hidden_layers=4, num_attention_heads=2, intermediate_size=32,
+        conv_dim=(8, 8), conv_kernel=(10, 3), conv_stride=(5, 2),
+        num_conv_pos_embeddings=16, num_conv_pos_embedding_groups=2,
+        classifier_proj_size=8, num_labels=2, **overrides,
+    )
+    torch.manual_seed(0)
+    return Wav2Vec2ForSequenceClassification(config).eval()
+
+
+def test_vista_truncada_comparte_pesos_y_no_toca_el_original():
+    model = _tiny_model()
+    view = truncated_view(model, 2)
+    assert encoder_depth(view) == 2
+    assert encoder_depth(model) == 4
+    assert view.classifier is model.classifier
+    assert truncated_view(model, 4) is model
+
+    x = torch.randn(1, 4000)
+    with torch.no_grad():
+        hidden = model.wav2vec2(x, output_hidden_states=True).hidden_states
+        fast = view(x).logits
+        full = model(x).logits
+    assert fast.shape == full.shape
+    assert not torch.allclose(fast, full)
+    # la salida de la vista es la del encoder cortado tras la capa 2
+    with torch.no_grad():
+        trunc_out = view.wav2vec2(x).last_hidden_state
+    assert trunc_out.shape == hidden[2].shape
+
+    with pytest.raises(ValueError):
+        truncated_view(model, 5)
+
+
+def test_vista_truncada_con_suma_ponderada():
+    model = _tiny_model(use_weighted_layer_sum=True)
+    view = truncated_view(model, 3)
+    assert view.layer_weights.shape[0] == 4
+    assert model.layer_weights.shape[0] == 5
+    with torch.no_grad():
+        assert view(torch.randn(1, 4000)).logits.shape == (1, 2)
+
+
+@pytest.mark.asyncio
+async def test_fast_mode_always_usa_el_encoder_truncado():
+    metrics.reset()
+    model = _tiny_model()
+    repo = MagicMock()
+    repo.save = MagicMock(side_effect=lambda audio: audio)
+    embeddings = MagicMock()
+    settings = Settings(FAST_MODE="always", FAST_MODE_LAYERS=1)
+    service = AudioService(repo, model, None, settings=settings, embeddings=embeddings)
+    assert encoder_depth(service.fast_model) == 1
+
+    f = MagicMock(spec=UploadFile)
+    f.filename = "clip.wav"
+    f.read = AsyncMock(side_effect=[b"RIFF\x24\x00\x00\x00WAVEfast", b""])
+    with patch("librosa.load", return_value=(torch.randn(8000).numpy() * 0.1, 16000)), \
+         patch("soundfile.SoundFile") as mock_sf:
+        mock_sf.return_value.__enter__.return_value.samplerate = 16000
+        await service.predict_audio(f, user_id=1)
+
+    assert metrics.counter("inference_stage_fast") == 1
+    embeddings.save.assert_not_called()  # embeddings de profundidad reducida no se indexan
+
+
+def test_resumen_por_profundidad():
+    row = summarize_depth(2, [0, 1, 1, 0], [0, 1, 0, 0], [0, 1, None, 1], [0.01, 0.02, 0.03, 0.04])
+    assert row["agreement"] == 0.75
+    assert row["accuracy"] == pytest.approx(2 / 3)
+    assert row["mean_ms"] == 25.0
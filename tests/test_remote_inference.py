@@ -0,0 +1,218 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pytest
+from unittest.mock import MagicMock
+from fastapi import HTTPException
+
+from app.application.audio_service import AudioService
+from app.config import Settings
+from app.application.remote_inference import InferenceWorker, RemoteInferenceClient, RemoteInferenceError
+from app.infrastructure.inference_transport import (
+    InMemoryRedis, QueueTransport, RedisTransport, connect_queue, decode_message, encode_message, serve_queue,
+)
+from app.infrastructure.metrics import metrics
+
+
+def _echo(signal):
+    # predicción = signo de la media; embedding = primeras muestras
+    return int(signal.mean() > 0), "full", signal[:4].copy()
+
+
+@pytest.fixture
+def running():
+    stops = []
+
+    def start(transport, analyze=_echo, **kw):
+        worker = InferenceWorker(transport, analyze, heartbeat_seconds=0.05, poll_seconds=0.05, **kw)
+        stop = threading.Event()
+        t = threading.Thread(target=worker.serve_forever, args=(stop,), daemon=True)
+        t.start()
+        stops.append((stop, t))
+        deadline = time.monotonic() + 2
+        while worker.worker_id not in transport.workers() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return worker
+
+    yield start
+    for stop, t in stops:
+        stop.set()
+        t.join(2)
+
+
+def test_mensajes_ida_y_vuelta():
+    signal = np.arange(5, dtype=np.float32)
+    header, payload = decode_message(encode_message({"id": "x"}, signal.tobytes()))
+    assert header == {"id": "x"}
+    np.testing.assert_array_equal(np.frombuffer(payload, dtype="<f4"), signal)
+
+
+@pytest.mark.parametrize("make", [QueueTransport.in_process, lambda: RedisTransport(InMemoryRedis())])
+def test_ida_y_vuelta_por_transporte(make, running):
+    transport = make()
+    running(transport, threads=2)
+    client = RemoteInferenceClient(transport, timeout=2.0)
+    try:
+        pred, stage, emb = client.infer(np.full(16000, 0.1, dtype=np.float32))
+        assert (pred, stage) == (1, "full")
+        np.testing.assert_allclose(emb, np.full(4, 0.1, dtype=np.float32))
+        assert client.infer(np.full(100, -0.1, dtype=np.float32))[0] == 0
+    finally:
+        client.close()
+
+
+def test_cola_en_socket_unix(running, tmp_path):
+    address = str(tmp_path / "q.sock")
+    serve_queue(address, b"k")
+    running(connect_queue(address, b"k"))
+    client = RemoteInferenceClient(connect_queue(address, b"k"), timeout=2.0)
+    try:
+        assert client.infer(np.ones(10, dtype=np.float32))[:2] == (1, "full")
+    finally:
+        client.close()
+
+
+def test_sin_workers_vivos_falla_al_instante():
+    transport = QueueTransport.in_process()
+    transport.heartbeat("viejo", {"ts": time.time() - 60})
+    client = RemoteInferenceClient(transport, timeout=5.0, heartbeat_max_age=1.0)
+    t0 = time.monotonic()
+    with pytest.raises(RemoteInferenceError):
+        client.infer(np.ones(10, dtype=np.float32))
+    assert time.monotonic() - t0 < 1.0
+
+
+def test_conexion_perezosa_y_reintentada(running, tmp_path):
+    address = str(tmp_path / "q.sock")
+    client = RemoteInferenceClient(connect=lambda: connect_queue(address, b"k", wait=0), timeout=2.0)
+    t0 = time.monotonic()
+    with pytest.raises(RemoteInferenceError):  # la cola aún no existe: falla rápido, sin excepción cruda
+        client.infer(np.ones(10, dtype=np.float32))
+    assert time.monotonic() - t0 < 1.0
+    serve_queue(address, b"k")
+    running(connect_queue(address, b"k"))
+    try:
+        assert client.infer(np.ones(10, dtype=np.float32))[:2] == (1, "full")
+    finally:
+        client.close()
+
+
+@pytest.mark.parametrize("make", [QueueTransport.in_process, lambda: RedisTransport(InMemoryRedis())])
+def test_latidos_antiguos_se_borran(make):
+    transport = make()
+    now = time.time()
+    transport.heartbeat("vivo", {"ts": now})
+    transport.heartbeat("lento", {"ts": now - 3})
+    transport.heartbeat("muerto", {"ts": now - 60})
+    client = RemoteInferenceClient(transport, heartbeat_max_age=2.0, prune_after=20.0)
+    assert client.live_workers() == ["vivo"]
+    assert set(transport.workers()) == {"vivo", "lento"}
+
+
+def test_worker_se_despide_al_parar():
+    transport = QueueTransport.in_process()
+    worker = InferenceWorker(transport, _echo, heartbeat_seconds=0.05, poll_seconds=0.05)
+    stop = threading.Event()
+    t = threading.Thread(target=worker.serve_forever, args=(stop,), daemon=True)
+    t.start()
+    while worker.worker_id not in transport.workers():
+        time.sleep(0.01)
+    stop.set()
+    t.join(2)
+    assert transport.workers() == {}
+
+
+def test_timeout_y_reintento(running):
+    metrics.reset()
+    transport = QueueTransport.in_process()
+    calls = []
+
+    def slow_first(signal):
+        calls.append(1)
+        if len(calls) == 1:
+            time.sleep(0.4)  # el primer intento caduca
+        return _echo(signal)
+
+    running(transport, slow_first)
+    client = RemoteInferenceClient(transport, timeout=0.2, retries=2)
+    try:
+        assert client.infer(np.ones(10, dtype=np.float32))[0] == 1
+    finally:
+        client.close()
+    assert metrics.snapshot()["counters"]["remote_inference_timeouts"] >= 1
+
+
+def test_errores_del_analisis_no_se_reintentan(running):
+    transport = QueueTransport.in_process()
+    calls = []
+
+    def silent(signal):
+        calls.append(1)
+        raise HTTPException(status_code=400, detail="silencio")
+
+    running(transport, silent)
+    client = RemoteInferenceClient(transport, timeout=1.0, retries=3)
+    try:
+        with pytest.raises(HTTPException) as exc:
+            client.infer(np.ones(10, dtype=np.float32))
+    finally:
+        client.close()
+    assert exc.value.status_code == 400 and exc.value.detail == "silencio"
+    assert len(calls) == 1
+
+
+def test_worker_descarta_trabajos_caducados():
+    transport = QueueTransport.in_process()
+    worker = InferenceWorker(transport, MagicMock())
+    transport.push_request(encode_message({"id": "a", "reply_to": "c", "deadline": time.time() - 1}, b""))
+    assert worker.run_once(0.1)
+    worker.analyze.assert_not_called()
+    assert transport.pop_reply("c", 0.05) is None
+
+
+def _service(remote, model=None, fallback=False):
+    settings = Settings(REMOTE_FALLBACK_LOCAL=fallback, MEMORY_BUDGET_MB=None)
+    return AudioService(MagicMock(), model, None, settings=settings, remote=remote)
+
+
+def test_servicio_remoto_sin_fallback_responde_503():
+    remote = MagicMock()
+    remote.infer.side_effect = RemoteInferenceError("caído")
+    service = _service(remote)
+    with pytest.raises(HTTPException) as exc:
+        service._run_inference(np.ones(10, dtype=np.float32))
+    assert exc.value.status_code == 503
+
+
+def test_servicio_remoto_con_fallback_local():
+    remote = MagicMock()
+    remote.infer.side_effect = RemoteInferenceError("caído")
+    service = _service(remote, model=MagicMock(), fallback=True)
+    service.infer_signal = MagicMock(return_value=(0, "full", None))
+    assert service._run_inference(np.ones(10, dtype=np.float32)) == (0, "full", None)
+    remote.infer.side_effect = None
+    remote.infer.return_value = (1, "prefilter", None)
+    assert service._run_inference(np.ones(10, dtype=np.float32)) == (1, "prefilter", None)
+
+
+@pytest.mark.asyncio
+async def test_espera_remota_no_ocupa_los_hilos_de_inferencia():
+    gate = threading.Event()
+    remote = MagicMock()
+    remote.infer.side_effect = lambda signal: (gate.wait(2), (0, "full", None))[1]
+    settings = Settings(INFERENCE_THREADS=1, REMOTE_MAX_INFLIGHT=4, MEMORY_BUDGET_MB=None)
+    service = AudioService(MagicMock(), None, None, settings=settings, remote=remote)
+    signal = np.ones(10, dtype=np.float32)
+    waits = [asyncio.ensure_future(service._run_blocking(service._run_inference, signal)) for _ in range(3)]
+    deadline = time.monotonic() + 2
+    while remote.infer.call_count < 3 and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    assert remote.infer.call_count == 3  # las tres esperan a la vez con un solo INFERENCE_THREADS
+    gate.set()
+    assert await asyncio.gather(*waits) == [(0, "full", None)] * 3
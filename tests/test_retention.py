@@ -0,0 +1,132 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import inspect
+
+from app.application.audio_export import ExportFilters, iter_export
+from app.application.history_service import HistoryService
+from app.application.retention_service import RetentionService
+from app.domain.models.audio import Audio
+from app.infrastructure.database.audio_archive_repo_impl import SQLAudioArchiveRepository
+from app.infrastructure.database.audio_repo_impl import SQLAudioRepository
+from app.infrastructure.database.connection import get_session
+
+NOW = datetime(2025, 6, 15, 10, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def filled(db):
+    # user 1: un audio cada 10 días desde enero; user 2: solo en marzo
+    with get_session() as session:
+        for i in range(16):
+            session.add(Audio(user_id=1, filename=f"u1_{i}.wav", result="falso" if i % 2 else "real",
+                              authenticity_score=10.0 * (i % 5), inference_duration=0.5,
+                              created=datetime(2025, 1, 3, tzinfo=timezone.utc) + timedelta(days=10 * i)))
+        for i in range(3):
+            session.add(Audio(user_id=2, filename=f"u2_{i}.wav", result="real", authenticity_score=90.0,
+                              created=datetime(2025, 3, 5 + i, tzinfo=timezone.utc)))
+        session.commit()
+    return db
+
+
+def _retention(days=60):
+    return RetentionService(SQLAudioArchiveRepository(), retention_days=days, batch_size=3)
+
+
+def test_indices_de_created(db):
+    names = {ix["name"] for ix in inspect(db).get_indexes("audios")}
+    assert {"ix_audios_created", "ix_audios_user_id_created"} <= names
+
+
+def test_plan_por_meses_hasta_el_corte(filled):
+    plan = _retention().plan(NOW)
+    assert [m for m, _, _ in plan] == ["202501", "202502", "202503", "202504"]
+    assert plan[-1][2] == datetime(2025, 4, 16, tzinfo=timezone.utc)  # 15/06 - 60 días
+    with pytest.raises(ValueError):
+        RetentionService(SQLAudioArchiveRepository(), retention_days=0)
+
+
+def test_archiva_y_el_historial_sigue_legible(filled):
+    repo, archive = SQLAudioRepository(), SQLAudioArchiveRepository()
+    before = {a.id: a.filename for a in repo.get_by_user(1)}
+
+    report = _retention().run(NOW)
+    cutoff = datetime(2025, 4, 16)
+    hot = repo.get_all()
+    assert all(a.created.replace(tzinfo=None) >= cutoff for a in hot)
+    assert sum(report["archived"].values()) == 19 - len(hot)
+    assert {m.month for m in archive.months()} == {"202501", "202502", "202503", "202504"}
+
+    history = HistoryService(repo, archive=archive)
+    assert len(history.get_audios_by_user(1)) < len(before)
+    full = history.get_audios_by_user(1, include_archived=True)
+    assert {a.id: a.filename for a in full} == before
+    created = [a.created for a in full]
+    assert created == sorted(created, reverse=True)
+    # usuario 2 solo tiene marzo archivado
+    assert [a.filename for a in history.get_audios_by_user(2, include_archived=True)] == ["u2_2.wav", "u2_1.wav", "u2_0.wav"]
+
+    old_id = min(before)
+    assert repo.get_by_id(old_id) is None
+    assert history.get_audio(old_id).filename == before[old_id]
+
+    # segunda ejecución: nada más que archivar, rollups intactos
+    assert sum(_retention().run(NOW)["archived"].values()) == 0
+
+
+def test_rollups_diarios_sobreviven_al_archivado(filled):
+    _retention().run(NOW)
+    stats = SQLAudioArchiveRepository().daily_stats(1)
+    assert sum(r.count for r in stats) == 16
+    first = stats[0]
+    assert first.day == date(2025, 1, 3) and first.result == "real" and first.count == 1
+    assert first.inference_count == 1 and first.inference_seconds_sum == pytest.approx(0.5)
+    march = SQLAudioArchiveRepository().daily_stats(2, since=date(2025, 3, 6), until=date(2025, 3, 7))
+    assert [(r.day, r.count, r.score_sum) for r in march] == [(date(2025, 3, 6), 1, 90.0)]
+
+
+def test_dry_run_no_toca_nada(filled):
+    report = _retention().run(NOW, dry_run=True)
+    assert report["months"] == ["202501", "202502", "202503", "202504"]
+    assert len(SQLAudioRepository().get_all()) == 19
+    assert SQLAudioArchiveRepository().months() == []
+
+
+def test_rollup_tras_un_periodo_sin_actividad_no_borra_dias_archivados(db):
+    with get_session() as session:
+        session.add(Audio(user_id=1, filename="unico.wav", result="real", authenticity_score=80.0,
+                          created=datetime(2025, 1, 10, 12, tzinfo=timezone.utc)))
+        session.commit()
+    for day in (datetime(2025, 1, 11), datetime(2025, 2, 20), datetime(2025, 2, 21)):
+        _retention(days=30).run(day.replace(hour=3, tzinfo=timezone.utc))
+
+    archive = SQLAudioArchiveRepository()
+    assert [(r.day, r.count) for r in archive.daily_stats(1)] == [(date(2025, 1, 10), 1)]
+    history = HistoryService(SQLAudioRepository(), archive=archive)
+    assert [a.filename for a in history.get_audios_by_user(1, include_archived=True)] == ["unico.wav"]
+
+
+def _exported_ids(archive, **filters):
+    body = b"".join(iter_export(SQLAudioRepository(), "ndjson", ExportFilters(**filters), batch_size=2,
+                                archive=archive))
+    return [json.loads(line)["id"] for line in body.splitlines()]
+
+
+def test_export_incluye_los_meses_archivados(filled):
+    queries = [
+        {},
+        {"user_id": 2, "since": datetime(2025, 3, 6, tzinfo=timezone.utc), "until": datetime(2025, 4, 1, tzinfo=timezone.utc)},
+        {"since": datetime(2025, 2, 15, tzinfo=timezone.utc), "result": "real"},
+    ]
+    before = [sorted(_exported_ids(None, **q)) for q in queries]
+    assert len(before[0]) == 19 and len(before[1]) == 2
+
+    _retention().run(NOW)
+    archive = SQLAudioArchiveRepository()
+    assert len(_exported_ids(None)) < 19                       # sin archivo: solo la tabla caliente
+    assert [sorted(_exported_ids(archive, **q)) for q in queries] == before
@@ -0,0 +1,89 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import subprocess
+
+import pytest
+from unittest.mock import MagicMock
+from fastapi import HTTPException
+
+from app.application.history_service import HistoryService
+from app.infrastructure.cli.import_report import check, measure_role, parse_importtime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def _env():
+    return dict(os.environ, DATABASE_URL="sqlite://")
+
+
+def test_parse_importtime_suma_tiempo_propio_por_paquete():
+    stderr = "\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:       100 |        100 |     fastapi.types",
+        "import time:       300 |        400 |   fastapi",
+        "import time:        50 |        850 | app.main",
+        "algo que no es importtime",
+    ])
+    assert parse_importtime(stderr) == {"fastapi": 400, "app": 50}
+
+
+def test_roles_sin_inferencia_no_importan_ml():
+    report = measure_role(["auth", "history"], env=_env())
+    assert report["heavy"] == []
+    assert report["modules"] > 0 and report["top_imports"]
+    assert check(report, max_seconds=None) == []
+    assert check(dict(report, heavy=["torch"]), max_seconds=None)
+
+
+def test_create_app_monta_solo_los_roles_pedidos():
+    code = (
+        "import json; from app.main import create_app;"
+        "app = create_app(['auth']);"
+        "print(json.dumps(sorted(r.path for r in app.routes)))"
+    )
+    env = dict(_env(), APP_ROLES='["auth"]')
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, cwd=ROOT)
+    assert out.returncode == 0, out.stderr
+    paths = json.loads(out.stdout.strip().splitlines()[-1])
+    assert "/auth/login" in paths and "/health" in paths
+    assert not any(p.startswith(("/audios", "/predict")) for p in paths)
+
+
+def test_roles_desconocidos():
+    code = "from app.main import create_app; create_app(['auth', 'gpu'])"
+    env = dict(_env(), APP_ROLES='["auth"]')
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, cwd=ROOT)
+    assert out.returncode != 0 and "Roles no válidos" in out.stderr
+
+
+def test_history_service_similares_valida_dueno():
+    repo = MagicMock()
+    repo.get_by_id.return_value = MagicMock(user_id=2)
+    svc = HistoryService(repo)
+    with pytest.raises(HTTPException) as exc:
+        svc.find_similar(1, user_id=1)
+    assert exc.value.status_code == 404
+    repo.get_by_id.return_value = MagicMock(user_id=1)
+    with pytest.raises(HTTPException) as exc:
+        svc.find_similar(1, user_id=1)
+    assert exc.value.status_code == 503
+
+
+def test_metricas_con_token(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.config import Settings
+    from app.infrastructure.routes import metrics as metrics_routes
+
+    app = FastAPI()
+    app.include_router(metrics_routes.router)
+    client = TestClient(app)
+    monkeypatch.setattr(metrics_routes, "get_settings", lambda: Settings(METRICS_TOKEN="s3cret"))
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer otro"}).status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
+    monkeypatch.setattr(metrics_routes, "get_settings", lambda: Settings())
+    assert client.get("/metrics").status_code == 200
@@ -0,0 +1,134 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import threading
+import time
+import pytest
+import torch
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi import UploadFile, HTTPException
+
+from app.application.audio_service import AudioService
+from app.application.single_flight import SingleFlight
+from app.infrastructure.metrics import metrics
+
+
+class SlowModel:
+    """Modelo de prueba que tarda un poco y cuenta sus llamadas."""
+
+    def __init__(self):
+        self.calls = 0
+        self.threads = set()
+
+    def __call__(self, **kwargs):
+        self.calls += 1
+        self.threads.add(threading.current_thread().name)
+        time.sleep(0.05)
+        return type('Output', (object,), {"logits": torch.tensor([[0.1, 0.9]])})
+
+
+def _file(payload):
+    f = MagicMock(spec=UploadFile)
+    f.filename = "clip.wav"
+    f.read = AsyncMock(side_effect=[payload, b""])
+    return f
+
+
+def _service(model):
+    repo = MagicMock()
+    repo.save = MagicMock(side_effect=lambda audio: audio)
+    return AudioService(repo, model, None), repo
+
+
+@pytest.mark.asyncio
+async def test_subidas_identicas_comparten_inferencia():
+    metrics.reset()
+    model = SlowModel()
+    service, repo = _service(model)
+    payload = b"RIFF\x24\x00\x00\x00WAVEmismo contenido"
+
+    with patch("librosa.load", return_value=(torch.randn(16000).numpy(), 16000)), \
+         patch("soundfile.SoundFile") as mock_sf:
+        mock_sf.return_value.__enter__.return_value.samplerate = 16000
+        results = await asyncio.gather(*[
+            service.predict_audio(_file(payload), user_id=uid) for uid in (1, 2, 3)
+        ])
+
+    assert model.calls == 1
+    assert all(t.startswith("inference") for t in model.threads)
+    # cada usuario conserva su propio registro
+    assert sorted(a.user_id for a, _ in results) == [1, 2, 3]
+    assert {a.result for a, _ in results} == {"falso"}
+    assert repo.save.call_count == 3
+    assert metrics.counter("predict_coalesced_total") == 2
+    assert len(service._inflight) == 0
+
+
+@pytest.mark.asyncio
+async def test_contenidos_distintos_no_se_agrupan():
+    metrics.reset()
+    model = SlowModel()
+    service, _ = _service(model)
+
+    with patch("librosa.load", return_value=(torch.randn(16000).numpy(), 16000)), \
+         patch("soundfile.SoundFile") as mock_sf:
+        mock_sf.return_value.__enter__.return_value.samplerate = 16000
+        await asyncio.gather(
+            service.predict_audio(_file(b"RIFF\x24\x00\x00\x00WAVEclip uno"), user_id=1),
+            service.predict_audio(_file(b"RIFF\x24\x00\x00\x00WAVEclip dos"), user_id=1),
+        )
+
+    assert model.calls == 2
+    assert metrics.counter("predict_coalesced_total") == 0
+
+
+@pytest.mark.asyncio
+async def test_error_compartido_y_cancelacion_del_lider():
+    flight = SingleFlight("prueba")
+    gate = asyncio.Event()
+
+    async def work():
+        await gate.wait()
+        raise HTTPException(status_code=400, detail="silencio")
+
+    leader = asyncio.ensure_future(flight.do("k", work))
+    follower = asyncio.ensure_future(flight.do("k", work))
+    await asyncio.sleep(0)
+    # cancelar al líder no cancela el trabajo compartido
+    leader.cancel()
+    gate.set()
+    with pytest.raises(HTTPException):
+        await follower
+    assert len(flight) == 0
+
+
+@pytest.mark.asyncio
+async def test_rechazo_del_lider_no_se_hereda():
+    metrics.reset()
+    model = SlowModel()
+    service, repo = _service(model)
+    payload = b"RIFF\x24\x00\x00\x00WAVEmismo contenido"
+    real_schedule = service._schedule
+
+    async def schedule(user_id, fn, *args):
+        if user_id == 1:   # el usuario 1 tiene la cola llena
+            await asyncio.sleep(0.02)
+            raise HTTPException(status_code=429, detail="Tienes demasiados audios en cola")
+        return await real_schedule(user_id, fn, *args)
+
+    service._schedule = schedule
+    with patch("librosa.load", return_value=(torch.randn(16000).numpy(), 16000)), \
+         patch("soundfile.SoundFile") as mock_sf:
+        mock_sf.return_value.__enter__.return_value.samplerate = 16000
+        leader = asyncio.ensure_future(service.predict_audio(_file(payload), user_id=1))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(service.predict_audio(_file(payload), user_id=2))
+        results = await asyncio.gather(leader, follower, return_exceptions=True)
+
+    assert isinstance(results[0], HTTPException) and results[0].status_code == 429
+    audio, _ = results[1]
+    assert audio.user_id == 2 and model.calls == 1
+    assert metrics.counter("predict_coalesced_total") == 1
+    assert metrics.counter("predict_coalesced_retries") == 1
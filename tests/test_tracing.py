@@ -0,0 +1,159 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import io
+import json
+import logging
+import queue
+import time
+
+import numpy as np
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app.application.remote_inference import InferenceWorker
+from app.infrastructure import logs, profiling, tracing
+from app.infrastructure.inference_transport import QueueTransport, encode_message
+from app.infrastructure.metrics import metrics
+
+
+def _read(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def _app(exporter, sample_rate=1.0):
+    def current_user():
+        with tracing.span("auth"):
+            return 1
+
+    def infer():
+        with tracing.span("inference"):
+            time.sleep(0.001)
+
+    async def persist():
+        with tracing.span("db"):
+            time.sleep(0.001)
+
+    app = FastAPI()
+
+    @app.get("/ok")
+    async def ok(user: int = Depends(current_user)):
+        with tracing.span("analyze"):
+            await asyncio.to_thread(infer)
+            await persist()
+        return {"request_id": tracing.current_request_id()}
+
+    @app.get("/falla")
+    def falla():
+        with tracing.span("decode"):
+            raise HTTPException(status_code=400, detail="malo")
+
+    app.add_middleware(tracing.RequestTracingMiddleware, exporter=exporter, sample_rate=sample_rate)
+    return app
+
+
+def test_span_sin_traza_es_nulo():
+    assert tracing.span("forward") is profiling._NULL
+    assert tracing.current_request_id() is None
+
+
+def test_request_id_en_respuesta_y_contexto():
+    client = TestClient(_app(None, sample_rate=0))
+    r = client.get("/ok")
+    assert r.headers["x-request-id"] == r.json()["request_id"]
+    r = client.get("/ok", headers={"X-Request-ID": "cliente-123"})
+    assert r.headers["x-request-id"] == "cliente-123"
+    r = client.get("/ok", headers={"X-Request-ID": "no valido; con espacios"})
+    assert r.headers["x-request-id"] != "no valido; con espacios"
+
+
+def test_traza_con_spans_anidados(tmp_path):
+    exporter = tracing.JsonlExporter(str(tmp_path / "traces" / "t.jsonl"))
+    client = TestClient(_app(exporter))
+    r = client.get("/ok", headers={"X-Request-ID": "abc"})
+    client.get("/falla")
+    exporter.flush()
+    ok, falla = _read(tmp_path / "traces" / "t.jsonl")
+
+    assert ok["request_id"] == "abc" and ok["status"] == 200 and ok["name"] == "GET /ok"
+    spans = {s["name"]: s for s in ok["spans"]}
+    assert set(spans) == {"request", "auth", "analyze", "inference", "db"}
+    assert spans["request"]["parent"] is None
+    assert spans["auth"]["parent"] == spans["request"]["id"]      # dependencia síncrona (threadpool)
+    assert spans["inference"]["parent"] == spans["analyze"]["id"]  # asyncio.to_thread
+    assert spans["db"]["parent"] == spans["analyze"]["id"]
+    assert spans["request"]["duration_ms"] >= spans["db"]["duration_ms"] > 0
+
+    assert falla["status"] == 400
+    decode = next(s for s in falla["spans"] if s["name"] == "decode")
+    assert decode["error"] == "HTTPException"
+    exporter.close()
+
+
+def test_muestreo_cero_no_exporta(tmp_path):
+    exporter = tracing.JsonlExporter(str(tmp_path / "t.jsonl"))
+    client = TestClient(_app(exporter, sample_rate=0))
+    client.get("/ok")
+    exporter.flush()
+    assert not (tmp_path / "t.jsonl").exists()
+
+
+def test_exportador_descarta_con_la_cola_llena(tmp_path, monkeypatch):
+    metrics.reset()
+    exporter = tracing.JsonlExporter(str(tmp_path / "t.jsonl"), max_queue=1)
+    monkeypatch.setattr(exporter, "_ensure_thread", lambda: None)  # escritor parado
+    assert exporter.submit({"n": 1})
+    assert not exporter.submit({"n": 2})
+    assert metrics.snapshot()["counters"]["traces_dropped"] == 1
+
+
+def test_exportador_rota_el_archivo(tmp_path):
+    path = str(tmp_path / "t.jsonl")
+    exporter = tracing.JsonlExporter(path, max_bytes=5)
+    for i in range(3):
+        exporter.submit({"n": i})
+        exporter.flush()
+    exporter.close()
+    assert _read(path) == [{"n": 2}]
+    assert _read(path + ".1") == [{"n": 1}]
+
+
+def test_logs_json_con_request_id():
+    logs.shutdown_logging()  # otro test pudo configurarlo con stderr
+    stream = io.StringIO()
+    logs.configure_logging("INFO", json_format=True, stream=stream)
+    try:
+        with tracing.request_context("req-1"):
+            logging.getLogger("app.test").error("fallo %s", "x")
+        logging.getLogger("app.test").debug("no sale")
+    finally:
+        logs.shutdown_logging()
+    entries = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert entries == [{**entries[0], "level": "ERROR", "logger": "app.test", "msg": "fallo x", "request_id": "req-1"}]
+
+
+def test_handler_no_bloquea_con_la_cola_llena():
+    metrics.reset()
+    handler = logs.DroppingQueueHandler(queue.Queue(1))
+    record = logging.LogRecord("app", logging.ERROR, __file__, 1, "m", None, None)
+    handler.emit(record)
+    handler.emit(record)
+    assert metrics.snapshot()["counters"]["logs_dropped"] == 1
+
+
+def test_worker_remoto_recibe_el_request_id():
+    seen = []
+
+    def analyze(signal):
+        seen.append(tracing.current_request_id())
+        return 0, "full", None
+
+    transport = QueueTransport.in_process()
+    worker = InferenceWorker(transport, analyze)
+    header = {"id": "j1", "reply_to": "api", "deadline": time.time() + 5, "request_id": "req-9"}
+    worker.handle(encode_message(header, np.zeros(4, dtype="<f4").tobytes()))
+    assert seen == ["req-9"]
+    assert transport.pop_reply("api", 1.0) is not None